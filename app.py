@@ -1,3 +1,5 @@
+# First, so startup.STARTED marks the start of the app import.
+import startup
 from flask import Flask, render_template, request, jsonify
 import mysql.connector
 import pandas as pd
@@ -5,8 +7,26 @@ import numpy as np
 import os
 from datetime import datetime
 import ml
+import sweep
+import payload
+import responses
+import metrics
+import profiling
+import registry
+import concurrency
+import dtypes
+import sketches
+import history
+from brand_index import BrandIndex, DEFAULT_LIMIT, MAX_LIMIT
+from dashboard import DashboardCache
 
 app = Flask(__name__)
+# Hook order matters: before_request hooks run in registration order and
+# after_request hooks in reverse. The profiler wraps everything and metrics
+# sees the final status.
+profiling.init_app(app)
+metrics.init_app(app)
+responses.init_app(app)
 
 db_config = {
     'host': 'localhost',
@@ -17,123 +37,242 @@ db_config = {
 }
 
 MODELS_DIR = 'models'
+app.config.setdefault('SCATTER_POINT_BUDGET', payload.POINT_BUDGET)
+app.config.setdefault('PREWARM_ENABLED', os.environ.get('PREWARM') == '1')
+app.config.setdefault('PREWARM_MODELS', startup.PREWARM_MODELS)
+app.config.setdefault('READ_POOL_SIZE', concurrency.READ_POOL_SIZE)
+app.config.setdefault('READ_POOL_TIMEOUT', concurrency.READ_POOL_TIMEOUT)
+app.config.setdefault('TRAINING_CONCURRENCY', concurrency.TRAINING_CONCURRENCY)
+app.config.setdefault('TRAINING_WAIT_SECONDS', concurrency.TRAINING_WAIT_SECONDS)
+app.config.setdefault('OUTLIER_BOUNDS', os.environ.get('OUTLIER_BOUNDS', 'exact'))
+
+def connect():
+    with metrics.stage('connect'):
+        return mysql.connector.connect(**db_config)
+
+def read_frame(conn, query, params=None):
+    # pd.read_sql split in two so query time and DataFrame build time are
+    # measured separately; coerce_float matches read_sql for DECIMAL columns.
+    # Columns get the dtypes.py policy, reported per route at /memory_report.
+    with metrics.stage('query'):
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        columns = [d[0] for d in cursor.description]
+        cursor.close()
+    with metrics.stage('frame'):
+        frame = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        return dtypes.compact(frame, request.endpoint)
+
+# Read routes (charts, dashboard, brand lookups) draw from their own pool, so
+# they keep being served on other threads while training holds the training
+# slots; see gunicorn.conf.py for the threaded workers. Both read their sizes
+# from app.config on first use, so settings made after import apply.
+READ_POOL = concurrency.ConnectionPool(connect, lambda: app.config['READ_POOL_SIZE'], lambda: app.config['READ_POOL_TIMEOUT'])
+TRAINING = concurrency.Limiter('training', lambda: app.config['TRAINING_CONCURRENCY'], lambda: app.config['TRAINING_WAIT_SECONDS'])
+
+BRAND_INDEX = BrandIndex(READ_POOL.connect)
+SKETCHES = sketches.SketchCache(READ_POOL.connect)
 if not os.path.exists(MODELS_DIR):
     os.makedirs(MODELS_DIR)
 
+# Latest model per (session, kind), shared by all worker processes through
+# models/registry.json; each worker keeps its own cache of loaded models.
+MODEL_REGISTRY = registry.ModelRegistry(MODELS_DIR, ml.load_model)
+
+def outlier_sketches():
+    # OUTLIER_BOUNDS='sketch' takes regression and price_category outlier
+    # bounds from the stored column sketches instead of exact quantiles of
+    # each request's rows. Off by default: the estimates are table-wide and
+    # approximate, so models trained either way are not identical.
+    if app.config['OUTLIER_BOUNDS'] != 'sketch':
+        return None
+    return SKETCHES.columns() or None
+
+def model_owner():
+    return request.headers.get(registry.OWNER_HEADER) or registry.DEFAULT_OWNER
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+CHART_QUERIES = {
+    'price_diff_category': """
+        SELECT category, AVG(original_price) as avg_original, AVG(price) as avg_discounted
+        FROM cleaned_products
+        GROUP BY category
+        HAVING COUNT(*) > 5
+        ORDER BY avg_original DESC
+    """,
+    'price_diff_subcategory': """
+        SELECT subcategory, AVG(original_price) as avg_original, AVG(price) as avg_discounted
+        FROM cleaned_products
+        GROUP BY subcategory
+        HAVING COUNT(*) > 5
+        ORDER BY avg_original DESC
+        LIMIT 15
+    """,
+    'product_distribution': """
+        SELECT category, COUNT(*) as count
+        FROM cleaned_products
+        GROUP BY category
+        ORDER BY count DESC
+    """,
+    'correlation_features': """
+        SELECT price, rating
+        FROM cleaned_products
+        WHERE rating IS NOT NULL AND price IS NOT NULL
+        ORDER BY RAND()
+        LIMIT 300
+    """,
+    'top_selling_brands': """
+        SELECT brand, COUNT(*) as count
+        FROM cleaned_products
+        GROUP BY brand
+        ORDER BY count DESC
+        LIMIT 10
+    """,
+    'rating_distribution': """
+        SELECT brand, AVG(rating) as avg_rating
+        FROM cleaned_products
+        WHERE rating IS NOT NULL
+        GROUP BY brand
+        HAVING COUNT(*) > 10
+        ORDER BY avg_rating DESC
+        LIMIT 20
+    """,
+    'discount_vs_rating': """
+        SELECT brand, AVG(discount) as avg_discount, AVG(rating) as avg_rating
+        FROM cleaned_products
+        WHERE discount IS NOT NULL AND rating IS NOT NULL
+        GROUP BY brand
+        HAVING COUNT(*) > 5
+    """,
+    'best_discounted_high_rated': """
+        SELECT category, AVG(discount) as avg_discount
+        FROM cleaned_products
+        WHERE rating > 4 AND price < 1000
+        GROUP BY category
+        HAVING AVG(discount) > 30 AND COUNT(*) > 5
+        ORDER BY avg_discount DESC
+    """
+}
+
+DASHBOARD = DashboardCache(READ_POOL.connect, CHART_QUERIES['correlation_features'])
+
+CLUSTERING_FEATURES = {
+    'price': 'AVG(price) AS avg_price',
+    'discount': 'AVG(discount) AS avg_discount',
+    'rating': 'AVG(rating) AS avg_rating'
+}
+
+def brand_popularity_query(query_cols):
+    return f"""
+        SELECT {', '.join(query_cols)}, COUNT(*) as id
+        FROM cleaned_products
+        GROUP BY {', '.join(query_cols)}
+        HAVING COUNT(*) > 1
+    """
+
+def clustering_query(group_by, features):
+    return f"""
+        SELECT 
+            {group_by},
+            {', '.join([CLUSTERING_FEATURES[f] for f in features])}
+        FROM cleaned_products
+        WHERE {group_by} IS NOT NULL
+        GROUP BY {group_by}
+        HAVING COUNT(*) > 5
+    """
+
 @app.route('/get_data')
 def get_data():
     chart_type = request.args.get('type')
 
-    try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
+    if chart_type in sketches.PERCENTILE_CHARTS:
+        return jsonify(SKETCHES.charts()[chart_type])
 
-        if chart_type == 'price_diff_category':
-            cursor.execute("""
-                SELECT category, AVG(original_price) as avg_original, AVG(price) as avg_discounted
-                FROM cleaned_products
-                GROUP BY category
-                HAVING COUNT(*) > 5
-                ORDER BY avg_original DESC
-            """)
-            rows = cursor.fetchall()
-            result = {
-                "original": [{"label": row[0], "y": round(row[1], 2)} for row in rows],
-                "discounted": [{"label": row[0], "y": round(row[2], 2)} for row in rows]
-            }
+    if chart_type not in CHART_QUERIES:
+        return jsonify({"error": "Invalid chart type"})
 
-        elif chart_type == 'price_diff_subcategory':
-            cursor.execute("""
-                SELECT subcategory, AVG(original_price) as avg_original, AVG(price) as avg_discounted
-                FROM cleaned_products
-                GROUP BY subcategory
-                HAVING COUNT(*) > 5
-                ORDER BY avg_original DESC
-                LIMIT 15
-            """)
-            rows = cursor.fetchall()
+    try:
+        conn = READ_POOL.connect()
+        try:
+            with metrics.stage('query'):
+                cursor = conn.cursor()
+                cursor.execute(CHART_QUERIES[chart_type])
+                rows = cursor.fetchall()
+                cursor.close()
+        finally:
+            conn.close()
+
+        if chart_type in ('price_diff_category', 'price_diff_subcategory'):
             result = {
                 "original": [{"label": row[0], "y": round(row[1], 2)} for row in rows],
                 "discounted": [{"label": row[0], "y": round(row[2], 2)} for row in rows]
             }
 
-        elif chart_type == 'product_distribution':
-            cursor.execute("""
-                SELECT category, COUNT(*) as count
-                FROM cleaned_products
-                GROUP BY category
-                ORDER BY count DESC
-            """)
-            result = [{"label": row[0], "y": row[1]} for row in cursor.fetchall()]
+        elif chart_type in ('product_distribution', 'top_selling_brands'):
+            result = [{"label": row[0], "y": row[1]} for row in rows]
 
         elif chart_type == 'correlation_features':
-            cursor.execute("""
-                SELECT price, rating
-                FROM cleaned_products
-                WHERE rating IS NOT NULL AND price IS NOT NULL
-                ORDER BY RAND()
-                LIMIT 300
-            """)
-            result = [{"x": float(row[0]), "y": float(row[1])} for row in cursor.fetchall()]
-
-        elif chart_type == 'top_selling_brands':
-            cursor.execute("""
-                SELECT brand, COUNT(*) as count
-                FROM cleaned_products
-                GROUP BY brand
-                ORDER BY count DESC
-                LIMIT 10
-            """)
-            result = [{"label": row[0], "y": row[1]} for row in cursor.fetchall()]
-
-        elif chart_type == 'rating_distribution':
-            cursor.execute("""
-                SELECT brand, AVG(rating) as avg_rating
-                FROM cleaned_products
-                WHERE rating IS NOT NULL
-                GROUP BY brand
-                HAVING COUNT(*) > 10
-                ORDER BY avg_rating DESC
-                LIMIT 20
-            """)
-            result = [{"label": row[0], "y": round(row[1], 2)} for row in cursor.fetchall()]
+            result = [{"x": float(row[0]), "y": float(row[1])} for row in rows]
 
         elif chart_type == 'discount_vs_rating':
-            cursor.execute("""
-                SELECT brand, AVG(discount) as avg_discount, AVG(rating) as avg_rating
-                FROM cleaned_products
-                WHERE discount IS NOT NULL AND rating IS NOT NULL
-                GROUP BY brand
-                HAVING COUNT(*) > 5
-            """)
-            result = [{"x": round(row[1], 2), "y": round(row[2], 2), "label": row[0]} for row in cursor.fetchall()]
-
-        elif chart_type == 'best_discounted_high_rated':
-            cursor.execute("""
-                SELECT category, AVG(discount) as avg_discount
-                FROM cleaned_products
-                WHERE rating > 4 AND price < 1000
-                GROUP BY category
-                HAVING AVG(discount) > 30 AND COUNT(*) > 5
-                ORDER BY avg_discount DESC
-            """)
-            result = [{"label": row[0], "y": round(row[1], 2)} for row in cursor.fetchall()]
+            result = [{"x": round(row[1], 2), "y": round(row[2], 2), "label": row[0]} for row in rows]
 
         else:
-            result = {"error": "Invalid chart type"}
+            result = [{"label": row[0], "y": round(row[1], 2)} for row in rows]
 
-        cursor.close()
-        conn.close()
         return jsonify(result)
 
     except Exception as e:
         return jsonify({"error": str(e)})
 
+@app.route('/startup')
+def startup_report():
+    return jsonify(startup.REPORT)
+
+@app.route('/response_stats')
+def response_stats():
+    return jsonify(responses.RESPONSE_STATS.snapshot())
+
+@app.route('/memory_report')
+def memory_report():
+    return jsonify(dtypes.snapshot())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    body = metrics.render(metrics.response_counters(responses.RESPONSE_STATS.snapshot()))
+    return app.response_class(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/profiles')
+def list_profiles():
+    if not app.config['PROFILING_ENABLED']:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    try:
+        limit = max(1, int(request.args.get('top', 10)))
+    except ValueError:
+        return jsonify({'error': 'top must be an integer'})
+    return jsonify({'profiles': profiling.list_profiles(app.config['PROFILES_DIR'], limit)})
+
+@app.route('/dashboard_data')
+def dashboard_data():
+    try:
+        return jsonify(DASHBOARD.get())
+    except Exception as e:
+        return jsonify({"error": str(e)})
+
+def point_budget(data):
+    # A request may ask for fewer points than the configured budget, or for 0
+    # to get every point back.
+    try:
+        return int(data.get('max_points', app.config['SCATTER_POINT_BUDGET']))
+    except (TypeError, ValueError):
+        return app.config['SCATTER_POINT_BUDGET']
+
 @app.route('/run_regression', methods=['POST'])
+@TRAINING
 def run_regression():
     data = request.get_json()
     target = data.get('target')
@@ -145,42 +284,47 @@ def run_regression():
 
     try:
         query_cols = ', '.join([target] + features)
-        conn = mysql.connector.connect(**db_config)
+        conn = connect()
         query = f"""
             SELECT {query_cols}
             FROM cleaned_products
             WHERE {' AND '.join([f'{col} IS NOT NULL' for col in [target] + features])}
         """
-        df = pd.read_sql(query, conn)
+        df = read_frame(conn, query)
         conn.close()
 
         if df.empty or len(df) < 10:
             return jsonify({'error': 'Not enough data available for selected columns'})
             
-        X, y = ml.preprocess_data(df, target, features)
+        with metrics.stage('preprocess'):
+            X, y = ml.preprocess_data(df, target, features, outlier_sketches())
         
         if len(X) < 10:
             return jsonify({'error': 'Not enough data left after preprocessing'})
             
-        model_data = ml.train_model(X, y, technique)
+        with metrics.stage('fit'):
+            model_data = ml.train_model(X, y, technique)
         
         model_id = f"{target}_{'-'.join(features)}_{technique}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
         ml.save_model(model_data, target, features, technique, model_id)
         
-        app.config['LATEST_MODEL_ID'] = model_id
-        app.config['LATEST_MODEL_DATA'] = {
+        MODEL_REGISTRY.publish(model_owner(), 'regression', model_id, {
             'pipeline': model_data['pipeline'],
             'features': features,
             'target': target,
-            'technique': technique
-        }
+            'technique': technique,
+            'r2': model_data['r2']
+        })
 
+        # r2 comes from the full test split; only the plotted points are thinned.
+        points = payload.regression_points(model_data, point_budget(data))
         return jsonify({
             'features': features,
-            'train_actual': model_data['train_actual'].tolist(),
-            'train_pred': model_data['train_pred'].tolist(),
-            'test_actual': model_data['test_actual'].tolist(),
-            'test_pred': model_data['test_pred'].tolist(),
+            'train_actual': points['train'][0],
+            'train_pred': points['train'][1],
+            'test_actual': points['test'][0],
+            'test_pred': points['test'][1],
+            'points': {'train': points['train'][2], 'test': points['test'][2]},
             'r2': model_data['r2'],
             'model_id': model_id
         })
@@ -201,30 +345,20 @@ def predict():
         return jsonify({'error': 'Missing required parameters'})
     
     try:
-        model_id = data.get('model_id') or app.config.get('LATEST_MODEL_ID')
+        model_id = data.get('model_id') or MODEL_REGISTRY.latest(model_owner(), 'regression')
+        if not model_id:
+            return jsonify({'error': 'No trained model available'})
         
-        if not model_id or 'LATEST_MODEL_DATA' in app.config:
-            model_data = app.config.get('LATEST_MODEL_DATA')
-            
-            if not model_data:
-                return jsonify({'error': 'No trained model available'})
-            
-            missing_features = [f for f in model_data['features'] if f not in inputs]
-            if missing_features:
-                return jsonify({'error': f'Missing features: {", ".join(missing_features)}'})
-            
-            prediction = ml.predict(inputs, model_data)
-            
-        else:
-            model_data = ml.load_model(model_id)
-            
-            if not model_data:
-                return jsonify({'error': 'Model not found'})
-            
-            missing_features = [f for f in model_data['features'] if f not in inputs]
-            if missing_features:
-                return jsonify({'error': f'Missing features: {", ".join(missing_features)}'})
-            
+        model_data, source = MODEL_REGISTRY.get(model_id)
+        if not model_data:
+            return jsonify({'error': 'Model not found'})
+        metrics.model_load('regression', source)
+        
+        missing_features = [f for f in model_data['features'] if f not in inputs]
+        if missing_features:
+            return jsonify({'error': f'Missing features: {", ".join(missing_features)}'})
+        
+        with metrics.stage('predict'):
             prediction = ml.predict(inputs, model_data)
         
         return jsonify({
@@ -235,48 +369,176 @@ def predict():
     except Exception as e:
         return jsonify({'error': f'Prediction error: {str(e)}'})
 
+@app.route('/refresh_model', methods=['POST'])
+@TRAINING
+def refresh_model():
+    data = request.get_json()
+    model_id = data.get('model_id')
+    kind = data.get('kind', 'regression')
+    target = data.get('target')
+    features = data.get('features')
+
+    try:
+        if model_id:
+            model_data = ml.load_model(model_id)
+            metrics.model_load('incremental', 'disk')
+            
+            if not model_data or 'watermark' not in model_data:
+                return jsonify({'error': 'Model not found or not trained incrementally'})
+            
+            kind = model_data['kind']
+            target = model_data['target']
+            features = model_data['features']
+        elif kind not in ('regression', 'classification') or not features or (kind == 'regression' and not target):
+            return jsonify({'error': 'Please select both target and feature variables'})
+        elif kind == 'classification':
+            target = 'price_category'
+        
+        columns = [target] + features if kind == 'regression' else features + ['price']
+        columns = list(dict.fromkeys(col for col in columns if col != 'id'))
+        conditions = [f'{col} IS NOT NULL' for col in columns]
+        params = None
+        
+        if model_id and model_data['watermark']:
+            conditions.append('updated_at >= %s')
+            params = (model_data['watermark'],)
+        
+        conn = connect()
+        query = f"""
+            SELECT id, updated_at, {', '.join(columns)}
+            FROM cleaned_products
+            WHERE {' AND '.join(conditions)}
+        """
+        df = read_frame(conn, query, params)
+        conn.close()
+
+        if not model_id and len(df) < 10:
+            return jsonify({'error': 'Not enough data available for selected columns'})
+        
+        with metrics.stage('fit'):
+            if kind == 'regression':
+                if model_id:
+                    model_data = ml.update_incremental_model(model_data, df)
+                else:
+                    model_data = ml.train_incremental_model(df, target, features)
+            else:
+                if model_id:
+                    model_data = ml.update_incremental_classification_model(model_data, df)
+                else:
+                    model_data = ml.train_incremental_classification_model(df, features)
+        
+        new_model_id = f"{target}_{'-'.join(features)}_{model_data['technique']}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        ml.save_incremental_model(model_data, new_model_id)
+        
+        MODEL_REGISTRY.publish(model_owner(), kind, new_model_id, model_data)
+
+        return jsonify({
+            'model_id': new_model_id,
+            'previous_model_id': model_id,
+            'kind': kind,
+            'target': target,
+            'features': features,
+            'rows_fetched': len(df),
+            'rows_added': model_data['rows_added'],
+            'holdout_size': len(model_data['holdout']),
+            'watermark': model_data['watermark'],
+            'r2': model_data.get('r2'),
+            'accuracy': model_data.get('accuracy'),
+            'precision': model_data.get('precision'),
+            'recall': model_data.get('recall')
+        })
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Error during model refresh: {str(e)}'})
+
+@app.route('/run_sweep', methods=['POST'])
+@TRAINING
+def run_sweep():
+    data = request.get_json()
+    specs = data.get('specs')
+    max_workers = data.get('max_workers')
+
+    if not specs:
+        return jsonify({'error': 'Please provide at least one model spec'})
+    if len(specs) > sweep.MAX_SPECS:
+        return jsonify({'error': f'At most {sweep.MAX_SPECS} model specs per sweep'})
+
+    for i, spec in enumerate(specs):
+        error = sweep.validate_spec(spec)
+        if error:
+            return jsonify({'error': f'Spec {i}: {error}'})
+
+    try:
+        started = datetime.now()
+        conn = connect()
+        query = f"""
+            SELECT {', '.join(sweep.sweep_columns(specs))}
+            FROM cleaned_products
+        """
+        df = read_frame(conn, query)
+        conn.close()
+
+        if df.empty or len(df) < 10:
+            return jsonify({'error': 'Not enough data available for selected columns'})
+
+        load_seconds = (datetime.now() - started).total_seconds()
+        with metrics.stage('fit'):
+            result = sweep.run_sweep(df, specs, max_workers)
+        result.update({
+            'rows_loaded': len(df),
+            'load_seconds': load_seconds,
+            'total_seconds': (datetime.now() - started).total_seconds()
+        })
+
+        return jsonify(result)
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Error during sweep: {str(e)}'})
+
 @app.route('/models', methods=['GET'])
 def list_models():
     try:
         models = []
-        for filename in os.listdir(ml.MODELS_DIR):
-            if filename.endswith('.pkl'):
-                model_data = ml.load_model(filename.replace('.pkl', ''))
-                if model_data:
-                    models.append({
-                        'id': filename.replace('.pkl', ''),
-                        'target': model_data['target'],
-                        'features': model_data['features'],
-                        'technique': model_data.get('technique', 'linear'),
-                        'r2': model_data['r2']
-                    })
+        for model_id in ml.list_model_ids():
+            model_data = ml.load_model_metadata(model_id)
+            if model_data and 'r2' in model_data:
+                models.append({
+                    'id': model_id,
+                    'target': model_data['target'],
+                    'features': model_data['features'],
+                    'technique': model_data.get('technique', 'linear'),
+                    'r2': model_data['r2']
+                })
         return jsonify({'models': models})
     except Exception as e:
         return jsonify({'error': str(e)})
 
 @app.route('/run_classification', methods=['POST'])
+@TRAINING
 def run_classification():
     data = request.get_json()
     target = data.get('target')
     features = data.get('features')
     technique = data.get('technique', 'decision_tree')  
+    brand_encoding = data.get('brand_encoding', 'onehot')
 
     if not target or not features:
         return jsonify({'error': 'Please select both target and feature variables'})
 
+    if brand_encoding not in ml.BRAND_ENCODINGS:
+        return jsonify({'error': 'Invalid brand encoding'})
+
     try:
         if target == 'brand_popularity':
             query_cols = ['brand'] + features
             query_cols = [col for col in query_cols if col != 'id']  
             
-            conn = mysql.connector.connect(**db_config)
-            query = f"""
-                SELECT {', '.join(query_cols)}, COUNT(*) as id
-                FROM cleaned_products
-                GROUP BY {', '.join(query_cols)}
-                HAVING COUNT(*) > 1
-            """
-            df = pd.read_sql(query, conn)
+            conn = connect()
+            df = read_frame(conn, brand_popularity_query(query_cols))
             conn.close()
             
             if df.empty or len(df) < 10:
@@ -285,72 +547,54 @@ def run_classification():
             if 'id' in features and 'id' not in df.columns:
                 return jsonify({'error': 'id feature selected but not available in data'})
             
-            df['rank'] = df['id'].rank(method='first')
-            total_rows = len(df)
-            df['brand_popularity'] = pd.cut(
-                df['rank'], 
-                bins=[0, total_rows/3, 2*total_rows/3, total_rows+1],
-                labels=['Low', 'Medium', 'High'],
-                include_lowest=True
-            )
+            df['brand_popularity'] = ml.rank_tertiles(df['id'])
             
         elif target == 'price_category':
             query_cols = features.copy()
             if 'brand' in query_cols:
                 query_cols = [col for col in query_cols if col != 'brand'] + ['brand']
                 
-            conn = mysql.connector.connect(**db_config)
+            conn = connect()
             query = f"""
                 SELECT {', '.join(query_cols)}, price
                 FROM cleaned_products
             """
-            df = pd.read_sql(query, conn)
+            df = read_frame(conn, query)
             conn.close()
             
             if df.empty or len(df) < 10:
                 return jsonify({'error': 'Not enough data available for selected columns'})
             
-            df['rank'] = df['price'].rank(method='first')
-            total_rows = len(df)
-            df['price_category'] = pd.cut(
-                df['rank'], 
-                bins=[0, total_rows/3, 2*total_rows/3, total_rows+1],
-                labels=['Low', 'Medium', 'High'],
-                include_lowest=True
-            )
+            df['price_category'] = ml.rank_tertiles(df['price'])
         else:
             return jsonify({'error': 'Invalid target variable'})
 
-        X, y, classes = ml.preprocess_classification_data(df, target, features)
+        with metrics.stage('preprocess'):
+            X, y, classes = ml.preprocess_classification_data(df, target, features, outlier_sketches() if target == 'price_category' else None)
         
         if len(X) < 10:
             return jsonify({'error': 'Not enough data left after preprocessing'})
             
-        model_data = ml.train_classification_model(X, y, classes, technique)
+        with metrics.stage('fit'):
+            model_data = ml.train_classification_model(X, y, classes, technique, brand_encoding)
         
         model_id = f"{target}_{'-'.join(features)}_{technique}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
         ml.save_classification_model(model_data, target, features, technique, model_id, classes)
         
-        app.config['LATEST_CLASS_MODEL_ID'] = model_id
-        app.config['LATEST_CLASS_MODEL_DATA'] = {
+        MODEL_REGISTRY.publish(model_owner(), 'classification', model_id, {
             'pipeline': model_data['pipeline'],
             'features': features,
             'target': target,
             'technique': technique,
             'classes': classes
-        }
+        })
 
-        confusion_matrix_data = []
         cm = model_data['confusion_matrix']
-        
-        class_labels = classes
-        for i in range(len(class_labels)):
-            for j in range(len(class_labels)):
-                confusion_matrix_data.append({
-                    'label': f'Actual: {class_labels[i]}, Predicted: {class_labels[j]}',
-                    'y': int(cm[i, j]),
-                    'color': '#563d7c' if i == j else '#8e79b8'
-                })
+        actual, predicted = np.indices(cm.shape)
+        confusion_matrix_data = [
+            {'label': f'Actual: {classes[i]}, Predicted: {classes[j]}', 'y': count, 'color': '#563d7c' if i == j else '#8e79b8'}
+            for i, j, count in zip(actual.ravel().tolist(), predicted.ravel().tolist(), cm.ravel().tolist())
+        ]
 
         return jsonify({
             'features': features,
@@ -379,30 +623,20 @@ def predict_class():
         return jsonify({'error': 'Missing required parameters'})
     
     try:
-        model_id = data.get('model_id') or app.config.get('LATEST_CLASS_MODEL_ID')
+        model_id = data.get('model_id') or MODEL_REGISTRY.latest(model_owner(), 'classification')
+        if not model_id:
+            return jsonify({'error': 'No trained model available'})
         
-        if not model_id or 'LATEST_CLASS_MODEL_DATA' in app.config:
-            model_data = app.config.get('LATEST_CLASS_MODEL_DATA')
-            
-            if not model_data:
-                return jsonify({'error': 'No trained model available'})
-            
-            missing_features = [f for f in model_data['features'] if f not in inputs]
-            if missing_features:
-                return jsonify({'error': f'Missing features: {", ".join(missing_features)}'})
-            
-            prediction = ml.predict_class(inputs, model_data)
-            
-        else:
-            model_data = ml.load_classification_model(model_id)
-            
-            if not model_data:
-                return jsonify({'error': 'Model not found'})
-            
-            missing_features = [f for f in model_data['features'] if f not in inputs]
-            if missing_features:
-                return jsonify({'error': f'Missing features: {", ".join(missing_features)}'})
-            
+        model_data, source = MODEL_REGISTRY.get(model_id)
+        if not model_data:
+            return jsonify({'error': 'Model not found'})
+        metrics.model_load('classification', source)
+        
+        missing_features = [f for f in model_data['features'] if f not in inputs]
+        if missing_features:
+            return jsonify({'error': f'Missing features: {", ".join(missing_features)}'})
+        
+        with metrics.stage('predict'):
             prediction = ml.predict_class(inputs, model_data)
         
         return jsonify({
@@ -418,21 +652,82 @@ def predict_class():
 @app.route('/get_brands', methods=['GET'])
 def get_brands():
     try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT DISTINCT brand FROM cleaned_products
-            ORDER BY brand
-            LIMIT 100
-        """)
-        brands = [row[0] for row in cursor.fetchall()]
-        cursor.close()
-        conn.close()
-        return jsonify({'brands': brands})
+        BRAND_INDEX.refresh()
+        page = BRAND_INDEX.search(request.args.get('q', ''), limit=MAX_LIMIT)
+        return jsonify({'brands': [entry['brand'] for entry in page['brands']]})
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@app.route('/search_brands', methods=['GET'])
+def search_brands():
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(MAX_LIMIT, max(1, int(request.args.get('limit', DEFAULT_LIMIT))))
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'})
+
+    try:
+        BRAND_INDEX.refresh()
+        return jsonify(BRAND_INDEX.search(request.args.get('q', ''), offset, limit))
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+def window_days():
+    return min(history.MAX_WINDOW_DAYS, max(1, int(request.args.get('days', history.DEFAULT_WINDOW_DAYS))))
+
+@app.route('/trends/price_changes', methods=['GET'])
+def price_changes():
+    # Daily price/discount changes for one category or brand, or overall.
+    group_by = request.args.get('group_by')
+    value = request.args.get('value')
+    if group_by and group_by not in history.GROUP_COLUMNS:
+        return jsonify({'error': f"group_by must be one of {', '.join(history.GROUP_COLUMNS)}"})
+    if group_by and not value:
+        return jsonify({'error': 'Please provide a value for group_by'})
+    try:
+        days = window_days()
+    except ValueError:
+        return jsonify({'error': 'days must be an integer'})
+
+    try:
+        conn = READ_POOL.connect()
+        try:
+            with metrics.stage('query'):
+                cursor = conn.cursor()
+                series = history.price_change_series(cursor, history.window_start(days), group_by, value)
+                cursor.close()
+        finally:
+            conn.close()
+        return jsonify({'group_by': group_by, 'value': value, 'days': days, 'series': series})
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@app.route('/trends/discount_movers', methods=['GET'])
+def discount_movers():
+    direction = request.args.get('direction', 'both')
+    if direction not in ('up', 'down', 'both'):
+        return jsonify({'error': 'direction must be up, down or both'})
+    try:
+        days = window_days()
+        limit = min(history.MAX_MOVERS, max(1, int(request.args.get('limit', history.DEFAULT_MOVERS))))
+    except ValueError:
+        return jsonify({'error': 'days and limit must be integers'})
+
+    try:
+        conn = READ_POOL.connect()
+        try:
+            with metrics.stage('query'):
+                cursor = conn.cursor()
+                movers = history.discount_movers(cursor, history.window_start(days), limit, direction, request.args.get('category'), request.args.get('brand'))
+                cursor.close()
+        finally:
+            conn.close()
+        return jsonify({'days': days, 'direction': direction, 'movers': movers})
     except Exception as e:
         return jsonify({'error': str(e)})
 
 @app.route('/run_clustering', methods=['POST'])
+@TRAINING
 def run_clustering():
     data = request.get_json()
     group_by = data.get('group_by')  
@@ -446,34 +741,22 @@ def run_clustering():
     if len(features) < 2:
         return jsonify({'error': 'Please select at least 2 features'})
     
-    feature_map = {
-        'price': 'AVG(price) AS avg_price',
-        'discount': 'AVG(discount) AS avg_discount',
-        'rating': 'AVG(rating) AS avg_rating'
-    }
-    
     try:
-        conn = mysql.connector.connect(**db_config)
-        query = f"""
-            SELECT 
-                {group_by},
-                {', '.join([feature_map[f] for f in features])}
-            FROM cleaned_products
-            WHERE {group_by} IS NOT NULL
-            GROUP BY {group_by}
-            HAVING COUNT(*) > 5
-        """
-        df = pd.read_sql(query, conn)
+        conn = connect()
+        query = clustering_query(group_by, features)
+        df = read_frame(conn, query)
         conn.close()
         
         if df.empty or len(df) < 2:
             return jsonify({'error': 'Not enough data available for clustering analysis'})
         
         db_features = [f'avg_{f}' for f in features]
-        X_scaled, df_clean, scaler = ml.preprocess_clustering_data(df, db_features)
+        with metrics.stage('preprocess'):
+            X_scaled, df_clean, scaler = ml.preprocess_clustering_data(df, db_features)
         
         if n_clusters <= 0:
-            optimal_clusters_data = ml.find_optimal_clusters(X_scaled, max_clusters=10, technique=technique)
+            with metrics.stage('fit'):
+                optimal_clusters_data = ml.find_optimal_clusters(X_scaled, max_clusters=10, technique=technique)
             n_clusters = optimal_clusters_data['optimal_clusters']
             
             elbow_data = []
@@ -499,42 +782,30 @@ def run_clustering():
             elbow_data = []
             silhouette_data = []
         
-        if technique == 'kmeans':
-            model_data = ml.run_kmeans_clustering(X_scaled, n_clusters)
-        elif technique == 'hierarchical':
-            model_data = ml.run_hierarchical_clustering(X_scaled, n_clusters)
-        else:
+        if technique not in ('kmeans', 'hierarchical'):
             return jsonify({'error': 'Invalid clustering technique'})
         
+        with metrics.stage('fit'):
+            if technique == 'kmeans':
+                model_data = ml.run_kmeans_clustering(X_scaled, n_clusters)
+            else:
+                model_data = ml.run_hierarchical_clustering(X_scaled, n_clusters)
+        
         df_clean['cluster'] = model_data['labels']
         
         centroids_orig = scaler.inverse_transform(model_data['centroids'])
         
-        scatter_data = []
-        for i, row in df_clean.iterrows():
-            point_data = {
-                'name': row[group_by],
-                'cluster': int(row['cluster'])
-            }
-            
-            for feature in features:
-                feature_key = f'avg_{feature}'
-                if feature_key in row:
-                    point_data[feature] = float(row[feature_key])
-            
-            scatter_data.append(point_data)
+        # Keep the points farthest from their centroid and thin the rest per
+        # cluster; silhouette_score above is computed on every group.
+        budget = point_budget(data)
+        distances = np.linalg.norm(X_scaled - model_data['centroids'][model_data['labels']], axis=1)
+        keep, outliers = payload.downsample(X_scaled[:, 0], X_scaled[:, 1], budget, scores=distances, strata=model_data['labels'])
         
-        centroids = []
-        for i, centroid in enumerate(centroids_orig):
-            centroid_data = {
-                'cluster': i,
-                'isCentroid': True
-            }
-            
-            for j, feature in enumerate(features):
-                centroid_data[feature] = float(centroid[j])
-            
-            centroids.append(centroid_data)
+        columns = {group_by: 'name', 'cluster': 'cluster'}
+        columns.update({f'avg_{feature}': feature for feature in features if f'avg_{feature}' in df_clean.columns})
+        scatter_data = df_clean.iloc[keep][list(columns)].rename(columns=columns).astype({feature: float for feature in list(columns.values())[2:]})
+        
+        centroids = pd.DataFrame(centroids_orig, columns=features).assign(cluster=np.arange(len(centroids_orig)), isCentroid=True)
             
         return jsonify({
             'silhouette_score': float(model_data['silhouette_score']),
@@ -545,6 +816,7 @@ def run_clustering():
             'technique': technique,
             'elbow_data': elbow_data,
             'silhouette_data': silhouette_data,
+            'points': payload.point_counts(len(df_clean), len(keep), budget, outliers),
             'model_id': f"cluster_{group_by}_{technique}_{datetime.now().strftime('%Y%m%d%H%M%S')}",
             'features': features  
         })
@@ -554,5 +826,22 @@ def run_clustering():
         traceback.print_exc()
         return jsonify({'error': f'Error during clustering: {str(e)}'})
 
+def prewarm_tasks():
+    return [
+        ('imports', ml.warm_imports),
+        ('data_version', lambda: BRAND_INDEX.refresh(force=True)),
+        ('dashboard', DASHBOARD.get),
+        ('models', lambda: MODEL_REGISTRY.warm(MODEL_REGISTRY.latest_ids() + startup.recent_model_ids(MODELS_DIR, app.config['PREWARM_MODELS'])))
+    ]
+
+def start_prewarm():
+    # Called per worker after fork (see gunicorn.conf.py) or from __main__;
+    # threads started before a fork do not survive it.
+    if app.config['PREWARM_ENABLED']:
+        return startup.start_prewarm(prewarm_tasks())
+
+startup.mark_imported()
+
 if __name__ == '__main__':
+    start_prewarm()
     app.run(debug=True)
\ No newline at end of file
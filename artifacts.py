@@ -0,0 +1,142 @@
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+
+MAGIC = b'PSTAMDL\x00'
+FORMAT_VERSION = 1
+ARTIFACT_EXT = '.mdl'
+LEGACY_EXT = '.pkl'
+
+# Arrays smaller than this stay inside the pickle payload, larger ones are
+# written as aligned raw blocks after it so they can be mapped in place.
+INLINE_BUFFER_LIMIT = 4096
+ALIGNMENT = 64
+
+PREAMBLE = struct.Struct('<8sII')
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _json_value(value):
+    if isinstance(value, (str, bool)) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value) if isinstance(value, float) else int(value)
+    if isinstance(value, (list, tuple)) and all(isinstance(v, (str, int, float)) for v in value):
+        return [_json_value(v) for v in value]
+    if hasattr(value, 'item') and getattr(value, 'ndim', None) == 0:
+        return value.item()
+    raise TypeError
+
+def artifact_metadata(model_data):
+    metadata = {}
+    for key, value in model_data.items():
+        try:
+            metadata[key] = _json_value(value)
+        except TypeError:
+            continue
+    return metadata
+
+def save_artifact(path, model_data):
+    buffers = []
+
+    def collect(buffer):
+        if buffer.raw().nbytes <= INLINE_BUFFER_LIMIT:
+            return True
+        buffers.append(buffer)
+        return False
+
+    payload = pickle.dumps(model_data, protocol=5, buffer_callback=collect)
+
+    blocks = []
+    offset = _align(len(payload))
+    for buffer in buffers:
+        raw = buffer.raw()
+        blocks.append([offset, raw.nbytes])
+        offset = _align(offset + raw.nbytes)
+
+    header = json.dumps({
+        'format_version': FORMAT_VERSION,
+        'metadata': artifact_metadata(model_data),
+        'payload': [0, len(payload)],
+        'buffers': blocks
+    }).encode('utf-8')
+    data_start = _align(PREAMBLE.size + len(header))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.seek(data_start)
+        f.write(payload)
+        for buffer, (block_offset, _) in zip(buffers, blocks):
+            f.seek(data_start + block_offset)
+            f.write(buffer.raw())
+    os.replace(tmp_path, path)
+
+    return path
+
+def _read_header(f):
+    magic, version, header_len = PREAMBLE.unpack(f.read(PREAMBLE.size))
+    if magic != MAGIC:
+        raise ValueError('Not a model artifact')
+    if version > FORMAT_VERSION:
+        raise ValueError(f'Unsupported artifact format version {version}')
+    header = json.loads(f.read(header_len).decode('utf-8'))
+    header['data_start'] = _align(PREAMBLE.size + header_len)
+    return header
+
+def read_artifact_metadata(path):
+    with open(path, 'rb') as f:
+        return _read_header(f)['metadata']
+
+def load_artifact(path):
+    with open(path, 'rb') as f:
+        header = _read_header(f)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    # NumPy rebuilds the large arrays as read-only views over the mapping, so
+    # pages are only read on first touch and are shared between processes
+    # through the page cache.
+    view = memoryview(mapped)
+    start = header['data_start']
+    payload_offset, payload_len = header['payload']
+    buffers = [view[start + offset:start + offset + length] for offset, length in header['buffers']]
+
+    return pickle.loads(view[start + payload_offset:start + payload_offset + payload_len], buffers=buffers)
+
+def convert_pickle(models_dir, model_id, remove=False):
+    pkl_path = os.path.join(models_dir, f"{model_id}{LEGACY_EXT}")
+    with open(pkl_path, 'rb') as f:
+        model_data = pickle.load(f)
+
+    save_artifact(os.path.join(models_dir, f"{model_id}{ARTIFACT_EXT}"), model_data)
+
+    if remove:
+        os.remove(pkl_path)
+
+    return model_id
+
+def main(argv):
+    import ml
+
+    remove = '--remove' in argv
+    model_ids = [arg for arg in argv if not arg.startswith('--')]
+    if not model_ids:
+        model_ids = [f[:-len(LEGACY_EXT)] for f in sorted(os.listdir(ml.MODELS_DIR)) if f.endswith(LEGACY_EXT)]
+
+    converted = 0
+    for model_id in model_ids:
+        try:
+            convert_pickle(ml.MODELS_DIR, model_id, remove)
+            converted += 1
+        except Exception as e:
+            print(f"Error converting {model_id}: {str(e)}")
+
+    print(f"Converted {converted} of {len(model_ids)} models")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
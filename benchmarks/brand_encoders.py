@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ml
+
+def make_brand_frame(n_rows, n_brands, seed=42):
+    rng = np.random.default_rng(seed)
+    # Zipf-like brand popularity, as in the scraped catalogue a few brands
+    # dominate and a long tail appears only a handful of times.
+    weights = 1.0 / np.arange(1, n_brands + 1) ** 1.1
+    brand_ids = rng.choice(n_brands, size=n_rows, p=weights / weights.sum())
+    brand_level = rng.lognormal(6.5, 0.6, n_brands)
+
+    original_price = brand_level[brand_ids] * rng.lognormal(0, 0.3, n_rows)
+    discount = rng.uniform(0, 70, n_rows).round(0)
+    price = original_price * (1 - discount / 100)
+    df = pd.DataFrame({
+        'brand': [f'Brand {i}' for i in brand_ids],
+        'discount': discount,
+        'rating': rng.uniform(3, 5, n_rows).round(1),
+        'price': price
+    })
+    df['price_category'] = pd.qcut(df['price'].rank(method='first'), 3, labels=['Low', 'Medium', 'High'])
+    return df
+
+def run(n_rows, n_brands, technique, encodings):
+    df = make_brand_frame(n_rows, n_brands)
+    X, y, classes = ml.preprocess_classification_data(df, 'price_category', ['brand', 'discount', 'rating'])
+
+    results = []
+    for brand_encoding in encodings:
+        tracemalloc.start()
+        start = time.perf_counter()
+        model_data = ml.train_classification_model(X, y, classes, technique, brand_encoding)
+        fit_seconds = time.perf_counter() - start
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results.append({
+            'brand_encoding': brand_encoding,
+            'technique': technique,
+            'rows': n_rows,
+            'brands': n_brands,
+            'fit_seconds': round(fit_seconds, 3),
+            'peak_mb': round(peak_bytes / 2 ** 20, 1),
+            'accuracy': round(float(model_data['accuracy']), 4)
+        })
+        print(f"{brand_encoding:>14}: fit {fit_seconds:.2f}s, peak {peak_bytes / 2 ** 20:.1f} MB, accuracy {model_data['accuracy']:.4f}")
+
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare brand encoders against the one-hot baseline')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--brands', type=int, default=3000)
+    parser.add_argument('--technique', default='decision_tree', choices=['decision_tree', 'svm'])
+    parser.add_argument('--encodings', nargs='+', default=ml.BRAND_ENCODINGS)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    results = run(args.rows, args.brands, args.technique, args.encodings)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,115 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fakedb
+from crawler import Crawler, CrawlState
+from fixtures.server import serve_fixtures
+from product_scrape import BrowserFetcher, FETCHERS, MyntraScraper
+
+# Subcategories backed by files in fixtures/listing; each has two pages so a
+# three-page crawl also exercises the end-of-listing path.
+FIXTURE_CATEGORY_MAP = {
+    "Topwear": {"T-Shirts": "/men-tshirts"},
+    "Footwear": {"Sports Shoes": "/men-sports-shoes"},
+    "Sports & Active Wear": {"Sports Shoes": "/men-sports-shoes"},
+    "Gadgets": {"Smart Wearables": "/smart-wearables", "Fitness Gadgets": "/smart-wearables"}
+}
+
+class FlakyScraper(MyntraScraper):
+    # Fails the first attempt at the first page fetched, so one worker waits
+    # out a retry backoff while the others drain the rest of the queue.
+    # Records how many crawler workers are still running when the retry
+    # comes round.
+    lock = threading.Lock()
+    flaky_page = None
+    workers_at_retry = []
+
+    def scrape_page(self, url, page, targets):
+        with self.lock:
+            first = FlakyScraper.flaky_page is None
+            if first:
+                FlakyScraper.flaky_page = (url, page)
+        if first:
+            raise RuntimeError('flaky fixture page')
+        if (url, page) == FlakyScraper.flaky_page:
+            self.workers_at_retry.append(sum(thread.name.startswith('crawler-') and thread.is_alive() for thread in threading.enumerate()))
+        return super().scrape_page(url, page, targets)
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl the local fixture listings end to end into an SQLite stand-in')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--max-pages', type=int, default=3)
+    parser.add_argument('--fetcher', choices=sorted(FETCHERS), default='browser')
+    parser.add_argument('--interrupt-after', type=int, default=0, help='stop the first crawl after this many pages, then resume it')
+    parser.add_argument('--flaky', action='store_true', help='fail the first page once and check that no worker quits during its retry backoff')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='crawl_')
+    db_path = os.path.join(work_dir, 'myntradb.sqlite')
+    fakedb.install(db_path)
+    server, base_url = serve_fixtures()
+    BrowserFetcher.SETTLE_SECONDS = 0
+    state = CrawlState(os.path.join(work_dir, 'crawl_state.sqlite'))
+
+    def make_crawler(resume):
+        return Crawler(
+            category_map=FIXTURE_CATEGORY_MAP,
+            workers=args.workers,
+            max_pages=args.max_pages,
+            min_interval=0.1,
+            max_retries=1,
+            scraper_factory=lambda: (FlakyScraper if args.flaky else MyntraScraper)(headless=True, base_url=base_url, fetcher=args.fetcher, history_tables=False),
+            state=state,
+            resume=resume
+        )
+
+    try:
+        crawler = make_crawler(resume=False)
+        if args.interrupt_after:
+            def stop_after_pages():
+                while crawler.stats['pages'] < args.interrupt_after and not crawler.stop_event.is_set():
+                    time.sleep(0.01)
+                crawler.stop()
+            threading.Thread(target=stop_after_pages, daemon=True).start()
+        stats = crawler.run()
+        fetched = stats['pages']
+
+        if stats['interrupted']:
+            print(f"First crawl interrupted after {stats['pages']} pages: {stats}")
+            stats = make_crawler(resume=True).run()
+            fetched += stats['pages']
+    finally:
+        server.shutdown()
+        state.close()
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT category, subcategory, COUNT(*) FROM myntra_products GROUP BY category, subcategory ORDER BY category, subcategory").fetchall()
+    conn.close()
+
+    print(stats)
+    for category, subcategory, count in rows:
+        print(f"{category} > {subcategory}: {count} products")
+
+    expected = {(c, s) for c, subs in FIXTURE_CATEGORY_MAP.items() for s in subs}
+    missing = expected - {(c, s) for c, s, _ in rows}
+    # Each unique listing URL has two fixture pages and must be fetched once.
+    unique_pages = 2 * len({url for subs in FIXTURE_CATEGORY_MAP.values() for url in subs.values()})
+    print(f"Fetched {fetched} listing pages for {unique_pages} unique pages")
+    idle_exit = False
+    if args.flaky:
+        print(f"Crawler workers running when each retry came round: {FlakyScraper.workers_at_retry} (of {args.workers})")
+        idle_exit = min(FlakyScraper.workers_at_retry, default=0) < args.workers
+    if missing or stats['failed'] or fetched != unique_pages or idle_exit:
+        print(f"Missing subcategories: {sorted(missing)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mysql.connector
+
+import fakedb
+import schema
+from synthetic import cleaned_products_frame, generate_products
+
+def points(chart):
+    # Order-insensitive view of a chart; ties in ORDER BY may come back in any
+    # order from SQL, and averages are compared at the 2-decimal rounding.
+    if isinstance(chart, dict):
+        return {key: points(value) for key, value in chart.items()}
+    return sorted((str(p.get('label')), round(p.get('x', 0), 1), round(p['y'], 1)) for p in chart)
+
+def main():
+    parser = argparse.ArgumentParser(description='Time /dashboard_data against eight /get_data calls on synthetic data')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='dashboard_'), 'myntradb.sqlite')
+    frame = cleaned_products_frame(generate_products(args.rows))
+    frame['updated_at'] = '2024-01-01 00:00:00'
+    fakedb.load_table(path, 'cleaned_products', frame, if_exists='replace')
+    fakedb.install(path)
+
+    conn = mysql.connector.connect()
+    cursor = conn.cursor()
+    schema.ensure_indexes(cursor)
+    conn.commit()
+    conn.close()
+
+    import app
+    client = app.app.test_client()
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        separate = {chart: client.get(f'/get_data?type={chart}').get_json() for chart in app.CHART_QUERIES}
+    separate_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+    started = time.perf_counter()
+    payload = client.get('/dashboard_data').get_json()
+    cold_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        client.get('/dashboard_data').get_json()
+    warm_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+    print(f"{args.rows} rows")
+    print(f"8 x /get_data             {separate_ms:9.1f} ms")
+    print(f"/dashboard_data (cold)    {cold_ms:9.1f} ms  (frame load + aggregation {payload['build_seconds'] * 1000:.1f} ms)")
+    print(f"/dashboard_data (cached)  {warm_ms:9.1f} ms")
+
+    mismatched = [chart for chart in app.CHART_QUERIES
+                  if chart != 'correlation_features' and points(separate[chart]) != points(payload['charts'][chart])]
+    if len(payload['charts']['correlation_features']) != len(separate['correlation_features']):
+        mismatched.append('correlation_features')
+    if mismatched:
+        print(f"Charts differ from /get_data: {', '.join(mismatched)}")
+        sys.exit(1)
+    print("All eight charts match /get_data")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import dtypes
+import fakedb
+from synthetic import cleaned_products_frame, generate_products, myntra_products_frame
+
+RUNS = [
+    ('/run_regression', {'target': 'price', 'features': ['original_price', 'discount', 'rating'], 'technique': 'linear'}),
+    ('/run_regression', {'target': 'rating', 'features': ['price', 'discount'], 'technique': 'linear'}),
+    ('/run_classification', {'target': 'price_category', 'features': ['discount', 'rating', 'brand'], 'technique': 'decision_tree'}),
+    ('/run_classification', {'target': 'price_category', 'features': ['discount', 'rating', 'brand'], 'technique': 'decision_tree', 'brand_encoding': 'target'}),
+    ('/run_classification', {'target': 'brand_popularity', 'features': ['price', 'rating'], 'technique': 'decision_tree'}),
+    ('/run_clustering', {'group_by': 'brand', 'features': ['price', 'discount', 'rating'], 'technique': 'kmeans', 'n_clusters': 0}),
+    ('/run_clustering', {'group_by': 'subcategory', 'features': ['price', 'rating'], 'technique': 'hierarchical', 'n_clusters': 4}),
+]
+
+def scores(route, result):
+    if 'error' in result:
+        return {'error': result['error']}
+    if route == '/run_regression':
+        return {'r2': result['r2'], 'test_points': result['points']['test']['total']}
+    if route == '/run_classification':
+        return {name: result[name] for name in ('accuracy', 'precision', 'recall')}
+    clusters = {}
+    for point in result['scatter_data']:
+        clusters.setdefault(point['cluster'], set()).add(point['name'])
+    return {
+        'silhouette': [round(point['y'], 6) for point in result['silhouette_data']],
+        'points': result['points']['total'],
+        'clusters': sorted(sorted(members) for members in clusters.values())
+    }
+
+def difference(a, b):
+    # Largest absolute difference between two scores, inf if they differ in
+    # anything but float values.
+    if isinstance(a, float) and isinstance(b, float):
+        return abs(a - b)
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        return max([difference(x, y) for x, y in zip(a, b)], default=0.0)
+    return 0.0 if a == b else float('inf')
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory per load point and ML metrics with and without the dtype policy')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--tolerance', type=float, default=0.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='dtypes_')
+    path = os.path.join(workdir, 'myntradb.sqlite')
+    products = generate_products(args.rows)
+    frame = cleaned_products_frame(products)
+    frame['updated_at'] = '2024-01-01 00:00:00'
+    # cleaned_products' numeric columns are MySQL FLOATs: store what MySQL
+    # would keep and print for each value.
+    for col in dtypes.FLOAT_COLUMNS:
+        frame[col] = dtypes.decimal_float64(frame[col].astype('float32'))
+    fakedb.load_table(path, 'cleaned_products', frame, if_exists='replace')
+    fakedb.install(path)
+
+    # Model artifacts go under the temp directory, not the repo.
+    os.chdir(workdir)
+    import app
+    import preprocess
+    client = app.app.test_client()
+    failed = False
+
+    results = {}
+    for enabled in (False, True):
+        dtypes.ENABLED = enabled
+        results[enabled] = [scores(route, client.post(route, json=body).get_json()) for route, body in RUNS]
+        preprocessed = preprocess.preprocess_dataframe(myntra_products_frame(products))
+
+    print("Memory per load point:")
+    for label, report in dtypes.snapshot().items():
+        print(f"  {dtypes.format_report(label, report)}")
+
+    print("Metrics (policy off -> on):")
+    for (route, body), before, after in zip(RUNS, results[False], results[True]):
+        name = f"{route} {body.get('target', body.get('group_by'))} {body['technique']} {body.get('brand_encoding', '')}".strip()
+        diffs = {key: difference(before[key], after.get(key)) for key in before}
+        changed = [key for key, diff in diffs.items() if diff > args.tolerance]
+        shown = {key: value for key, value in after.items() if key != 'clusters'}
+        print(f"  {name}: {shown} max diff {max(diffs.values()):g}{'  CHANGED ' + ', '.join(changed) if changed else ''}")
+        if changed or 'error' in after:
+            failed = True
+
+    print(f"preprocess_dataframe dtypes: {dict(preprocessed.dtypes.astype(str))}")
+    if failed:
+        print(f"Metrics changed by more than {args.tolerance}")
+        sys.exit(1)
+    print("All metrics unchanged")
+
+if __name__ == '__main__':
+    main()
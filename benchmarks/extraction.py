@@ -0,0 +1,70 @@
+import argparse
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fixtures.server import LISTING_DIR, serve_fixtures
+from product_scrape import EXTRACT_PRODUCTS_JS, MyntraScraper, parse_listing_html
+
+def fixture_paths():
+    return sorted(f[:-len('.html')] for f in os.listdir(LISTING_DIR) if f.endswith('.html') and not re.search(r'-p\d+\.html$', f))
+
+def build_records(scraper, raw_products):
+    return [scraper.build_product(raw, 'Fixture', 'Fixture') for raw in raw_products]
+
+def main():
+    parser = argparse.ArgumentParser(description='Time bulk product extraction against saved listing pages')
+    parser.add_argument('--browser', action='store_true', help='also run the in-page script through headless Chrome')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    server, base_url = serve_fixtures()
+    # Only the parsing helpers are needed, so skip the browser and DB setup.
+    scraper = MyntraScraper.__new__(MyntraScraper)
+    scraper.BASE_URL = base_url
+
+    driver = None
+    if args.browser:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless=new")
+        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+
+    mismatches = 0
+    try:
+        for path in fixture_paths():
+            with open(os.path.join(LISTING_DIR, f"{path}.html"), encoding='utf-8') as f:
+                html = f.read()
+
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                parsed = parse_listing_html(html)
+            parse_ms = (time.perf_counter() - started) / args.repeat * 1000
+            line = f"{path:<20} {len(parsed):>3} products  html.parser {parse_ms:7.2f} ms/page"
+
+            if driver:
+                driver.get(f"{base_url}/{path}")
+                started = time.perf_counter()
+                in_page = driver.execute_script(EXTRACT_PRODUCTS_JS)
+                script_ms = (time.perf_counter() - started) * 1000
+                line += f"  in-page script {script_ms:7.2f} ms/page"
+
+                if build_records(scraper, in_page) != build_records(scraper, parsed):
+                    mismatches += 1
+                    line += "  RECORDS DIFFER"
+            print(line)
+    finally:
+        if driver:
+            driver.quit()
+        server.shutdown()
+
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import re
+import sqlite3
+
+import mysql.connector
+
+# Rewrites for the MySQL dialect the app, preprocessor and scraper issue,
+# so the same SQL strings run unchanged against an SQLite file.
+REWRITES = [
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\bRAND\(\)', re.I), 'RANDOM()'),
+    (re.compile(r'\bINT AUTO_INCREMENT PRIMARY KEY\b', re.I), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\s+ON UPDATE CURRENT_TIMESTAMP', re.I), ''),
+    (re.compile(r'\s+FOR UPDATE\b', re.I), ''),
+    (re.compile(r'\s+PARTITION BY RANGE\b.*$', re.I | re.S), ''),
+    (re.compile(r'^ALTER TABLE \w+ REORGANIZE PARTITION .*$', re.I | re.S), 'SELECT 1'),
+    (re.compile(r'^SELECT PARTITION_NAME FROM INFORMATION_SCHEMA\.PARTITIONS .*$', re.I | re.S), 'SELECT NULL WHERE 0'),
+    (re.compile(r'ALTER TABLE \w+ AUTO_INCREMENT\s*=\s*\d+', re.I), 'SELECT 1'),
+    (re.compile(r'\bON DUPLICATE KEY UPDATE\b', re.I), 'ON CONFLICT DO UPDATE SET'),
+    (re.compile(r'\bVALUES\((\w+)\)', re.I), r'excluded.\1'),
+    (re.compile(r'^DROP INDEX (\w+) ON \w+', re.I), r'DROP INDEX \1'),
+    (re.compile(r'^UPDATE (\w+) CROSS JOIN (\(.*?\) \w+) SET (.*?) WHERE', re.I | re.S), r'UPDATE \1 SET \3 FROM \2 WHERE'),
+]
+
+INFORMATION_SCHEMA_COLUMN = re.compile(
+    r"SELECT COLUMN_NAME FROM INFORMATION_SCHEMA\.COLUMNS WHERE .*TABLE_NAME = '(\w+)' AND COLUMN_NAME = '(\w+)'", re.I | re.S)
+INFORMATION_SCHEMA_INDEX = re.compile(
+    r"SELECT INDEX_NAME FROM INFORMATION_SCHEMA\.STATISTICS WHERE .*TABLE_NAME = %s AND INDEX_NAME = %s", re.I | re.S)
+INLINE_INDEX = re.compile(r',\s*(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*\(([^)]*)\)', re.I)
+CREATE_TABLE = re.compile(r'CREATE TABLE IF NOT EXISTS (\w+)', re.I)
+
+def translate(sql):
+    match = INFORMATION_SCHEMA_COLUMN.search(sql)
+    if match:
+        return [f"SELECT name FROM pragma_table_info('{match.group(1)}') WHERE name = '{match.group(2)}'"]
+    if INFORMATION_SCHEMA_INDEX.search(sql):
+        return ["SELECT name FROM pragma_index_list(?) WHERE name = ?"]
+
+    statements = []
+    table = CREATE_TABLE.search(sql)
+    if table:
+        for unique, name, columns in INLINE_INDEX.findall(sql):
+            statements.append(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table.group(1)} ({columns})")
+        sql = INLINE_INDEX.sub('', sql)
+
+    for pattern, replacement in REWRITES:
+        sql = pattern.sub(replacement, sql)
+
+    return [sql] + statements
+
+class FakeCursor:
+    def __init__(self, conn, dictionary=False):
+        self._cursor = conn.cursor()
+        self._dictionary = dictionary
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, sql, params=None):
+        statements = translate(sql)
+        self._cursor.execute(statements[0], tuple(params) if params is not None else ())
+        for statement in statements[1:]:
+            self._cursor.connection.execute(statement)
+        return self
+
+    def executemany(self, sql, seq_params):
+        self._cursor.executemany(translate(sql)[0], [tuple(p) for p in seq_params])
+        return self
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip([d[0] for d in self._cursor.description], row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=None):
+        return [self._row(row) for row in self._cursor.fetchmany(size or self._cursor.arraysize)]
+
+    def close(self):
+        self._cursor.close()
+
+class FakeConnection:
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self, dictionary=False, buffered=None):
+        return FakeCursor(self._conn, dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+    def is_connected(self):
+        return True
+
+def install(path):
+    def connect(**kwargs):
+        return FakeConnection(path)
+
+    mysql.connector.connect = connect
+    return connect
+
+def load_table(path, table, df, if_exists='append'):
+    conn = sqlite3.connect(path)
+    df.to_sql(table, conn, if_exists=if_exists, index=False)
+    conn.commit()
+    conn.close()
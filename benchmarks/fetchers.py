@@ -0,0 +1,72 @@
+import argparse
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fixtures.server import LISTING_DIR, serve_fixtures
+from product_scrape import FETCHERS, MyntraScraper, parse_listing_html, parse_myx_products
+
+FIXTURE_FILE = re.compile(r'^(.+?)(?:-p(\d+))?\.html$')
+
+def fixture_pages():
+    pages = []
+    for filename in sorted(os.listdir(LISTING_DIR)):
+        match = FIXTURE_FILE.match(filename)
+        if match:
+            pages.append((f"/{match.group(1)}", int(match.group(2) or 1), os.path.join(LISTING_DIR, filename)))
+    return pages
+
+def build_records(scraper, raw_products):
+    return [scraper.build_product(raw, 'Fixture', 'Fixture') for raw in raw_products]
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that every fetcher backend yields the same records for the fixture listings')
+    parser.add_argument('--fetchers', nargs='+', choices=sorted(FETCHERS), default=['http'])
+    args = parser.parse_args()
+
+    server, base_url = serve_fixtures()
+    # Only the URL and parsing helpers are needed, so skip the DB setup.
+    scraper = MyntraScraper.__new__(MyntraScraper)
+    scraper.BASE_URL = base_url
+
+    mismatches = 0
+    try:
+        for name in args.fetchers:
+            started = time.perf_counter()
+            fetcher = FETCHERS[name]()
+            startup = time.perf_counter() - started
+            print(f"{name}: started in {startup:.3f}s")
+
+            try:
+                for path, page, filename in fixture_pages():
+                    url = scraper.page_url(path, page)
+                    started = time.perf_counter()
+                    extracted = fetcher.extract(url)
+                    extract_ms = (time.perf_counter() - started) * 1000
+
+                    with open(filename, encoding='utf-8') as f:
+                        html = f.read()
+                    cards = build_records(scraper, parse_listing_html(html))
+                    embedded = build_records(scraper, parse_myx_products(html) or [])
+
+                    line = f"  {path:<20} p{page} {len(extracted):>3} products {extract_ms:8.2f} ms"
+                    if build_records(scraper, extracted) != cards or embedded != cards:
+                        mismatches += 1
+                        line += "  RECORDS DIFFER"
+                    print(line)
+            finally:
+                fetcher.close()
+    finally:
+        server.shutdown()
+
+    if mismatches:
+        print(f"{mismatches} page(s) differ between backends")
+        sys.exit(1)
+    print("All backends produced identical records")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fakedb
+import history
+import schema
+
+def query(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(sql, params).fetchall()
+    conn.commit()
+    conn.close()
+    return rows
+
+def count_history(path):
+    return query(path, "SELECT COUNT(*) FROM price_history")[0][0]
+
+def raw_products(n, prices, discounts):
+    return [{
+        'brand': f"Brand {i % 40}",
+        'name': f"Product {i}",
+        'price': f"Rs. {prices[i]:,}",
+        'original_price': f"Rs. {round(prices[i] * 100 / (100 - discounts[i])):,}",
+        'rating': f"{3 + (i % 20) / 10:.1f}",
+        'product_url': f"/product/{i}",
+        'image_url': ''
+    } for i in range(n)]
+
+def check_change_detection(products):
+    # Drives MyntraScraper.write_products, the scraper's real write path:
+    # repeated crawls of unchanged pages must not add history rows.
+    workdir = tempfile.mkdtemp(prefix='history_scrape_')
+    path = os.path.join(workdir, 'myntradb.sqlite')
+    fakedb.install(path)
+    from product_scrape import MyntraScraper
+
+    scraper = MyntraScraper(base_url='http://127.0.0.1', fetcher='http')
+    rng = np.random.default_rng(5)
+    prices = rng.integers(300, 5000, products)
+    discounts = rng.integers(0, 70, products)
+
+    failed = False
+    steps = []
+    scraper.write_products(raw_products(products, prices, discounts), 'Men', 'T-Shirts')
+    steps.append(('first crawl', products, count_history(path)))
+    # Pretend that crawl ran yesterday, so today's writes start new rows.
+    query(path, "UPDATE price_history SET snapshot_date = ?", ((date.today() - timedelta(days=1)).isoformat(),))
+    scraper.write_products(raw_products(products, prices, discounts), 'Men', 'T-Shirts')
+    steps.append(('unchanged recrawl', products, count_history(path)))
+    changed = rng.choice(products, products // 10, replace=False)
+    prices[changed] = prices[changed] - 50
+    scraper.write_products(raw_products(products, prices, discounts), 'Men', 'T-Shirts')
+    steps.append(('10% repriced', products + len(changed), count_history(path)))
+    # Same day again: the day's rows are updated in place, not duplicated,
+    # and keep the values from before the day.
+    discounts[changed[:10]] = discounts[changed[:10]] + 5
+    scraper.write_products(raw_products(products, prices, discounts), 'Men', 'T-Shirts')
+    steps.append(('same-day change', products + len(changed), count_history(path)))
+    # After a category is cleared, products seen again on a later page of the
+    # same crawl are updates, not new products.
+    scraper.all_records_deleted = True
+    inserted, _ = scraper.write_products(raw_products(products, prices, discounts), 'Men', 'T-Shirts')
+    steps.append(('after clear', products + len(changed), count_history(path)))
+    steps.append(('after clear, inserted', 0, inserted))
+    scraper.rollup_history()
+    scraper.close()
+
+    print("  history rows per step:")
+    for name, expected, actual in steps:
+        print(f"    {name:22} {actual:6d} (expected {expected})")
+        failed |= actual != expected
+
+    today = query(path, "SELECT price - prev_price, discount - prev_discount FROM price_history WHERE snapshot_date = ?", (date.today().isoformat(),))
+    deltas_ok = sorted(today) == sorted([(-50.0, 5.0)] * 10 + [(-50.0, 0.0)] * (len(changed) - 10))
+    rolled = query(path, "SELECT SUM(changes), SUM(price_down), SUM(discount_change_n) FROM price_history_daily WHERE snapshot_date = ?", (date.today().isoformat(),))[0]
+    print(f"  today's deltas against yesterday's values: {'ok' if deltas_ok else 'WRONG'}; rollup changes/price_down/discount changes {rolled}")
+    failed |= not deltas_ok or rolled != (len(changed), len(changed), 10)
+    return failed
+
+def simulate(products, days, change_rate, seed=11):
+    # Daily snapshots of a catalogue where a share of products is repriced
+    # each day; returns the history rows the writer would have produced and
+    # the full state per day for checking the endpoints.
+    rng = np.random.default_rng(seed)
+    keys = np.array([f"{i:040d}" for i in range(products)])
+    categories = np.array(['Men', 'Women', 'Kids', 'Home', 'Beauty', 'Footwear', 'Gadgets'])[np.arange(products) % 7]
+    brands = np.array([f"Brand {i % 300}" for i in range(products)])
+    price = rng.integers(300, 5000, products).astype(float)
+    discount = rng.integers(0, 70, products).astype(float)
+    start = date.today() - timedelta(days=days - 1)
+
+    frames, states = [], []
+    for day in range(days):
+        snapshot = start + timedelta(days=day)
+        if day == 0:
+            changed = np.arange(products)
+            prev_price = prev_discount = np.full(products, np.nan)
+        else:
+            changed = np.flatnonzero(rng.random(products) < change_rate)
+            prev_price, prev_discount = price[changed].copy(), discount[changed].copy()
+            price[changed] = np.maximum(100, price[changed] + rng.integers(-200, 200, len(changed)))
+            discount[changed] = np.clip(discount[changed] + rng.integers(-15, 16, len(changed)), 0, 80)
+        frames.append(pd.DataFrame({
+            'snapshot_date': snapshot.isoformat(),
+            'product_key': keys[changed],
+            'brand': brands[changed],
+            'category': categories[changed],
+            'subcategory': categories[changed],
+            'price': price[changed],
+            'original_price': np.round(price[changed] * 100 / (100 - np.minimum(discount[changed], 99))),
+            'discount': discount[changed],
+            'rating': 4.0,
+            'prev_price': prev_price,
+            'prev_original_price': np.nan,
+            'prev_discount': prev_discount,
+            'prev_rating': np.nan if day == 0 else 4.0
+        }))
+        states.append(discount.copy())
+    catalogue = pd.DataFrame({'product_key': keys, 'brand': brands, 'category': categories, 'name': [f"Product {i}" for i in range(products)],
+                              'price': [f"Rs. {int(p):,}" for p in price], 'discount': [f"{int(d)}%" for d in discount], 'product_url': ''})
+    return pd.concat(frames, ignore_index=True), states, catalogue, start
+
+def expected_movers(states, days, limit, category=None, categories=None):
+    before, after = states[-days - 1], states[-1]
+    change = pd.Series(after - before, index=[f"{i:040d}" for i in range(len(after))])
+    if category:
+        change = change[categories == category]
+    change = change[change != 0]
+    order = pd.DataFrame({'abs': change.abs(), 'key': change.index}).sort_values(['abs', 'key'], ascending=[False, True])
+    return [(key, round(float(change[key]), 2)) for key in order['key'][:limit]]
+
+def timed(client, url, repeats=5):
+    client.get(url)
+    started = time.perf_counter()
+    for _ in range(repeats):
+        result = client.get(url).get_json()
+    return result, (time.perf_counter() - started) / repeats * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Price history change detection, rollup and trend endpoint checks and timings')
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--change-rate', type=float, default=0.3)
+    parser.add_argument('--scrape-products', type=int, default=500)
+    args = parser.parse_args()
+
+    print("Change detection through MyntraScraper.write_products:")
+    failed = check_change_detection(args.scrape_products)
+
+    workdir = tempfile.mkdtemp(prefix='history_')
+    path = os.path.join(workdir, 'myntradb.sqlite')
+    connect = fakedb.install(path)
+    db = connect()
+    cursor = db.cursor()
+    history.create_history_tables(cursor)
+    db.commit()
+
+    started = time.perf_counter()
+    rows, states, catalogue, start = simulate(args.products, args.days, args.change_rate)
+    fakedb.load_table(path, 'price_history', rows)
+    fakedb.load_table(path, 'myntra_products', catalogue, if_exists='replace')
+    print(f"Simulated {args.products} products over {args.days} days: {len(rows)} history rows ({time.perf_counter() - started:.1f}s)")
+
+    started = time.perf_counter()
+    history.rollup_days(cursor, history.days_between(start, date.today()))
+    db.commit()
+    cursor.execute("SELECT COUNT(*) FROM price_history_daily")
+    print(f"Rolled up {args.days} days into {cursor.fetchone()[0]} daily rows in {time.perf_counter() - started:.1f}s")
+    # MySQL keeps index statistics up to date on its own; SQLite needs
+    # ANALYZE before it will range-scan the date instead of every product.
+    cursor.execute("ANALYZE")
+
+    movers_sql = "SELECT product_key, SUM(discount - prev_discount) FROM price_history WHERE snapshot_date >= %s AND discount IS NOT NULL AND prev_discount IS NOT NULL GROUP BY product_key"
+    full_scan, plan = schema.explain(cursor, fakedb.translate(movers_sql)[0], (history.window_start(30).isoformat(),), dialect='sqlite')
+    print(f"Movers window query plan: {'; '.join(plan)}")
+    failed |= full_scan
+    cursor.close()
+    db.close()
+
+    os.chdir(workdir)
+    import app
+    client = app.app.test_client()
+
+    categories = catalogue['category'].to_numpy()
+    for days, category in ((7, None), (30, None), (30, 'Women'), (min(180, args.days - 1), None)):
+        url = f"/trends/discount_movers?days={days}&limit=20" + (f"&category={category}" if category else '')
+        result, ms = timed(client, url)
+        got = [(mover['product_key'], mover['discount_change']) for mover in result['movers']]
+        match = got == expected_movers(states, days, 20, category, categories)
+        print(f"  {url}: {len(got)} movers in {ms:.1f} ms, matches snapshot diff: {match}")
+        failed |= not match
+
+    rows['snapshot_date'] = pd.to_datetime(rows['snapshot_date'])
+    for params, mask in (('', None), ('&group_by=category&value=Men', rows['category'] == 'Men'), ('&group_by=brand&value=Brand 7', rows['brand'] == 'Brand 7')):
+        url = f"/trends/price_changes?days=90{params}"
+        result, ms = timed(client, url)
+        window = rows[rows['snapshot_date'] >= pd.Timestamp(history.window_start(90))]
+        if mask is not None:
+            window = window[mask[window.index]]
+        daily = window.groupby('snapshot_date').agg(changes=('product_key', 'size'), up=('price', lambda s: int((s > window.loc[s.index, 'prev_price']).sum())))
+        match = [(point['changes'], point['price_up']) for point in result['series']] == list(zip(daily['changes'], daily['up']))
+        print(f"  {url}: {len(result['series'])} days in {ms:.1f} ms, matches history rows: {match}")
+        failed |= not match
+
+    if failed:
+        print("Price history checks failed")
+        sys.exit(1)
+    print("All price history checks passed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_SECONDS = 1.0
+# Must not be imported by `import app`; they load on the first request that
+# trains or loads a model, or in the prewarm phase.
+DEFERRED_MODULES = ['sklearn', 'scipy']
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import app
+print(time.perf_counter() - started)
+print(','.join(name for name in {deferred!r} if name in sys.modules))
+"""
+
+def import_times(module):
+    # (cumulative seconds, self seconds, depth, name) per module from -X importtime.
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(cumulative_us) / 1e6, int(self_us) / 1e6, depth, name.strip()))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the wall-clock cost of importing app.py against a budget')
+    parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_SECONDS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=12)
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.repeat):
+        result = subprocess.run([sys.executable, '-W', 'ignore', '-c', PROBE.format(deferred=DEFERRED_MODULES)], cwd=ROOT, capture_output=True, text=True, check=True)
+        seconds, loaded = result.stdout.splitlines()[-2:]
+        timings.append(float(seconds))
+    best = min(timings)
+
+    rows = import_times('app')
+    direct = [row for row in rows if row[2] == 1]
+    print(f"import app: best {best:.3f}s of {args.repeat} (budget {args.budget:.2f}s)")
+    print("Slowest direct imports of app (cumulative):")
+    for cumulative, own, depth, name in sorted(direct, reverse=True)[:args.top]:
+        print(f"  {cumulative:7.3f}s  {name}")
+
+    failed = False
+    if best > args.budget:
+        print(f"Over budget by {best - args.budget:.3f}s")
+        failed = True
+    if loaded:
+        print(f"Imported eagerly but should be deferred: {loaded}")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(f"Within budget; {', '.join(DEFERRED_MODULES)} stay deferred")
+
+if __name__ == '__main__':
+    main()
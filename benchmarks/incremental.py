@@ -0,0 +1,130 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ml
+from synthetic import cleaned_products_frame, generate_products
+
+FEATURES = ['original_price', 'discount', 'rating']
+
+def rescrape(table, ids, rng, round_number):
+    # New values for the given ids, stamped after every earlier round.
+    changed = table.loc[ids].copy()
+    changed['price'] = (changed['price'] * rng.uniform(0.9, 1.1, len(changed))).round()
+    changed['discount'] = np.clip(changed['discount'] + rng.integers(-5, 6, len(changed)), 0, 90)
+    changed['updated_at'] = pd.Timestamp('2025-01-01') + pd.Timedelta(days=round_number)
+    table.loc[ids] = changed
+    return changed.reset_index(drop=True)
+
+def fresh_stats(model_data, frames):
+    # The normal equations summed from scratch over the given frames, with the
+    # model's fixed bounds and scaler.
+    n_params = len(FEATURES) + 1
+    stats = {'xtx': np.zeros((n_params, n_params)), 'xty': np.zeros(n_params), 'n': 0}
+    for frame in frames:
+        df = ml.apply_outlier_bounds(ml.dtypes.model_frame(frame), model_data['bounds'])
+        train = df[~ml.holdout_mask(df['id'])]
+        stats = ml.accumulate_normal_equations(stats, model_data['pipeline'].named_steps['scaler'].transform(train[FEATURES]), train['price'])
+    return stats
+
+def coefficient_difference(a, b):
+    return float(np.max(np.abs(a - b) / np.maximum(1.0, np.abs(b))))
+
+def check_regression(rows, rounds, tolerance):
+    rng = np.random.default_rng(3)
+    table = cleaned_products_frame(generate_products(rows)).assign(updated_at=pd.Timestamp('2024-12-31'))
+    table.index = table['id']
+    model_data = ml.train_incremental_model(table.reset_index(drop=True), 'price', FEATURES)
+    ml.save_incremental_model(model_data, 'bench_incremental_regression')
+    first_size = os.path.getsize(ml.model_path('bench_incremental_regression'))
+
+    # A small set of products is rescraped every round, the rest now and then.
+    hot = rng.choice(table.index, rows // 50, replace=False)
+    seen = [table.reset_index(drop=True)]
+    for round_number in range(1, rounds + 1):
+        ids = np.union1d(hot, rng.choice(table.index, rows // 20, replace=False))
+        changed = rescrape(table, ids, rng, round_number)
+        seen.append(changed)
+        model_data = ml.update_incremental_model(model_data, changed)
+        ml.save_incremental_model(model_data, 'bench_incremental_regression')
+        model_data = ml.load_model('bench_incremental_regression')
+    last_size = os.path.getsize(ml.model_path('bench_incremental_regression'))
+
+    # The sums hold every version of a row that was fetched, so they must
+    # match a fit over all of those; against the current table they drift.
+    model = model_data['pipeline'].named_steps['model']
+    incremental = np.concatenate([[model.intercept_], model.coef_])
+    expected = fresh_stats(model_data, seen)
+    error = coefficient_difference(incremental, np.linalg.lstsq(expected['xtx'], expected['xty'], rcond=None)[0])
+    current = fresh_stats(model_data, [table.reset_index(drop=True)])
+    drift = coefficient_difference(incremental, np.linalg.lstsq(current['xtx'], current['xty'], rcond=None)[0])
+    print(f"  regression after {rounds} refreshes: stats n {model_data['stats']['n']} vs all fetched versions {expected['n']}, max coefficient difference {error:.2e}; "
+          f"drift from a fit of the current table {drift:.2e}")
+    print(f"  artifact {first_size} bytes after training, {last_size} after {rounds} refreshes; holdout {len(model_data['holdout'])} rows (cap {ml.HOLDOUT_MAX_ROWS})")
+    return error > tolerance or model_data['stats']['n'] != expected['n'] or len(model_data['holdout']) > ml.HOLDOUT_MAX_ROWS or 'trained_rows' in model_data
+
+def check_watermark(rows):
+    # Rows written in the same second as the watermark arrive on the next
+    # refresh, which fetches updated_at >= watermark; rows already taken at
+    # that second are not counted twice.
+    second = pd.Timestamp('2025-02-01 10:00:00')
+    table = cleaned_products_frame(generate_products(rows)).assign(updated_at=second)
+    first, late = table.iloc[:rows // 2], table.iloc[rows // 2:]
+    model_data = ml.train_incremental_model(first, 'price', FEATURES)
+    n_before = model_data['stats']['n']
+    model_data = ml.update_incremental_model(model_data, table[pd.to_datetime(table['updated_at']) >= pd.Timestamp(model_data['watermark'])])
+    expected = fresh_stats(model_data, [late])['n']
+    again = ml.update_incremental_model(model_data, table)
+    print(f"  same-second rows: {model_data['stats']['n'] - n_before} added (expected {expected}), refetching the second adds {again['stats']['n'] - model_data['stats']['n']}")
+    return model_data['stats']['n'] - n_before != expected or again['stats']['n'] != model_data['stats']['n']
+
+def check_classifier(rows, brands):
+    # One-hot brand encoding makes coef_ large enough to be memory mapped
+    # read-only when the artifact is loaded back.
+    rng = np.random.default_rng(4)
+    table = cleaned_products_frame(generate_products(rows)).assign(updated_at=pd.Timestamp('2024-12-31'))
+    table['brand'] = [f"Brand {i}" for i in rng.integers(0, brands, rows)]
+    features = ['brand', 'discount', 'rating']
+    ml.save_incremental_model(ml.train_incremental_classification_model(table, features), 'bench_incremental_classifier')
+
+    loaded = ml.load_model('bench_incremental_classifier')
+    writable = loaded['pipeline'].named_steps['classifier'].coef_.flags.writeable
+    table.index = table['id']
+    changed = rescrape(table, rng.choice(table.index, rows // 20, replace=False), rng, 1)
+    try:
+        refreshed = ml.update_incremental_classification_model(loaded, changed)
+    except ValueError as e:
+        print(f"  classifier refresh after reload failed: {e}")
+        return True
+    print(f"  classifier with {brands} brands: loaded coef_ writable {writable}, refresh after reload ok, accuracy {refreshed['accuracy']:.3f}")
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental refresh: normal equations under rescrapes, artifact size, same-second watermark, reloaded classifier refresh')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--brands', type=int, default=2000)
+    parser.add_argument('--holdout-cap', type=int, default=2000)
+    parser.add_argument('--tolerance', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    ml.MODELS_DIR = tempfile.mkdtemp(prefix='incremental_')
+    ml.HOLDOUT_MAX_ROWS = args.holdout_cap
+
+    failed = check_regression(args.rows, args.rounds, args.tolerance)
+    failed |= check_watermark(args.rows)
+    failed |= check_classifier(args.rows, args.brands)
+    if failed:
+        print("Incremental checks failed")
+        sys.exit(1)
+    print("All incremental checks passed")
+
+if __name__ == '__main__':
+    main()
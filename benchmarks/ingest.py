@@ -0,0 +1,63 @@
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fakedb
+import preprocess
+from crawl_fixtures import FIXTURE_CATEGORY_MAP
+from crawler import Crawler
+from fixtures.server import serve_fixtures
+from product_scrape import MyntraScraper
+
+COLUMNS = "id, brand, name, price, original_price, discount, rating, category, subcategory"
+
+def cleaned_rows(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(f"SELECT {COLUMNS} FROM cleaned_products ORDER BY id").fetchall()
+    conn.close()
+    return [tuple(round(v, 4) if isinstance(v, float) else v for v in row) for row in rows]
+
+def main():
+    work_dir = tempfile.mkdtemp(prefix='ingest_')
+    ingest_path = os.path.join(work_dir, 'ingest.sqlite')
+    batch_path = os.path.join(work_dir, 'batch.sqlite')
+
+    fakedb.install(ingest_path)
+    server, base_url = serve_fixtures()
+    try:
+        stats = Crawler(
+            category_map=FIXTURE_CATEGORY_MAP,
+            workers=2,
+            min_interval=0.1,
+            max_retries=1,
+            scraper_factory=lambda: MyntraScraper(base_url=base_url, fetcher='http', ingest=True, history_tables=False),
+            ingest=True
+        ).run()
+    finally:
+        server.shutdown()
+
+    # Rebuild cleaned_products the old way from the same raw rows and compare.
+    shutil.copy(ingest_path, batch_path)
+    conn = sqlite3.connect(batch_path)
+    conn.execute("DROP TABLE cleaned_products")
+    conn.commit()
+    conn.close()
+    fakedb.install(batch_path)
+    preprocess.preprocess_myntra_data()
+
+    ingested, batch = cleaned_rows(ingest_path), cleaned_rows(batch_path)
+    print(f"Crawl: {stats['pages']} pages, {stats['inserted']} inserted, {stats['imputed']} values imputed")
+    print(f"cleaned_products: {len(ingested)} rows via ingest, {len(batch)} rows via preprocess.py")
+    if ingested != batch:
+        diff = [(a, b) for a, b in zip(ingested, batch) if a != b][:5]
+        print(f"Rows differ, first mismatches: {diff}")
+        sys.exit(1)
+    print("Ingest path matches preprocess.py")
+
+if __name__ == '__main__':
+    main()
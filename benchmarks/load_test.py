@@ -0,0 +1,121 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fakedb
+from synthetic import cleaned_products_frame, generate_products
+
+READS = ['/dashboard_data', '/get_data?type=top_selling_brands', '/get_data?type=rating_distribution', '/get_brands', '/models']
+TRAININGS = [
+    ('/run_regression', {'target': 'price', 'features': ['original_price', 'discount', 'rating'], 'technique': 'linear'}),
+    ('/run_classification', {'target': 'price_category', 'features': ['discount', 'rating'], 'technique': 'decision_tree'}),
+    ('/run_clustering', {'group_by': 'brand', 'features': ['price', 'discount', 'rating'], 'technique': 'kmeans', 'n_clusters': 0}),
+]
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] * 1000 if values else float('nan')
+
+def read_client(base, stop, latencies, errors):
+    session = requests.Session()
+    i = 0
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = session.get(base + READS[i % len(READS)])
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200 or 'error' in response.text[:20]:
+            errors.append(response.status_code)
+        i += 1
+
+def training_client(base, stop, statuses):
+    session = requests.Session()
+    i = 0
+    while not stop.is_set():
+        path, body = TRAININGS[i % len(TRAININGS)]
+        statuses.append(session.post(base + path, json=body).status_code)
+        i += 1
+
+def phase(base, seconds, readers, trainers):
+    stop = threading.Event()
+    latencies, errors, statuses = [], [], []
+    threads = [threading.Thread(target=read_client, args=(base, stop, latencies, errors)) for _ in range(readers)]
+    threads += [threading.Thread(target=training_client, args=(base, stop, statuses)) for _ in range(trainers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, statuses
+
+def main():
+    parser = argparse.ArgumentParser(description='Read-route latency with and without concurrent training, on a sync and a threaded server')
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--seconds', type=float, default=20.0)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--trainers', type=int, default=2)
+    parser.add_argument('--max-p99-ratio', type=float, default=5.0, help='allowed threaded p99 under training vs idle')
+    parser.add_argument('--read-pool-size', type=int, default=6, help='app.config READ_POOL_SIZE, set after import')
+    parser.add_argument('--training-concurrency', type=int, default=1, help='app.config TRAINING_CONCURRENCY, set after import')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    path = os.path.join(workdir, 'myntradb.sqlite')
+    frame = cleaned_products_frame(generate_products(args.rows))
+    frame['updated_at'] = '2024-01-01 00:00:00'
+    fakedb.load_table(path, 'cleaned_products', frame, if_exists='replace')
+    fakedb.install(path)
+
+    # Model artifacts go under the temp directory, not the repo.
+    os.chdir(workdir)
+    import app
+    import ml
+    ml.warm_imports()
+    app.app.config.update(READ_POOL_SIZE=args.read_pool_size, TRAINING_CONCURRENCY=args.training_concurrency)
+
+    failed = False
+    results = {}
+    # threaded=False is one request at a time, like the old sync workers.
+    for mode, threaded in (('sync', False), ('threaded', True)):
+        server = make_server('127.0.0.1', 0, app.app, threaded=threaded)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        requests.get(base + '/dashboard_data')
+        requests.post(base + TRAININGS[0][0], json=TRAININGS[0][1])
+        if (app.READ_POOL.size, app.TRAINING.limit) != (args.read_pool_size, args.training_concurrency):
+            print(f"Config set after import ignored: read pool {app.READ_POOL.size}, training slots {app.TRAINING.limit}")
+            failed = True
+
+        for name, trainers in (('idle', 0), ('training', args.trainers)):
+            latencies, errors, statuses = phase(base, args.seconds, args.readers, trainers)
+            results[mode, name] = latencies
+            trained = sum(status == 200 for status in statuses)
+            rejected = sum(status == 503 for status in statuses)
+            print(f"{mode:8} {name:8} reads {len(latencies):5d}  p50 {percentile(latencies, 50):8.1f} ms  p99 {percentile(latencies, 99):8.1f} ms  "
+                  f"max {max(latencies) * 1000:8.1f} ms  read errors {len(errors)}  trainings {trained} (503: {rejected})")
+            if errors:
+                failed = True
+
+        server.shutdown()
+
+    idle, busy = percentile(results['threaded', 'idle'], 99), percentile(results['threaded', 'training'], 99)
+    print(f"threaded p99 under training: {busy / idle:.1f}x idle (sync: {percentile(results['sync', 'training'], 99) / percentile(results['sync', 'idle'], 99):.1f}x)")
+    if busy / idle > args.max_p99_ratio:
+        print(f"Read p99 grew more than {args.max_p99_ratio}x while training")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
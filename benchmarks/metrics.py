@@ -0,0 +1,80 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fakedb
+import metrics
+from synthetic import cleaned_products_frame, generate_products
+
+STAGES = ('connect', 'query', 'frame', 'preprocess', 'fit', 'predict')
+
+def hook_overhead_us(app, repeat):
+    # What instrumentation adds to one request that passes through every
+    # stage: the before/teardown hooks plus one timer per stage.
+    with app.test_request_context('/overhead'):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            metrics.start_request()
+            for name in STAGES:
+                with metrics.stage(name):
+                    pass
+            metrics.finish_request(None)
+        return (time.perf_counter() - started) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure metrics overhead and check the /metrics exposition on synthetic data')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=20000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='metrics_'), 'myntradb.sqlite')
+    frame = cleaned_products_frame(generate_products(args.rows))
+    frame['updated_at'] = '2024-01-01 00:00:00'
+    fakedb.load_table(path, 'cleaned_products', frame, if_exists='replace')
+    fakedb.install(path)
+
+    import app
+    client = app.app.test_client()
+
+    print(f"instrumentation per request: {hook_overhead_us(app.app, args.repeat):.2f} us ({len(STAGES)} stages)")
+
+    client.get('/get_data?type=top_selling_brands')
+    client.get('/dashboard_data')
+    client.get('/dashboard_data')
+    client.get('/search_brands?q=b')
+    client.post('/run_regression', json={'target': 'price', 'features': ['original_price', 'discount']})
+    client.post('/predict', json={'inputs': {'original_price': 1000, 'discount': 20}, 'target': 'price'})
+    client.post('/run_clustering', json={'group_by': 'brand', 'features': ['price', 'discount', 'rating'], 'n_clusters': 3})
+
+    response = client.get('/metrics')
+    text = response.get_data(as_text=True)
+    print(f"/metrics: {response.mimetype}, {len(text.splitlines())} lines")
+
+    expected = [
+        'http_request_duration_seconds_count{route="run_clustering",method="POST",status="200"}',
+        'http_request_stage_seconds_count{route="run_regression",stage="fit"}',
+        'http_request_stage_seconds_count{route="run_clustering",stage="preprocess"}',
+        'http_request_stage_seconds_count{route="get_data",stage="query"}',
+        'http_request_stage_seconds_count{route="predict",stage="predict"}',
+        'http_request_stage_seconds_count{route="dashboard_data",stage="serialize"}',
+        'cache_events_total{cache="dashboard",result="hit"}',
+        'model_loads_total{kind="regression",source="memory"}',
+        'http_response_wire_bytes_total{route="run_regression"}'
+    ]
+    missing = [series for series in expected if series not in text]
+    for line in text.splitlines():
+        if line.startswith('http_request_stage_seconds_sum') or line.startswith('cache_events_total') or line.startswith('model_loads_total'):
+            print(f"  {line}")
+
+    if missing:
+        print(f"Missing series: {', '.join(missing)}")
+        sys.exit(1)
+    print("All expected series present")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import fakedb
+import payload
+from synthetic import cleaned_products_frame, generate_products
+
+def post(client, path, body):
+    started = time.perf_counter()
+    response = client.post(path, json=body)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return response.get_json(), len(response.data), elapsed_ms
+
+def check_kept(full_actual, full_pred, actual, pred, budget):
+    # Both axis extremes and the largest outlier residuals, up to the outlier
+    # share of the budget, must survive downsampling.
+    full_actual, full_pred = np.asarray(full_actual), np.asarray(full_pred)
+    residuals = np.abs(full_actual - full_pred)
+    returned = set(zip(actual, pred))
+    must = payload.extreme_mask(full_actual, full_pred)
+    outliers = np.flatnonzero(payload.outlier_mask(residuals))
+    top = outliers[np.argsort(-residuals[outliers], kind='stable')]
+    must[top[:int(budget * payload.OUTLIER_SHARE) - int(must.sum())]] = True
+    missing = [i for i in np.flatnonzero(must) if (full_actual[i], full_pred[i]) not in returned]
+    return int(must.sum()), len(outliers), len(missing)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare full and downsampled /run_regression and /run_clustering payloads on synthetic data')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--budget', type=int, default=payload.POINT_BUDGET)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='payload_'), 'myntradb.sqlite')
+    frame = cleaned_products_frame(generate_products(args.rows))
+    frame['updated_at'] = '2024-01-01 00:00:00'
+    fakedb.load_table(path, 'cleaned_products', frame, if_exists='replace')
+    fakedb.install(path)
+
+    import app
+    client = app.app.test_client()
+    failed = False
+
+    body = {'target': 'price', 'features': ['original_price', 'discount', 'rating'], 'technique': 'linear'}
+    full, full_bytes, full_ms = post(client, '/run_regression', dict(body, max_points=0))
+    thin, thin_bytes, thin_ms = post(client, '/run_regression', dict(body, max_points=args.budget))
+
+    print(f"{args.rows} rows, budget {args.budget}")
+    print(f"regression full     {full_bytes / 1024:9.1f} KB {full_ms:8.1f} ms  points {full['points']['train']['total'] + full['points']['test']['total']}")
+    print(f"regression shaped   {thin_bytes / 1024:9.1f} KB {thin_ms:8.1f} ms  points {thin['points']['train']['returned'] + thin['points']['test']['returned']}")
+    if thin['r2'] != full['r2']:
+        print(f"r2 changed: {full['r2']} -> {thin['r2']}")
+        failed = True
+    for split in ('train', 'test'):
+        counts = thin['points'][split]
+        required, outliers, missing = check_kept(full[f'{split}_actual'], full[f'{split}_pred'], thin[f'{split}_actual'], thin[f'{split}_pred'], counts['budget'])
+        print(f"  {split}: {outliers} outliers, {required} top outliers/extremes required, {missing} missing")
+        failed = failed or missing > 0
+
+    body = {'group_by': 'brand', 'features': ['price', 'discount', 'rating'], 'technique': 'kmeans', 'n_clusters': 4}
+    full, full_bytes, full_ms = post(client, '/run_clustering', dict(body, max_points=0))
+    budget = max(2, full['points']['total'] // 4)
+    thin, thin_bytes, thin_ms = post(client, '/run_clustering', dict(body, max_points=budget))
+
+    print(f"clustering full     {full_bytes / 1024:9.1f} KB {full_ms:8.1f} ms  points {full['points']['total']}")
+    print(f"clustering shaped   {thin_bytes / 1024:9.1f} KB {thin_ms:8.1f} ms  points {thin['points']['returned']} (budget {budget})")
+    if thin['silhouette_score'] != full['silhouette_score']:
+        print(f"silhouette changed: {full['silhouette_score']} -> {thin['silhouette_score']}")
+        failed = True
+    full_clusters = {p['cluster'] for p in full['scatter_data']}
+    thin_clusters = {p['cluster'] for p in thin['scatter_data']}
+    print(f"  clusters present: {len(thin_clusters)} of {len(full_clusters)}")
+    failed = failed or thin_clusters != full_clusters
+
+    if failed:
+        sys.exit(1)
+    print("Metrics unchanged; outliers, extremes and every cluster kept")
+
+if __name__ == '__main__':
+    main()
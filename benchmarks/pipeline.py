@@ -0,0 +1,93 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mysql.connector
+from selenium.common.exceptions import TimeoutException
+
+import fakedb
+from fixtures.server import serve_fixtures
+from pipeline import ScrapePipeline, print_report
+from product_scrape import HttpFetcher, MyntraScraper
+
+class FixtureScraper(MyntraScraper):
+    # Reads fixture pages over HTTP instead of driving Chrome; the added
+    # latencies stand in for a real page load and a remote MySQL round trip.
+    def __init__(self, base_url, fetch_latency, write_latency):
+        self.BASE_URL = base_url
+        self.fetcher = HttpFetcher()
+        self.fetch_latency = fetch_latency
+        self.write_latency = write_latency
+        self.db = mysql.connector.connect()
+        self.cursor = self.db.cursor()
+        self.setup_db()
+        self.init_write_state()
+
+    def fetch_page(self, url, page):
+        time.sleep(self.fetch_latency)
+        return super().fetch_page(url, page)
+
+    def write_products(self, raw_products, category, subcategory):
+        time.sleep(self.write_latency)
+        return super().write_products(raw_products, category, subcategory)
+
+def scrape_sequential(scraper, url, category, subcategory, max_pages):
+    inserted = updated = 0
+    for page in range(1, max_pages + 1):
+        try:
+            html = scraper.fetch_page(url, page)
+        except TimeoutException:
+            break
+        raw_products = scraper.parse_page(html)
+        if not raw_products:
+            break
+        page_inserted, page_updated = scraper.write_products(raw_products, category, subcategory)
+        inserted += page_inserted
+        updated += page_updated
+    return inserted, updated
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sequential and pipelined scraping of the fixture listings')
+    parser.add_argument('--fetch-latency', type=float, default=0.3)
+    parser.add_argument('--write-latency', type=float, default=0.2)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    fakedb.install(os.path.join(tempfile.mkdtemp(prefix='pipeline_'), 'myntradb.sqlite'))
+    server, base_url = serve_fixtures()
+    # Each round re-reads the same two pages, so --rounds stretches one
+    # listing into a longer scrape without needing more fixture files.
+    paths = ['/men-tshirts', '/men-sports-shoes', '/smart-wearables'] * args.rounds
+
+    try:
+        scraper = FixtureScraper(base_url, args.fetch_latency, args.write_latency)
+
+        started = time.perf_counter()
+        sequential = [scrape_sequential(scraper, path, 'Fixture', path, 3) for path in paths]
+        sequential_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        reports = [ScrapePipeline(scraper, path, 'Fixture', path, 3).run() for path in paths]
+        pipelined_seconds = time.perf_counter() - started
+    finally:
+        server.shutdown()
+
+    print_report(reports[0])
+    print(f"\nsequential: {sum(i for i, _ in sequential)} inserted, {sum(u for _, u in sequential)} updated over {len(paths)} listings")
+    print(f"\nsequential {sequential_seconds:.2f}s  pipelined {pipelined_seconds:.2f}s  "
+          f"speedup {sequential_seconds / pipelined_seconds:.2f}x")
+
+    written = sum(r['stages']['write']['records'] for r in reports)
+    expected = sum(len(scraper.parse_page(open(os.path.join(ROOT, 'fixtures', 'listing', f)).read()))
+                   for f in os.listdir(os.path.join(ROOT, 'fixtures', 'listing'))) * args.rounds
+    if written != expected or any(r['errors'] for r in reports):
+        print(f"Pipeline wrote {written} records, expected {expected}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fakedb
+from synthetic import cleaned_products_frame, generate_products
+
+def main():
+    parser = argparse.ArgumentParser(description='Capture request profiles for classification and clustering on synthetic data')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--top', type=int, default=8)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='profiling_')
+    path = os.path.join(workdir, 'myntradb.sqlite')
+    frame = cleaned_products_frame(generate_products(args.rows))
+    frame['updated_at'] = '2024-01-01 00:00:00'
+    fakedb.load_table(path, 'cleaned_products', frame, if_exists='replace')
+    fakedb.install(path)
+
+    import app
+    app.app.config['PROFILES_DIR'] = os.path.join(workdir, 'profiles')
+    client = app.app.test_client()
+    failed = False
+
+    classification = {'target': 'price_category', 'features': ['discount', 'rating'], 'technique': 'decision_tree'}
+    clustering = {'group_by': 'brand', 'features': ['price', 'discount', 'rating'], 'technique': 'kmeans', 'n_clusters': 0}
+
+    app.app.config['PROFILING_ENABLED'] = False
+    response = client.post('/run_clustering', json=clustering, headers={'X-Profile': '1'})
+    if 'X-Profile-Id' in response.headers or client.get('/profiles').status_code != 404:
+        print("Profile captured while PROFILING_ENABLED is off")
+        failed = True
+
+    app.app.config['PROFILING_ENABLED'] = True
+    ids = [
+        client.post('/run_classification', json=classification, headers={'X-Profile': '1'}).headers.get('X-Profile-Id'),
+        client.post('/run_clustering?profile=1', json=clustering).headers.get('X-Profile-Id')
+    ]
+    unprofiled = client.post('/run_clustering', json=clustering).headers.get('X-Profile-Id')
+    if None in ids or unprofiled:
+        print(f"Expected exactly the two flagged requests to be profiled, got {ids} and {unprofiled}")
+        failed = True
+
+    profiles = client.get(f'/profiles?top={args.top}').get_json()['profiles']
+    listed = {profile['id'] for profile in profiles}
+    for profile in profiles:
+        print(f"{profile['id']}  {profile['seconds'] * 1000:.0f} ms  body={profile['body']}")
+        print("  by package: " + ', '.join(f"{p['package']} {p['tottime'] * 1000:.0f} ms" for p in profile['packages'][:6]))
+        for row in profile['top_cumtime']:
+            print(f"  {row['cumtime'] * 1000:8.1f} ms cum {row['tottime'] * 1000:8.1f} ms own  {row['function'][:90]}")
+        if not os.path.exists(os.path.join(app.app.config['PROFILES_DIR'], f"{profile['id']}.prof")):
+            print(f"  missing {profile['id']}.prof")
+            failed = True
+
+    if not set(ids) <= listed:
+        print(f"/profiles does not list {set(ids) - listed}")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("Profiles captured only for flagged requests and listed by /profiles")
+
+if __name__ == '__main__':
+    main()
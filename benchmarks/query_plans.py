@@ -0,0 +1,100 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mysql.connector
+
+import fakedb
+import schema
+from synthetic import cleaned_products_frame, generate_products
+
+def time_queries(cursor, repeat):
+    timings = {}
+    for name, sql, params, _ in schema.app_queries():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            cursor.execute(sql, params)
+            cursor.fetchall()
+        timings[name] = (time.perf_counter() - started) / repeat * 1000
+    return timings
+
+class ExplainRows:
+    # Replays a canned MySQL EXPLAIN row, since SQLite never takes the MySQL
+    # branch of schema.explain.
+    description = [(name,) for name in ('id', 'select_type', 'table', 'type', 'key', 'rows', 'Extra')]
+
+    def __init__(self, access, extra):
+        self.row = (1, 'SIMPLE', 'cleaned_products', access, 'idx_cleaned_brand_cover', 50000, extra)
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        return [self.row]
+
+MYSQL_PLANS = [
+    # (access type, Extra, whole_table, flagged)
+    ('ALL', 'Using temporary', True, True),
+    ('index', 'Using index', True, False),
+    ('index', 'Using index', False, True),
+    ('index', None, True, True),
+    ('range', 'Using where; Using index', False, False),
+    ('ref', None, False, False)
+]
+
+def check_mysql_rules():
+    wrong = []
+    for access, extra, whole_table, expected in MYSQL_PLANS:
+        full_scan, lines = schema.explain(ExplainRows(access, extra), 'SELECT 1', whole_table=whole_table)
+        print(f"  {lines[0]:<80} whole_table={whole_table!s:<5} -> {'FULL SCAN' if full_scan else 'ok'}")
+        if full_scan != expected:
+            wrong.append(lines[0])
+    return wrong
+
+def main():
+    parser = argparse.ArgumentParser(description='Check app query plans against SQLite before and after the cleaned_products indexes')
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='plans_'), 'myntradb.sqlite')
+    frame = cleaned_products_frame(generate_products(args.rows))
+    frame['updated_at'] = '2024-01-01 00:00:00'
+    fakedb.load_table(path, 'cleaned_products', frame, if_exists='replace')
+    fakedb.install(path)
+
+    # Start from what create_cleaned_table made before: the primary key and the
+    # updated_at index only.
+    conn = mysql.connector.connect()
+    cursor = conn.cursor()
+    cursor.execute("CREATE UNIQUE INDEX pk_cleaned_id ON cleaned_products (id)")
+    cursor.execute("CREATE INDEX idx_cleaned_updated_at ON cleaned_products (updated_at)")
+
+    before_scans = schema.check_query_plans(cursor, 'sqlite', verbose=False)
+    before = time_queries(cursor, args.repeat)
+
+    schema.ensure_indexes(cursor)
+    cursor.execute("ANALYZE")
+    conn.commit()
+
+    after_scans = schema.check_query_plans(cursor, 'sqlite')
+    after = time_queries(cursor, args.repeat)
+    conn.close()
+
+    print(f"\n{'query':<46} {'before ms':>10} {'after ms':>10}")
+    for name in before:
+        print(f"{name:<46} {before[name]:>10.2f} {after[name]:>10.2f}")
+    print(f"\nFull scans: {len(before_scans)} without indexes, {len(after_scans)} with indexes")
+
+    print("\nMySQL EXPLAIN rules:")
+    wrong = check_mysql_rules()
+    if after_scans or wrong:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
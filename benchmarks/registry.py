@@ -0,0 +1,128 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fakedb
+from synthetic import cleaned_products_frame, generate_products
+
+REGRESSION = {'target': 'price', 'features': ['original_price', 'discount'], 'technique': 'linear'}
+CLASSIFICATION = {'target': 'price_category', 'features': ['discount', 'rating'], 'technique': 'decision_tree'}
+REGRESSION_INPUTS = {'inputs': {'original_price': 1000, 'discount': 20}, 'target': 'price'}
+CLASS_INPUTS = {'inputs': {'discount': 20, 'rating': 4.0}, 'target': 'price_category'}
+
+# Each phase runs in freshly forked processes, like gunicorn workers forked
+# from a preloaded master: nothing but the registry file connects them.
+
+def train(owner, results):
+    import app
+    client = app.app.test_client()
+    headers = {'X-Session-Id': owner}
+    regression = client.post('/run_regression', json=REGRESSION, headers=headers).get_json()
+    classification = client.post('/run_classification', json=CLASSIFICATION, headers=headers).get_json()
+    results.put({'pid': os.getpid(), 'regression': regression.get('model_id'), 'classification': classification.get('model_id'),
+                 'errors': [r['error'] for r in (regression, classification) if 'error' in r]})
+
+def predict(owner, repeat, prewarm, results):
+    import app
+    import metrics
+    import ml
+    if prewarm:
+        # What the post-fork prewarm does for models: load every latest model.
+        ml.warm_imports()
+        app.MODEL_REGISTRY.warm()
+    client = app.app.test_client()
+    headers = {'X-Session-Id': owner}
+    timings = []
+    answers = set()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        regression = client.post('/predict', json=REGRESSION_INPUTS, headers=headers).get_json()
+        classification = client.post('/predict_class', json=CLASS_INPUTS, headers=headers).get_json()
+        timings.append(time.perf_counter() - started)
+        answers.add((regression.get('predicted', regression.get('error')), classification.get('predicted_class', classification.get('error'))))
+    results.put({'pid': os.getpid(), 'answers': sorted(answers, key=str), 'cold_ms': timings[0] * 1000,
+                 'warm_ms': sorted(timings[1:])[len(timings[1:]) // 2] * 1000 if repeat > 1 else None,
+                 'loads': {f"{kind}/{source}": n for (kind, source), n in metrics.MODEL_LOADS.series.items()}})
+
+def publish(worker, count, results):
+    import app
+    for i in range(count):
+        app.MODEL_REGISTRY.publish(f"writer{worker}", 'regression', f"model_{worker}_{i}")
+    results.put({'pid': os.getpid(), 'published': count})
+
+def run(target, args_list):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=target, args=args + (results,)) for args in args_list]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return collected
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that every worker process sees the latest model through the shared registry')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--publishes', type=int, default=50)
+    parser.add_argument('--prewarm', action='store_true', help='load the latest models in each worker before timing')
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method('fork')
+    workdir = tempfile.mkdtemp(prefix='registry_')
+    path = os.path.join(workdir, 'myntradb.sqlite')
+    frame = cleaned_products_frame(generate_products(args.rows))
+    frame['updated_at'] = '2024-01-01 00:00:00'
+    fakedb.load_table(path, 'cleaned_products', frame, if_exists='replace')
+    fakedb.install(path)
+
+    # Artifacts and registry.json go under the temp directory, not the repo.
+    os.chdir(workdir)
+    import app
+    failed = False
+
+    trained = run(train, [('alice',)])[0]
+    print(f"trained in pid {trained['pid']}: {trained['regression']}, {trained['classification']}")
+    if trained['errors']:
+        print(f"Training failed: {trained['errors']}")
+        sys.exit(1)
+
+    served = run(predict, [('alice', args.repeat, args.prewarm)] * args.workers)
+    for result in served:
+        print(f"pid {result['pid']}: first {result['cold_ms']:.1f} ms, median after {result['warm_ms']:.1f} ms, loads {result['loads']}, answers {result['answers']}")
+    if len({json.dumps(result['answers']) for result in served}) != 1 or len(served[0]['answers']) != 1:
+        print("Workers disagree on the latest model")
+        failed = True
+    if any(isinstance(answer, str) and 'model' in answer.lower() for answer in served[0]['answers'][0]):
+        print(f"Workers could not find the model: {served[0]['answers']}")
+        failed = True
+
+    other = run(predict, [('bob', 1, False)])[0]
+    if 'No trained model available' not in other['answers'][0]:
+        print(f"Another session saw alice's model: {other['answers']}")
+        failed = True
+
+    run(publish, [(worker, args.publishes) for worker in range(args.workers)])
+    with open(app.MODEL_REGISTRY.path) as f:
+        index = json.load(f)
+    expected = {f"writer{worker}:regression": f"model_{worker}_{args.publishes - 1}" for worker in range(args.workers)}
+    actual = {key: entry['model_id'] for key, entry in index['latest'].items() if key in expected}
+    print(f"concurrent publishes: {args.workers} x {args.publishes}, index entries {len(index['latest'])}")
+    if actual != expected or 'alice:regression' not in index['latest']:
+        print(f"Lost updates: expected {expected}, got {actual}")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("All workers served the shared latest model")
+
+if __name__ == '__main__':
+    main()
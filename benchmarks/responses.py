@@ -0,0 +1,71 @@
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask.json.provider import DefaultJSONProvider
+
+import fakedb
+import responses
+from synthetic import cleaned_products_frame, generate_products
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the default and fast JSON providers, compression and ETag revalidation on synthetic data')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='responses_'), 'myntradb.sqlite')
+    frame = cleaned_products_frame(generate_products(args.rows))
+    frame['updated_at'] = '2024-01-01 00:00:00'
+    fakedb.load_table(path, 'cleaned_products', frame, if_exists='replace')
+    fakedb.install(path)
+
+    import app
+    client = app.app.test_client()
+    failed = False
+
+    regression = client.post('/run_regression', json={'target': 'price', 'features': ['original_price', 'discount', 'rating'], 'max_points': 0}).get_json()
+    clustering = client.post('/run_clustering', json={'group_by': 'brand', 'features': ['price', 'discount', 'rating'], 'n_clusters': 4, 'max_points': 0}).get_json()
+
+    print(f"encoder: {'orjson' if responses.orjson else 'json (orjson not installed)'}, brotli: {'yes' if responses.brotli else 'no'}")
+    stock = DefaultJSONProvider(app.app)
+    fast = app.app.json
+    for name, body in (('regression', regression), ('clustering', clustering)):
+        stock_text, stock_ms = timed(lambda: stock.dumps(body), args.repeat)
+        fast_bytes, fast_ms = timed(lambda: fast.dump_bytes(body), args.repeat)
+        gz = gzip.compress(fast_bytes, compresslevel=responses.GZIP_LEVEL)
+        print(f"{name:<11} default {stock_ms:8.1f} ms  fast {fast_ms:8.1f} ms  {len(fast_bytes) / 1024:9.1f} KB -> gzip {len(gz) / 1024:8.1f} KB")
+        if json.loads(stock_text) != json.loads(fast_bytes):
+            print(f"  {name}: fast encoder output differs from the default provider")
+            failed = True
+
+    for url in ('/dashboard_data', '/get_data?type=top_selling_brands', '/search_brands?q=b'):
+        first = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+        etag = first.headers.get('ETag')
+        again = client.get(url, headers={'Accept-Encoding': 'gzip, br', 'If-None-Match': etag})
+        print(f"{url:<40} {first.headers.get('Content-Encoding') or 'identity':<8} {first.content_length:>7} B  revalidate -> {again.status_code}")
+        failed = failed or again.status_code != 304 or not etag
+
+    stats = client.get('/response_stats').get_json()
+    for endpoint, totals in sorted(stats.items()):
+        print(f"  {endpoint:<16} {totals['requests']:>3} req {totals['not_modified']:>3} x 304  raw {totals['raw_bytes']:>10}  wire {totals['wire_bytes']:>10}  serialize {totals['serialize_seconds'] * 1000:8.1f} ms")
+
+    if failed:
+        sys.exit(1)
+    print("Fast encoder matches the default provider; cacheable GETs revalidate to 304")
+
+if __name__ == '__main__':
+    main()
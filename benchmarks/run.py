@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fakedb
+import synthetic
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# Estimators whose cost grows super-linearly with rows are timed on a capped
+# sample so the suite finishes at every size; the rows used are recorded.
+ML_ROW_CAPS = {
+    'train_model[svr]': 3000,
+    'train_classification_model[decision_tree]': 50000,
+    'train_classification_model[svm]': 3000,
+    'find_optimal_clusters[kmeans]': 5000,
+    'find_optimal_clusters[hierarchical]': 2000,
+    'run_kmeans_clustering': 50000,
+    'run_hierarchical_clustering': 2000
+}
+
+# Routes that train on the whole table cannot be capped from outside, so
+# they are skipped above these table sizes.
+ROUTE_ROW_LIMITS = {
+    'POST /run_regression[svr]': 5000,
+    'POST /run_classification[decision_tree]': 20000,
+    'POST /predict_class': 20000,
+    'POST /run_classification[brand_popularity]': 20000
+}
+
+CHART_TYPES = [
+    'price_diff_category', 'price_diff_subcategory', 'product_distribution', 'correlation_features',
+    'top_selling_brands', 'rating_distribution', 'discount_vs_rating', 'best_discounted_high_rated'
+]
+
+def measure(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        'seconds_min': round(min(timings), 6),
+        'seconds_median': round(statistics.median(timings), 6),
+        'repeat': repeat
+    }, result
+
+class Recorder:
+    def __init__(self, size_label, repeat):
+        self.size_label = size_label
+        self.repeat = repeat
+        self.results = []
+
+    def run(self, group, name, fn, rows, repeat=None):
+        try:
+            timing, result = measure(fn, repeat or self.repeat)
+            self.results.append(dict(group=group, name=name, size=self.size_label, rows=rows, **timing))
+            print(f"  {group:>10} {name:<50} {timing['seconds_median']:>10.4f}s  ({rows} rows)")
+            return result
+        except Exception as e:
+            self.results.append(dict(group=group, name=name, size=self.size_label, rows=rows, error=str(e)))
+            print(f"  {group:>10} {name:<50} ERROR {str(e)[:60]}")
+            return None
+
+    def skip(self, group, name, rows, reason):
+        self.results.append(dict(group=group, name=name, size=self.size_label, rows=rows, skipped=reason))
+        print(f"  {group:>10} {name:<50} skipped ({reason})")
+
+def capped(df, name):
+    cap = ML_ROW_CAPS.get(name)
+    if cap and len(df) > cap:
+        return df.sample(cap, random_state=42)
+    return df
+
+def bench_preprocess(recorder, products, db_path):
+    import preprocess
+
+    raw = synthetic.myntra_products_frame(products)
+    cleaned = recorder.run('preprocess', 'preprocess_dataframe', lambda: preprocess.preprocess_dataframe(raw.copy()), len(raw), repeat=1)
+
+    def upsert():
+        conn = fakedb.FakeConnection(db_path)
+        cursor = conn.cursor()
+        cursor.execute("DROP TABLE IF EXISTS cleaned_products")
+        preprocess.create_cleaned_table(cursor)
+        preprocess.upsert_cleaned_data(cleaned, cursor, conn)
+        cursor.close()
+        conn.close()
+
+    if cleaned is not None:
+        recorder.run('preprocess', 'upsert_cleaned_data', upsert, len(cleaned), repeat=1)
+
+def bench_ml(recorder, cleaned, models_dir):
+    import ml
+    ml.MODELS_DIR = models_dir
+
+    regression_df = cleaned[['price', 'original_price', 'discount', 'rating']]
+    X, y = recorder.run('ml', 'preprocess_data', lambda: ml.preprocess_data(regression_df, 'price', ['original_price', 'discount']), len(regression_df))
+
+    for technique in ['linear', 'svr']:
+        name = f'train_model[{technique}]'
+        sample = capped(pd.concat([X, y], axis=1), name)
+        model_data = recorder.run('ml', name, lambda: ml.train_model(sample[['original_price', 'discount']], sample['price'], technique), len(sample), repeat=1)
+        if model_data:
+            recorder.run('ml', f'predict[{technique}]', lambda: ml.predict({'original_price': 1999.0, 'discount': 40.0}, {'pipeline': model_data['pipeline'], 'features': ['original_price', 'discount']}), 1)
+            recorder.run('ml', f'save_model[{technique}]', lambda: ml.save_model(model_data, 'price', ['original_price', 'discount'], technique, f'bench_{technique}'), 1)
+            recorder.run('ml', f'load_model[{technique}]', lambda: ml.load_model(f'bench_{technique}'), 1)
+
+    classification_df = cleaned[['brand', 'discount', 'price']].copy()
+    classification_df['price_category'] = ml.rank_tertiles(classification_df['price'])
+    features = ['brand', 'discount']
+    prepared = recorder.run('ml', 'preprocess_classification_data', lambda: ml.preprocess_classification_data(classification_df, 'price_category', features), len(classification_df))
+
+    if prepared:
+        X, y, classes = prepared
+        for technique in ['decision_tree', 'svm']:
+            name = f'train_classification_model[{technique}]'
+            sample = capped(X.assign(price_category=y), name)
+            model_data = recorder.run('ml', name, lambda: ml.train_classification_model(sample[features], sample['price_category'], classes, technique), len(sample), repeat=1)
+            if model_data:
+                recorder.run('ml', f'predict_class[{technique}]', lambda: ml.predict_class({'brand': X['brand'].iloc[0], 'discount': 30.0}, {'pipeline': model_data['pipeline'], 'features': features, 'classes': classes}), 1)
+
+    grouped = cleaned.groupby('brand').agg(avg_price=('price', 'mean'), avg_discount=('discount', 'mean'), avg_rating=('rating', 'mean')).reset_index()
+    cluster_features = ['avg_price', 'avg_discount']
+    prepared = recorder.run('ml', 'preprocess_clustering_data', lambda: ml.preprocess_clustering_data(grouped, cluster_features), len(grouped))
+
+    if prepared:
+        X_scaled = prepared[0]
+        for technique in ['kmeans', 'hierarchical']:
+            name = f'find_optimal_clusters[{technique}]'
+            sample = capped(pd.DataFrame(X_scaled), name).to_numpy()
+            recorder.run('ml', name, lambda: ml.find_optimal_clusters(sample, max_clusters=10, technique=technique), len(sample), repeat=1)
+
+        sample = capped(pd.DataFrame(X_scaled), 'run_kmeans_clustering').to_numpy()
+        recorder.run('ml', 'run_kmeans_clustering', lambda: ml.run_kmeans_clustering(sample, 4), len(sample))
+        sample = capped(pd.DataFrame(X_scaled), 'run_hierarchical_clustering').to_numpy()
+        recorder.run('ml', 'run_hierarchical_clustering', lambda: ml.run_hierarchical_clustering(sample, 4), len(sample))
+
+    incremental_df = cleaned[['id', 'price', 'original_price', 'discount']].assign(updated_at=pd.Timestamp('2025-05-01'))
+    split = int(len(incremental_df) * 0.9)
+    model_data = recorder.run('ml', 'train_incremental_model', lambda: ml.train_incremental_model(incremental_df.iloc[:split], 'price', ['original_price', 'discount']), split)
+    if model_data:
+        recorder.run('ml', 'update_incremental_model', lambda: ml.update_incremental_model(model_data, incremental_df.iloc[split:]), len(incremental_df) - split)
+
+def bench_routes(recorder, cleaned, db_path, models_dir):
+    import preprocess
+    import ml
+    import app as app_module
+
+    ml.MODELS_DIR = models_dir
+
+    conn = fakedb.FakeConnection(db_path)
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS cleaned_products")
+    preprocess.create_cleaned_table(cursor)
+    conn.commit()
+    conn.close()
+    fakedb.load_table(db_path, 'cleaned_products', cleaned.assign(updated_at='2025-05-01 00:00:00'))
+
+    client = app_module.app.test_client()
+    rows = len(cleaned)
+
+    def call(method, url, payload=None):
+        response = client.open(url, method=method, json=payload)
+        body = response.get_json(silent=True)
+        if isinstance(body, dict) and 'error' in body:
+            raise RuntimeError(body['error'])
+        return body
+
+    recorder.run('routes', 'GET /', lambda: call('GET', '/'), rows)
+    for chart_type in CHART_TYPES:
+        recorder.run('routes', f'GET /get_data?type={chart_type}', lambda: call('GET', f'/get_data?type={chart_type}'), rows)
+    recorder.run('routes', 'GET /get_brands', lambda: call('GET', '/get_brands'), rows)
+
+    routes = [
+        ('POST /run_regression[linear]', '/run_regression', {'target': 'price', 'features': ['original_price', 'discount'], 'technique': 'linear'}),
+        ('POST /predict', '/predict', {'target': 'price', 'inputs': {'original_price': 1999.0, 'discount': 40.0}}),
+        ('POST /run_regression[svr]', '/run_regression', {'target': 'price', 'features': ['original_price', 'discount'], 'technique': 'svr'}),
+        ('POST /run_classification[decision_tree]', '/run_classification', {'target': 'price_category', 'features': ['brand', 'discount'], 'technique': 'decision_tree'}),
+        ('POST /predict_class', '/predict_class', {'target': 'price_category', 'inputs': {'brand': cleaned['brand'].iloc[0], 'discount': 30.0}}),
+        ('POST /run_classification[brand_popularity]', '/run_classification', {'target': 'brand_popularity', 'features': ['discount'], 'technique': 'decision_tree'}),
+        ('POST /run_clustering[kmeans]', '/run_clustering', {'group_by': 'subcategory', 'technique': 'kmeans', 'features': ['price', 'discount']}),
+        ('POST /run_clustering[hierarchical]', '/run_clustering', {'group_by': 'subcategory', 'technique': 'hierarchical', 'features': ['price', 'discount', 'rating']}),
+        ('POST /refresh_model', '/refresh_model', {'kind': 'regression', 'target': 'price', 'features': ['original_price', 'discount']}),
+        ('POST /run_sweep', '/run_sweep', {'specs': [
+            {'kind': 'regression', 'target': 'price', 'features': ['original_price', 'discount']},
+            {'kind': 'regression', 'target': 'rating', 'features': ['price', 'discount']}
+        ]})
+    ]
+    for name, url, payload in routes:
+        if rows > ROUTE_ROW_LIMITS.get(name, rows):
+            recorder.skip('routes', name, rows, f'table larger than {ROUTE_ROW_LIMITS[name]} rows')
+        else:
+            recorder.run('routes', name, lambda: call('POST', url, payload), rows, repeat=1)
+
+    recorder.run('routes', 'GET /models', lambda: call('GET', '/models'), rows)
+
+def environment():
+    import sklearn
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__
+    }
+
+def compare(baseline_path, current_path):
+    with open(baseline_path) as f:
+        baseline = {(r['group'], r['name'], r['size']): r for r in json.load(f)['results']}
+    with open(current_path) as f:
+        current = json.load(f)['results']
+
+    for row in current:
+        before = baseline.get((row['group'], row['name'], row['size']))
+        if not before or 'seconds_median' not in row or 'seconds_median' not in before:
+            continue
+        ratio = row['seconds_median'] / before['seconds_median'] if before['seconds_median'] else float('inf')
+        flag = 'slower' if ratio > 1.1 else 'faster' if ratio < 0.9 else ''
+        print(f"{row['size']:>5} {row['group']:>10} {row['name']:<50} {before['seconds_median']:>10.4f}s -> {row['seconds_median']:>10.4f}s  x{ratio:.2f} {flag}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark preprocess, ml and Flask routes on synthetic data')
+    parser.add_argument('--sizes', nargs='+', default=['10k'], choices=list(SIZES))
+    parser.add_argument('--groups', nargs='+', default=['preprocess', 'ml', 'routes'], choices=['preprocess', 'ml', 'routes'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    warnings.simplefilter('ignore')
+    workdir = tempfile.mkdtemp(prefix='bench_')
+    db_path = os.path.join(workdir, 'myntradb.sqlite')
+    models_dir = os.path.join(workdir, 'models')
+    os.makedirs(models_dir)
+    fakedb.install(db_path)
+
+    results = []
+    for size_label in args.sizes:
+        print(f"\n{size_label} rows")
+        products = synthetic.generate_products(SIZES[size_label])
+        cleaned = synthetic.cleaned_products_frame(products)
+        recorder = Recorder(size_label, args.repeat)
+
+        if 'preprocess' in args.groups:
+            bench_preprocess(recorder, products, db_path)
+        if 'ml' in args.groups:
+            bench_ml(recorder, cleaned, models_dir)
+        if 'routes' in args.groups:
+            bench_routes(recorder, cleaned, db_path, models_dir)
+
+        results.extend(recorder.results)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d%H%M%S')}.json")
+    with open(output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    print(f"\nResults written to {output}")
+
+if __name__ == '__main__':
+    main()
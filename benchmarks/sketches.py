@@ -0,0 +1,214 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fakedb
+import sketches
+from synthetic import cleaned_products_frame, generate_products
+
+QUANTILES = [0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99]
+
+def distributions(n, rng):
+    return {
+        'uniform': rng.uniform(0, 1000, n),
+        'lognormal price': np.round(np.exp(rng.normal(7, 0.8, n))),
+        'rating (ties)': np.round(rng.choice([3.5, 3.9, 4.0, 4.1, 4.2, 4.3, 4.5, 5.0], n) + 0.0, 1),
+        'sorted': np.arange(n, dtype=float),
+    }
+
+def rank_error(sorted_values, estimate, q):
+    # Normalized distance from q to the rank interval the estimate occupies;
+    # with ties every q in [share below, share at or below] is exact.
+    n = len(sorted_values)
+    below = np.searchsorted(sorted_values, estimate, side='left') / n
+    upto = np.searchsorted(sorted_values, estimate, side='right') / n
+    return max(0.0, below - q, q - upto)
+
+def max_rank_error(sketch, values):
+    ordered = np.sort(values)
+    return max(rank_error(ordered, sketch.quantile(q), q) for q in QUANTILES)
+
+def check_accuracy(sizes, limit):
+    failed = False
+    rng = np.random.default_rng(7)
+    print("Rank error vs exact quantiles (k=%d):" % sketches.SKETCH_K)
+    for n in sizes:
+        for name, values in distributions(n, rng).items():
+            sketch = sketches.KLLSketch(seed=1).update(values)
+            error = max_rank_error(sketch, values)
+            print(f"  n={n:>8} {name:16} retained {sketch.size():5d}  max rank error {error:.4f}")
+            failed |= error > limit
+    return failed
+
+def check_merge(rows, limit):
+    frame = cleaned_products_frame(generate_products(rows))
+    built = sketches.build_sketches(frame)
+    failed = False
+    for col in sketches.SKETCH_COLUMNS:
+        merged = sketches.KLLSketch()
+        for (scope, column), sketch in built.items():
+            if column == col and scope != sketches.GLOBAL_SCOPE:
+                merged.merge(sketch)
+        values = frame[col].dropna().to_numpy(dtype=float)
+        error = max_rank_error(merged, values)
+        restored = sketches.KLLSketch.from_json(built[sketches.GLOBAL_SCOPE, col].to_json())
+        lossless = restored.quantiles(QUANTILES) == built[sketches.GLOBAL_SCOPE, col].quantiles(QUANTILES)
+        print(f"  merged per-category {col:15} n={merged.n} max rank error {error:.4f}  json round trip {'exact' if lossless else 'CHANGED'}")
+        failed |= error > limit or not lossless or merged.n != len(values)
+    return failed
+
+def check_incremental(rows, batches, limit):
+    # Rebuild from a first slice, then stream the rest through
+    # preprocess.upsert_cleaned_rows the way the scraper ingests.
+    workdir = tempfile.mkdtemp(prefix='sketches_')
+    path = os.path.join(workdir, 'myntradb.sqlite')
+    frame = cleaned_products_frame(generate_products(rows))
+    first = frame.iloc[:rows // 4]
+    connect = fakedb.install(path)
+    import preprocess
+
+    # The real table, so re-sent ids hit its primary key.
+    db = connect()
+    cursor = db.cursor()
+    preprocess.create_cleaned_table(cursor)
+    db.commit()
+    fakedb.load_table(path, 'cleaned_products', first)
+    sketches.rebuild_sketches(cursor)
+    db.commit()
+
+    # Some rows arrive without a rating or original price, for
+    # impute_missing_means to fill in afterwards.
+    rest = frame.iloc[rows // 4:].copy()
+    rest.loc[rest.index[::37], 'rating'] = np.nan
+    rest.loc[rest.index[::53], 'original_price'] = np.nan
+    started = time.perf_counter()
+    for bounds in np.array_split(np.arange(len(rest)), batches):
+        preprocess.upsert_cleaned_rows(rest.iloc[bounds], cursor)
+        db.commit()
+    elapsed = time.perf_counter() - started
+    # Re-sending rows that are already stored must not count them twice.
+    preprocess.upsert_cleaned_rows(rest.iloc[:100], cursor)
+    db.commit()
+
+    # Repriced rows, one of them moved to another category: their new values
+    # go in directly and the old ones stay in as stale values.
+    repriced = frame.iloc[:rows // 20].copy()
+    repriced['price'] = repriced['price'] * 3
+    repriced.loc[repriced.index[0], 'category'] = 'Moved'
+    started = time.perf_counter()
+    preprocess.upsert_cleaned_rows(repriced, cursor)
+    db.commit()
+    overwritten = time.perf_counter() - started
+    started = time.perf_counter()
+    filled = preprocess.impute_missing_means(cursor)
+    db.commit()
+    imputed = time.perf_counter() - started
+
+    failed = check_stored(cursor, limit, stale=len(repriced), label='stale')
+    due = sketches.rebuild_if_due(cursor)
+    print(f"  rebuild due at the default {sketches.STALE_FRACTION:.0%} threshold: {due}")
+    failed |= due
+    started = time.perf_counter()
+    rebuilt = sketches.rebuild_if_due(cursor, fraction=len(repriced) / rows / 2, minimum=0)
+    db.commit()
+    print(f"  rebuild due at half the stale share: {rebuilt} ({time.perf_counter() - started:.2f}s)")
+    failed |= not rebuilt or check_stored(cursor, limit, stale=0, label='rebuilt')
+    print(f"  {batches} upsert batches of ~{len(rest) // batches} rows with sketch updates: {elapsed:.2f}s; "
+          f"{len(repriced)} repriced rows: {overwritten:.2f}s; imputing {filled} rows: {imputed:.2f}s")
+    cursor.close()
+    db.close()
+    return failed, path
+
+def check_stored(cursor, limit, stale, label):
+    # Each sketch's n is the table's count plus its stale values, and its
+    # rank error stays within the sketch's own plus the stale share of n.
+    table = sketches.scan_cleaned(cursor)
+    stored = sketches.load_sketches(cursor)
+    failed = False
+    for col in sketches.SKETCH_COLUMNS:
+        sketch = stored[sketches.GLOBAL_SCOPE, col]
+        values = table[col].dropna().to_numpy(dtype=float)
+        error = max_rank_error(sketch, values)
+        print(f"  {label} {col:15} n={sketch.n} stale={sketch.stale} (table {len(values)}) max rank error {error:.4f}")
+        failed |= error > limit + sketch.stale / sketch.n or sketch.n != len(values) + sketch.stale
+        failed |= col == 'price' and sketch.stale != stale
+    worst = 0.0
+    for category, group in table.groupby('category'):
+        for col in sketches.SKETCH_COLUMNS:
+            sketch = stored.get((sketches.category_scope(category), col), sketches.KLLSketch())
+            values = group[col].dropna().to_numpy(dtype=float)
+            failed |= sketch.n != len(values) + sketch.stale
+            if len(values):
+                worst = max(worst, max_rank_error(sketch, values) - sketch.stale / sketch.n)
+    failed |= worst > limit
+    print(f"  {label} per-category sketches: worst max rank error beyond the stale share {worst:.4f}")
+    return failed
+
+def time_queries(rows):
+    values = pd.Series(np.exp(np.random.default_rng(3).normal(7, 0.8, rows)))
+    sketch = sketches.KLLSketch().update(values.to_numpy())
+    sketch.quantile(0.5)
+
+    started = time.perf_counter()
+    for _ in range(20):
+        values.quantile(0.05), values.quantile(0.95)
+    exact = (time.perf_counter() - started) / 20
+    started = time.perf_counter()
+    for _ in range(20):
+        sketch.quantile(0.05), sketch.quantile(0.95)
+    estimated = (time.perf_counter() - started) / 20
+    print(f"  p5/p95 over {rows} rows: exact {exact * 1000:.2f} ms, sketch {estimated * 1000:.3f} ms ({sketch.size()} retained)")
+
+def check_app(path):
+    os.chdir(os.path.dirname(path))
+    import app
+    client = app.app.test_client()
+    failed = False
+    for chart in sketches.PERCENTILE_CHARTS:
+        boxes = client.get(f'/get_data?type={chart}').get_json()
+        ordered = all(p5 <= p25 <= p50 <= p75 <= p95 for p5, p25, p75, p95, p50 in (box['y'] for box in boxes))
+        print(f"  /get_data?type={chart}: {len(boxes)} categories, whiskers ordered: {ordered}")
+        failed |= not boxes or not ordered
+
+    body = {'target': 'price', 'features': ['original_price', 'discount', 'rating'], 'technique': 'linear'}
+    for mode in ('exact', 'sketch'):
+        app.app.config['OUTLIER_BOUNDS'] = mode
+        result = client.post('/run_regression', json=body).get_json()
+        print(f"  regression with {mode} outlier bounds: r2 {result.get('r2')} train points {result.get('points', {}).get('train', {}).get('total')}")
+        failed |= 'error' in result
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description='KLL sketch accuracy against exact quantiles, merging, incremental upkeep and query time')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batches', type=int, default=40)
+    parser.add_argument('--max-rank-error', type=float, default=0.02)
+    args = parser.parse_args()
+
+    failed = check_accuracy(args.sizes, args.max_rank_error)
+    print("Merge and persistence:")
+    failed |= check_merge(args.rows, args.max_rank_error)
+    print("Incremental updates:")
+    incremental_failed, path = check_incremental(args.rows, args.batches, args.max_rank_error)
+    failed |= incremental_failed
+    print("Query time:")
+    time_queries(max(args.sizes))
+    print("App:")
+    failed |= check_app(path)
+
+    if failed:
+        print(f"Sketch checks failed (max rank error {args.max_rank_error})")
+        sys.exit(1)
+    print("All sketch checks passed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from product_scrape import MyntraScraper
+
+# Median MRP (Rs.), log-normal spread and typical discount ceiling per
+# top-level category, roughly matching what the scraper sees on Myntra.
+CATEGORY_PROFILES = {
+    "Topwear": (1200, 0.45, 70),
+    "Bottomwear": (1600, 0.40, 70),
+    "Footwear": (3000, 0.55, 60),
+    "Sports & Active Wear": (1800, 0.50, 65),
+    "Indian & Festive Wear": (2500, 0.60, 75),
+    "Fashion Accessories": (900, 0.70, 60),
+    "Gadgets": (4000, 0.80, 80)
+}
+
+RATING_MISSING_RATE = 0.3
+NO_DISCOUNT_RATE = 0.15
+
+def _subcategory_table():
+    rows = []
+    for category, subcategories in MyntraScraper.CATEGORY_MAP.items():
+        for subcategory, path in subcategories.items():
+            rows.append((category, subcategory, path))
+    return rows
+
+def _format_rupees(values):
+    return [f"Rs. {int(v):,}" for v in values]
+
+def generate_products(n_rows, seed=42):
+    rng = np.random.default_rng(seed)
+    subcategories = _subcategory_table()
+
+    picks = rng.integers(0, len(subcategories), n_rows)
+    category = np.array([subcategories[i][0] for i in picks], dtype=object)
+    subcategory = np.array([subcategories[i][1] for i in picks], dtype=object)
+    path = np.array([subcategories[i][2] for i in picks], dtype=object)
+
+    n_brands = max(200, n_rows // 50)
+    weights = 1.0 / np.arange(1, n_brands + 1) ** 1.1
+    brand_ids = rng.choice(n_brands, size=n_rows, p=weights / weights.sum())
+    brand_premium = rng.lognormal(0, 0.35, n_brands)
+
+    median = np.array([CATEGORY_PROFILES[c][0] for c in category], dtype=float)
+    spread = np.array([CATEGORY_PROFILES[c][1] for c in category], dtype=float)
+    max_discount = np.array([CATEGORY_PROFILES[c][2] for c in category], dtype=float)
+
+    original_price = np.round(median * brand_premium[brand_ids] * np.exp(rng.normal(0, spread)), -1).clip(99, None)
+    discount = np.round(rng.uniform(0, 1, n_rows) * max_discount)
+    discount[rng.uniform(0, 1, n_rows) < NO_DISCOUNT_RATE] = 0
+    price = np.floor(original_price * (1 - discount / 100))
+
+    rating = np.round(np.clip(rng.normal(4.1, 0.35, n_rows), 1, 5), 1)
+    rating_missing = rng.uniform(0, 1, n_rows) < RATING_MISSING_RATE
+
+    return pd.DataFrame({
+        'id': np.arange(1, n_rows + 1),
+        'brand': [f"Brand {i:05d}" for i in brand_ids],
+        'name': [f"Men {s} {i}" for s, i in zip(subcategory, range(n_rows))],
+        'price': price,
+        'original_price': original_price,
+        'discount': discount,
+        'rating': np.where(rating_missing, np.nan, rating),
+        'category': category,
+        'subcategory': subcategory,
+        'path': path
+    })
+
+def myntra_products_frame(products):
+    has_discount = products['discount'] > 0
+    return pd.DataFrame({
+        'id': products['id'],
+        'brand': products['brand'],
+        'name': products['name'],
+        'price': _format_rupees(products['price']),
+        'original_price': np.where(has_discount, _format_rupees(products['original_price']), ''),
+        'discount': np.where(has_discount, [f"{int(d)}%" for d in products['discount']], ''),
+        'rating': [f"{r:.1f}" if pd.notna(r) else '' for r in products['rating']],
+        'image_url': [f"https://assets.myntassets.com/images/{i}.jpg" for i in products['id']],
+        'product_url': [f"{MyntraScraper.BASE_URL}{p}/{i}/buy" for p, i in zip(products['path'], products['id'])],
+        'category': products['category'],
+        'subcategory': products['subcategory'],
+        'created_at': pd.Timestamp('2025-05-01')
+    })
+
+def cleaned_products_frame(products):
+    rating = products['rating'].fillna(products['rating'].mean())
+    return pd.DataFrame({
+        'id': products['id'],
+        'brand': products['brand'],
+        'name': products['name'],
+        'price': products['price'],
+        'original_price': products['original_price'],
+        'discount': products['discount'],
+        'rating': rating,
+        'category': products['category'],
+        'subcategory': products['subcategory']
+    })
@@ -0,0 +1,80 @@
+import threading
+import time
+from bisect import bisect_left
+
+import metrics
+
+VERSION_TTL = 5.0
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+VERSION_QUERY = "SELECT COUNT(*), MAX(updated_at) FROM cleaned_products"
+BRAND_COUNTS_QUERY = """
+    SELECT brand, COUNT(*)
+    FROM cleaned_products
+    WHERE brand IS NOT NULL AND brand != ''
+    GROUP BY brand
+"""
+
+class BrandIndex:
+    # Sorted, case-folded list of every brand in cleaned_products with its
+    # product count. A prefix search is two binary searches plus a slice. The
+    # index is rebuilt only when the table's data version changes, and the
+    # version is checked at most once per VERSION_TTL seconds.
+    def __init__(self, connect, ttl=VERSION_TTL):
+        self.connect = connect
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0.0
+        self.entries = ([], [], [])
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.checked_at < self.ttl:
+            metrics.cache_event('brand_index', True)
+            return False
+
+        with self.lock:
+            if not force and now - self.checked_at < self.ttl:
+                metrics.cache_event('brand_index', True)
+                return False
+
+            conn = self.connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(VERSION_QUERY)
+                version = tuple(str(v) for v in cursor.fetchone())
+                rebuilt = version != self.version
+                metrics.cache_event('brand_index', not rebuilt)
+                if rebuilt:
+                    cursor.execute(BRAND_COUNTS_QUERY)
+                    self.build(cursor.fetchall())
+                    self.version = version
+                cursor.close()
+            finally:
+                conn.close()
+
+            self.checked_at = time.monotonic()
+            return rebuilt
+
+    def build(self, rows):
+        rows = sorted(rows, key=lambda row: (row[0].casefold(), row[0]))
+        # Swap in one tuple so concurrent searches see either the old index or
+        # the new one, never a mix.
+        self.entries = ([row[0].casefold() for row in rows], [row[0] for row in rows], [int(row[1]) for row in rows])
+
+    def search(self, prefix='', offset=0, limit=DEFAULT_LIMIT):
+        keys, brands, counts = self.entries
+        prefix = prefix.strip().casefold()
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + '\U0010ffff', lo) if prefix else len(keys)
+
+        start = min(lo + offset, hi)
+        end = min(start + limit, hi)
+        return {
+            'brands': [{'brand': brands[i], 'count': counts[i]} for i in range(start, end)],
+            'total': hi - lo,
+            'offset': offset,
+            'limit': limit
+        }
@@ -0,0 +1,137 @@
+import functools
+import os
+import threading
+import time
+
+from flask import jsonify
+
+import metrics
+
+READ_POOL_SIZE = 4
+READ_POOL_TIMEOUT = 10.0
+RECYCLE_SECONDS = 300.0
+TRAINING_CONCURRENCY = 1
+TRAINING_WAIT_SECONDS = 10.0
+RETRY_AFTER_SECONDS = 5
+
+class PoolTimeout(Exception):
+    pass
+
+def setting(value):
+    # Sizes and timeouts may be given as callables, read on first use, so a
+    # config set after import (e.g. app.config in a test or an app factory)
+    # still applies.
+    return value() if callable(value) else value
+
+class PooledConnection:
+    # close() hands the connection back to the pool, so callers keep the
+    # usual connect() ... close() pattern.
+    def __init__(self, pool, conn, opened):
+        self.pool = pool
+        self.conn = conn
+        self.opened = opened
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def close(self):
+        if self.conn is not None:
+            conn, self.conn = self.conn, None
+            self.pool.release(conn, self.opened)
+
+class ConnectionPool:
+    # A small per-worker pool of read connections. At most `size` are checked
+    # out at once; further callers wait up to `timeout` seconds. Connections
+    # are rolled back on release, so the next read does not reuse an old
+    # REPEATABLE READ snapshot, and reopened after RECYCLE_SECONDS so MySQL's
+    # wait_timeout never closes one under us.
+    def __init__(self, connect, size=READ_POOL_SIZE, timeout=READ_POOL_TIMEOUT, recycle=RECYCLE_SECONDS):
+        self.open_connection = connect
+        self.settings = (size, timeout)
+        self.recycle = recycle
+        self.init_lock = threading.Lock()
+        self.pid = None
+
+    def reset(self):
+        self.size, self.timeout = map(setting, self.settings)
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(self.size)
+        self.idle = []
+        self.pid = os.getpid()
+
+    def connect(self):
+        if self.pid != os.getpid():
+            # Built on first use, and again in a process forked from one that
+            # may have opened connections; never share its sockets.
+            with self.init_lock:
+                if self.pid != os.getpid():
+                    self.reset()
+        with metrics.stage('queue'):
+            acquired = self.slots.acquire(timeout=self.timeout)
+        if not acquired:
+            metrics.rejected('read_pool')
+            raise PoolTimeout(f'No read connection free after {self.timeout}s')
+
+        try:
+            with self.lock:
+                entry = self.idle.pop() if self.idle else None
+            if entry and time.monotonic() - entry[1] > self.recycle:
+                self.discard(entry[0])
+                entry = None
+            if entry is None:
+                entry = (self.open_connection(), time.monotonic())
+        except Exception:
+            self.slots.release()
+            raise
+        return PooledConnection(self, *entry)
+
+    def release(self, conn, opened):
+        try:
+            conn.rollback()
+        except Exception:
+            self.discard(conn)
+        else:
+            with self.lock:
+                self.idle.append((conn, opened))
+        self.slots.release()
+
+    def discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+class Limiter:
+    # Caps how many requests of one kind run at once in a worker. Extra
+    # requests wait up to `wait` seconds, then get a 503 with Retry-After
+    # instead of tying up threads the read routes need.
+    def __init__(self, name, limit, wait):
+        self.name = name
+        self.settings = (limit, wait)
+        self.init_lock = threading.Lock()
+        self.slots = None
+
+    def ready(self):
+        with self.init_lock:
+            if self.slots is None:
+                self.limit, self.wait = map(setting, self.settings)
+                self.slots = threading.BoundedSemaphore(self.limit)
+        return self.slots
+
+    def __call__(self, view):
+        @functools.wraps(view)
+        def limited(*args, **kwargs):
+            slots = self.ready()
+            with metrics.stage('queue'):
+                acquired = slots.acquire(timeout=self.wait)
+            if not acquired:
+                metrics.rejected(self.name)
+                response = jsonify({'error': f'Too many {self.name} requests running, please retry shortly'})
+                response.status_code = 503
+                response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+                return response
+            try:
+                return view(*args, **kwargs)
+            finally:
+                slots.release()
+        return limited
@@ -0,0 +1,362 @@
+import argparse
+import hashlib
+import json
+import queue
+import random
+import signal
+import sqlite3
+import threading
+import time
+from datetime import date
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import TimeoutException
+
+import history
+import preprocess
+import sketches
+from product_scrape import FETCHERS, MyntraScraper
+
+DEFAULT_WORKERS = 3
+DEFAULT_MAX_PAGES = 3
+HOST_MIN_INTERVAL = 2.0
+MAX_RETRIES = 3
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 60.0
+STATE_PATH = "crawl_state.sqlite"
+
+class HostLimiter:
+    # Spaces out requests to the same host across all workers; each call
+    # reserves the next free slot so concurrent workers queue up behind it.
+    def __init__(self, min_interval=HOST_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, url, stop_event=None):
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.min_interval
+
+        delay = slot - time.monotonic()
+        if delay > 0:
+            if stop_event:
+                stop_event.wait(delay)
+            else:
+                time.sleep(delay)
+
+class CrawlState:
+    # Checkpoints finished (url, page) units of a crawl run in a local SQLite
+    # file, so a crawl that crashed or was interrupted can pick up the
+    # remaining pages instead of starting over.
+    def __init__(self, path=STATE_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS crawl_runs (id INTEGER PRIMARY KEY AUTOINCREMENT, started_at REAL, finished_at REAL)""")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS crawl_units (run_id INTEGER, url TEXT, page INTEGER, status TEXT, content_hash TEXT, products INTEGER, completed_at REAL, PRIMARY KEY (run_id, url, page))""")
+        self.conn.commit()
+        self.run_id = None
+
+    def start(self, resume=False):
+        with self.lock:
+            row = None
+            if resume:
+                row = self.conn.execute("""SELECT id FROM crawl_runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1""").fetchone()
+            if row:
+                self.run_id = row[0]
+            else:
+                self.run_id = self.conn.execute("""INSERT INTO crawl_runs (started_at) VALUES (?)""", (time.time(),)).lastrowid
+                self.conn.commit()
+            return self.run_id, bool(row)
+
+    def completed(self):
+        with self.lock:
+            rows = self.conn.execute("""SELECT url, page, status FROM crawl_units WHERE run_id = ?""", (self.run_id,)).fetchall()
+        done = {(url, page) for url, page, status in rows}
+        ended = {}
+        for url, page, status in rows:
+            if status == 'end':
+                ended[url] = min(page, ended.get(url, page))
+        return done, ended
+
+    def seen_hash(self, url, content_hash):
+        with self.lock:
+            row = self.conn.execute("""SELECT page FROM crawl_units WHERE run_id = ? AND url = ? AND content_hash = ? AND status = 'done'""", (self.run_id, url, content_hash)).fetchone()
+        return row[0] if row else None
+
+    def mark(self, url, page, status, content_hash=None, products=0):
+        with self.lock:
+            self.conn.execute("""INSERT OR REPLACE INTO crawl_units (run_id, url, page, status, content_hash, products, completed_at) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                              (self.run_id, url, page, status, content_hash, products, time.time()))
+            self.conn.commit()
+
+    def finish(self):
+        with self.lock:
+            self.conn.execute("""UPDATE crawl_runs SET finished_at = ? WHERE id = ?""", (time.time(), self.run_id))
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+def content_hash(raw_products):
+    return hashlib.sha1(json.dumps(raw_products, sort_keys=True).encode("utf-8")).hexdigest()
+
+def group_targets(category_map):
+    targets = {}
+    for category, subcategories in category_map.items():
+        for subcategory, url in subcategories.items():
+            targets.setdefault(url, []).append((category, subcategory))
+    return targets
+
+def build_tasks(category_map, max_pages, done=(), ended=None):
+    # Page-major order so the first pages of every listing are fetched before
+    # anyone goes deep into a single one. Each unique URL is one task per page,
+    # carrying every subcategory it feeds.
+    ended = ended or {}
+    tasks = []
+    for page in range(1, max_pages + 1):
+        for url, targets in group_targets(category_map).items():
+            if (url, page) in done or page >= ended.get(url, max_pages + 1):
+                continue
+            tasks.append({'url': url, 'targets': targets, 'page': page, 'attempt': 0})
+    return tasks
+
+def backoff_delay(attempt):
+    return min(BACKOFF_CAP, BACKOFF_BASE ** attempt) * random.uniform(0.5, 1.0)
+
+class Crawler:
+    def __init__(self, category_map=None, workers=DEFAULT_WORKERS, max_pages=DEFAULT_MAX_PAGES,
+                 min_interval=HOST_MIN_INTERVAL, max_retries=MAX_RETRIES, scraper_factory=None,
+                 state=None, resume=False, ingest=False):
+        self.category_map = category_map or MyntraScraper.CATEGORY_MAP
+        self.workers = workers
+        self.max_pages = max_pages
+        self.max_retries = max_retries
+        self.scraper_factory = scraper_factory or (lambda: MyntraScraper(headless=True, history_tables=False))
+        self.limiter = HostLimiter(min_interval)
+        self.state = state
+        self.resume = resume
+        self.ingest = ingest
+
+        self.tasks = queue.Queue()
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        # First page past the end of each listing; earlier pages still run,
+        # e.g. a page 1 retried after page 3 came back empty.
+        self.exhausted = {}
+        # Tasks queued or in flight, including one sleeping out a retry
+        # backoff before it goes back on the queue.
+        self.pending = 0
+        self.stats = {'pages': 0, 'extracted': 0, 'inserted': 0, 'updated': 0, 'retries': 0, 'failed': 0, 'skipped': 0,
+                      'resumed': 0, 'duplicates': 0}
+
+    def record(self, **counts):
+        with self.lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def run_task(self, scraper, task):
+        url, page = task['url'], task['page']
+        if page >= self.exhausted.get(url, page + 1):
+            self.record(skipped=1)
+            return
+
+        self.limiter.wait(scraper.page_url(url, page), self.stop_event)
+        if self.stop_event.is_set():
+            return
+
+        try:
+            result = scraper.scrape_page(url, page, task['targets'])
+        except TimeoutException:
+            # Past the last page the listing renders no product cards.
+            if page > 1:
+                result = None
+            else:
+                raise
+
+        if not result:
+            self.end_listing(url, page)
+            return
+
+        raw_products, inserted, updated = result
+        page_hash = content_hash(raw_products)
+        if self.state:
+            # Some listings serve the last page again past the end; a repeat
+            # of an earlier page's records ends the listing too.
+            repeated = self.state.seen_hash(url, page_hash)
+            if repeated is not None and repeated != page:
+                self.record(duplicates=1)
+                self.end_listing(url, page)
+                return
+            self.state.mark(url, page, 'done', page_hash, len(raw_products))
+
+        self.record(pages=1, extracted=len(raw_products), inserted=inserted, updated=updated)
+
+    def add_task(self, task):
+        with self.lock:
+            self.pending += 1
+        self.tasks.put(task)
+
+    def finish_task(self):
+        with self.lock:
+            self.pending -= 1
+
+    def end_listing(self, url, page):
+        with self.lock:
+            self.exhausted[url] = min(page, self.exhausted.get(url, page))
+        if self.state:
+            self.state.mark(url, page, 'end')
+
+    def worker(self, index):
+        try:
+            scraper = self.scraper_factory()
+        except Exception as e:
+            print(f"Worker {index} failed to start: {str(e)[:80]}")
+            return
+
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    task = self.tasks.get(timeout=0.5)
+                except queue.Empty:
+                    # An empty queue alone is not the end: another worker may
+                    # be about to put a retried page back.
+                    if not self.pending:
+                        return
+                    continue
+
+                try:
+                    self.run_task(scraper, task)
+                    self.finish_task()
+                except Exception as e:
+                    if task['attempt'] < self.max_retries and not self.stop_event.is_set():
+                        task['attempt'] += 1
+                        delay = backoff_delay(task['attempt'])
+                        print(f"Worker {index}: {task['url']} page {task['page']} failed ({str(e)[:50]}), retry {task['attempt']} in {delay:.1f}s")
+                        self.record(retries=1)
+                        self.stop_event.wait(delay)
+                        self.tasks.put(task)
+                    else:
+                        print(f"Worker {index}: giving up on {task['url']} page {task['page']}: {str(e)[:50]}")
+                        self.record(failed=1)
+                        self.finish_task()
+                finally:
+                    self.tasks.task_done()
+        finally:
+            scraper.close()
+
+    def stop(self, *args):
+        if not self.stop_event.is_set():
+            print("Stopping after in-flight pages finish...")
+        self.stop_event.set()
+
+    def impute_means(self):
+        # Workers write cleaned rows without global-mean imputation; fill the
+        # gaps once, after every worker has finished, so the means cover the
+        # whole crawl. The column sketches get their scheduled rebuild check
+        # here too, rather than after every page.
+        db = preprocess.connect_to_db()
+        try:
+            cursor = db.cursor()
+            self.stats['imputed'] = preprocess.impute_missing_means(cursor)
+            self.stats['sketches_rebuilt'] = sketches.rebuild_if_due(cursor)
+            db.commit()
+        finally:
+            db.close()
+
+    def prepare_history(self):
+        # Tables and this month's partitions are created once, before the
+        # workers start, rather than by every worker's setup_db at once.
+        db = preprocess.connect_to_db()
+        try:
+            cursor = db.cursor()
+            history.create_history_tables(cursor)
+            db.commit()
+        finally:
+            db.close()
+
+    def rollup_history(self, since):
+        # One rollup after the workers are done, covering every day the crawl
+        # ran on, instead of each worker recomputing the same days.
+        db = preprocess.connect_to_db()
+        try:
+            cursor = db.cursor()
+            history.rollup_days(cursor, history.days_between(since, date.today()))
+            db.commit()
+        finally:
+            db.close()
+
+    def run(self):
+        done, ended = set(), {}
+        if self.state:
+            run_id, resumed = self.state.start(self.resume)
+            if resumed:
+                done, ended = self.state.completed()
+                print(f"Resuming crawl run {run_id}: {len(done)} page(s) already finished")
+            self.stats['resumed'] = len(done)
+
+        for task in build_tasks(self.category_map, self.max_pages, done, ended):
+            self.add_task(task)
+
+        self.prepare_history()
+        started = time.perf_counter()
+        started_on = date.today()
+        threads = [threading.Thread(target=self.worker, args=(i,), name=f"crawler-{i}") for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+
+        if self.stats['pages']:
+            self.rollup_history(started_on)
+        if self.ingest:
+            self.impute_means()
+
+        self.stats['seconds'] = round(time.perf_counter() - started, 2)
+        self.stats['interrupted'] = self.stop_event.is_set()
+        if self.state and not self.stats['interrupted'] and not self.stats['failed']:
+            self.state.finish()
+        return self.stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl every CATEGORY_MAP subcategory with a pool of browser workers")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--max-pages", type=int, default=DEFAULT_MAX_PAGES)
+    parser.add_argument("--delay", type=float, default=HOST_MIN_INTERVAL, help="minimum seconds between requests to one host")
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES)
+    parser.add_argument("--base-url", help="crawl a different host, e.g. the local fixture server")
+    parser.add_argument("--fetcher", choices=sorted(FETCHERS), default="browser", help="'http' reads listings without launching Chrome")
+    parser.add_argument("--show-browser", action="store_true")
+    parser.add_argument("--ingest", action="store_true", help="also write cleaned rows to cleaned_products as pages are scraped")
+    parser.add_argument("--state", default=STATE_PATH, help="SQLite file that checkpoints finished pages")
+    parser.add_argument("--resume", action="store_true", help="continue the last unfinished crawl instead of starting a new one")
+    args = parser.parse_args()
+
+    crawler = Crawler(
+        workers=args.workers,
+        max_pages=args.max_pages,
+        min_interval=args.delay,
+        max_retries=args.retries,
+        scraper_factory=lambda: MyntraScraper(headless=not args.show_browser, base_url=args.base_url, fetcher=args.fetcher, ingest=args.ingest, history_tables=False),
+        state=CrawlState(args.state),
+        resume=args.resume,
+        ingest=args.ingest
+    )
+    signal.signal(signal.SIGINT, crawler.stop)
+    signal.signal(signal.SIGTERM, crawler.stop)
+
+    try:
+        stats = crawler.run()
+    finally:
+        crawler.state.close()
+    print(f"Crawl {'interrupted' if stats['interrupted'] else 'completed'} in {stats['seconds']}s: "
+          f"{stats['pages']} pages, {stats['inserted']} inserted, {stats['updated']} updated, "
+          f"{stats['retries']} retries, {stats['failed']} failed, {stats['resumed']} resumed")
+
+if __name__ == "__main__":
+    print("MYNTRA MEN'S PRODUCT CRAWLER")
+    main()
@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pandas as pd
+
+import metrics
+from brand_index import VERSION_QUERY
+
+VERSION_TTL = 5.0
+
+# One grouped scan of cleaned_products. Each row holds the partial sums and
+# counts every chart needs for one (category, subcategory, brand) cell, and the
+# charts roll those cells up in pandas. Averages stay exact because they are
+# rebuilt from sums and counts rather than averaged twice.
+ROLLUP_QUERY = """
+    SELECT category, subcategory, brand,
+        COUNT(*) AS n,
+        SUM(price) AS price_sum, COUNT(price) AS price_n,
+        SUM(original_price) AS original_sum, COUNT(original_price) AS original_n,
+        SUM(rating) AS rating_sum, COUNT(rating) AS rating_n,
+        SUM(CASE WHEN discount IS NOT NULL AND rating IS NOT NULL THEN 1 ELSE 0 END) AS rated_discount_n,
+        SUM(CASE WHEN rating IS NOT NULL THEN discount END) AS rated_discount_sum,
+        SUM(CASE WHEN discount IS NOT NULL THEN rating END) AS discounted_rating_sum,
+        SUM(CASE WHEN rating > 4 AND price < 1000 THEN 1 ELSE 0 END) AS best_n,
+        SUM(CASE WHEN rating > 4 AND price < 1000 THEN discount END) AS best_discount_sum,
+        COUNT(CASE WHEN rating > 4 AND price < 1000 THEN discount END) AS best_discount_n
+    FROM cleaned_products
+    GROUP BY category, subcategory, brand
+"""
+
+SUM_COLUMNS = ['n', 'price_sum', 'price_n', 'original_sum', 'original_n', 'rating_sum', 'rating_n',
+               'rated_discount_n', 'rated_discount_sum', 'discounted_rating_sum',
+               'best_n', 'best_discount_sum', 'best_discount_n']
+
+def load_rollup(conn):
+    cursor = conn.cursor()
+    cursor.execute(ROLLUP_QUERY)
+    df = pd.DataFrame(cursor.fetchall(), columns=[d[0] for d in cursor.description])
+    cursor.close()
+
+    for col in SUM_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+    return df
+
+def load_sample(conn, sample_query):
+    cursor = conn.cursor()
+    cursor.execute(sample_query)
+    rows = cursor.fetchall()
+    cursor.close()
+    return [{"x": float(row[0]), "y": float(row[1])} for row in rows]
+
+def roll_up(cells, key):
+    # SUM is NULL-skipping per cell already; min_count keeps an all-NULL sum
+    # NULL (NaN) instead of 0, the way SQL AVG over no values is NULL.
+    return cells.groupby(key, dropna=False, sort=True)[SUM_COLUMNS].sum(min_count=1)
+
+def ranked(stats, column=None, limit=None):
+    # Descending, ties kept in label order; works on a frame column or a series.
+    stats = stats.sort_values(column, ascending=False, kind='stable') if column else stats.sort_values(ascending=False, kind='stable')
+    return stats.head(limit) if limit else stats
+
+def label_of(label):
+    # A NULL group key comes back as NaN; JSON it as null like the SQL path.
+    return None if pd.isna(label) else label
+
+def label_points(values):
+    return [{"label": label_of(label), "y": round(float(value), 2)} for label, value in values.items()]
+
+def price_diff(stats, limit=None):
+    stats = stats[stats['n'] > 5].assign(
+        avg_original=stats['original_sum'] / stats['original_n'],
+        avg_discounted=stats['price_sum'] / stats['price_n']
+    )
+    stats = ranked(stats, 'avg_original', limit=limit)
+    return {
+        "original": label_points(stats['avg_original']),
+        "discounted": label_points(stats['avg_discounted'])
+    }
+
+def compute_charts(cells, correlation_points):
+    # Mirrors app.CHART_QUERIES chart by chart from the rolled-up cells.
+    by_category = roll_up(cells, 'category')
+    by_subcategory = roll_up(cells, 'subcategory')
+    by_brand = roll_up(cells, 'brand')
+    charts = {}
+
+    charts['price_diff_category'] = price_diff(by_category)
+    charts['price_diff_subcategory'] = price_diff(by_subcategory, limit=15)
+
+    counts = ranked(by_category, 'n')['n']
+    charts['product_distribution'] = [{"label": label_of(label), "y": int(count)} for label, count in counts.items()]
+
+    charts['correlation_features'] = correlation_points
+
+    counts = ranked(by_brand, 'n', limit=10)['n']
+    charts['top_selling_brands'] = [{"label": label_of(label), "y": int(count)} for label, count in counts.items()]
+
+    rated = by_brand[by_brand['rating_n'] > 10]
+    charts['rating_distribution'] = label_points(ranked(rated['rating_sum'] / rated['rating_n'], limit=20))
+
+    rated = by_brand[by_brand['rated_discount_n'] > 5]
+    charts['discount_vs_rating'] = [
+        {"x": round(float(discount / n), 2), "y": round(float(rating / n), 2), "label": label_of(label)}
+        for label, discount, rating, n in zip(rated.index, rated['rated_discount_sum'], rated['discounted_rating_sum'], rated['rated_discount_n'])
+    ]
+
+    best = by_category[by_category['best_n'] > 5]
+    avg_discount = best['best_discount_sum'] / best['best_discount_n']
+    charts['best_discounted_high_rated'] = label_points(ranked(avg_discount[avg_discount > 30]))
+
+    return charts
+
+class DashboardCache:
+    # Holds the chart payload for the current data version. The table is read
+    # and aggregated again only when COUNT(*)/MAX(updated_at) moves, checked
+    # at most once per VERSION_TTL seconds.
+    def __init__(self, connect, sample_query, ttl=VERSION_TTL):
+        self.connect = connect
+        self.sample_query = sample_query
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0.0
+        self.payload = None
+
+    def get(self):
+        if self.payload is not None and time.monotonic() - self.checked_at < self.ttl:
+            metrics.cache_event('dashboard', True)
+            return self.payload
+
+        with self.lock:
+            if self.payload is not None and time.monotonic() - self.checked_at < self.ttl:
+                metrics.cache_event('dashboard', True)
+                return self.payload
+
+            conn = self.connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(VERSION_QUERY)
+                version = tuple(str(v) for v in cursor.fetchone())
+                cursor.close()
+
+                rebuilt = version != self.version or self.payload is None
+                metrics.cache_event('dashboard', not rebuilt)
+                if rebuilt:
+                    started = time.perf_counter()
+                    cells = load_rollup(conn)
+                    self.payload = {
+                        'charts': compute_charts(cells, load_sample(conn, self.sample_query)),
+                        'rows': int(cells['n'].sum()),
+                        'version': list(version),
+                        'build_seconds': round(time.perf_counter() - started, 4)
+                    }
+                    self.version = version
+            finally:
+                conn.close()
+
+            self.checked_at = time.monotonic()
+            return self.payload
@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Column dtypes for every DataFrame loaded from myntra_products or
+# cleaned_products. The string dimensions repeat a few thousand values over
+# every row, so they are stored as categoricals. The numeric columns are MySQL
+# FLOATs, i.e. single precision already, so float32 holds them exactly. id is
+# a nullable Int64 so a missing id does not turn the column into floats.
+CATEGORY_COLUMNS = ('brand', 'category', 'subcategory')
+FLOAT_COLUMNS = ('price', 'original_price', 'discount', 'rating')
+INT_COLUMNS = ('id',)
+
+# Columns whose raw myntra_products values are already clean; prices and
+# discounts there are still text like "Rs. 1,299".
+RAW_COLUMNS = CATEGORY_COLUMNS + INT_COLUMNS
+
+ENABLED = True
+
+# Last memory report per load point, e.g. "run_regression" or
+# "preprocess:cleaned".
+REPORTS = {}
+REPORTS_LOCK = threading.Lock()
+
+def policy_dtype(column):
+    if column in CATEGORY_COLUMNS:
+        return 'category'
+    if column in FLOAT_COLUMNS:
+        return 'float32'
+    if column in INT_COLUMNS:
+        return 'Int64'
+    return None
+
+def convert(series, dtype):
+    if dtype == 'category':
+        return series.astype('category')
+    # Values from the driver can be Decimal or None in an object column.
+    return pd.to_numeric(series, errors='coerce').astype(dtype)
+
+def apply_dtypes(df, columns=None):
+    # Converts the policy columns present in df, in place, and returns it.
+    for column in df.columns if columns is None else [col for col in columns if col in df.columns]:
+        dtype = policy_dtype(column)
+        if dtype and df[column].dtype != dtype:
+            df[column] = convert(df[column], dtype)
+    return df
+
+def decimal_float64(values):
+    # float32 -> float64 of the shortest decimal that round-trips, i.e. the
+    # number MySQL prints for a FLOAT and the driver used to hand us (4.3, not
+    # 4.300000190734863). Tries 1 to 9 significant digits per value; dividing
+    # by an exact power of ten rounds correctly, so each candidate is the
+    # nearest double to its decimal.
+    values = np.asarray(values, dtype=np.float32)
+    result = values.astype(np.float64)
+    pending = np.flatnonzero(np.isfinite(result) & (result != 0))
+    magnitude = np.floor(np.log10(np.abs(result[pending]))).astype(int)
+    for digits in range(1, 10):
+        if not len(pending):
+            break
+        wide = result[pending]
+        exponent = digits - 1 - magnitude
+        scale = 10.0 ** np.abs(exponent)
+        candidate = np.where(exponent >= 0, np.round(wide * scale) / scale, np.round(wide / scale) * scale)
+        done = candidate.astype(np.float32) == values[pending]
+        result[pending[done]] = candidate[done]
+        pending, magnitude = pending[~done], magnitude[~done]
+    return result
+
+def model_frame(df):
+    # Copy of df in the dtypes the training code was written against:
+    # decimal-exact float64, object strings with None for missing, int64. The
+    # outlier bounds compare values that sit exactly on a quantile, so float32
+    # arithmetic there would drop different rows and change the metrics.
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if series.dtype == np.float32:
+            series = pd.Series(decimal_float64(series.to_numpy()), index=df.index, name=column)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype(object).where(series.notna(), None)
+        elif series.dtype == 'Int64':
+            series = series.astype('float64' if series.hasnans else 'int64')
+        else:
+            series = series.copy()
+        columns[column] = series
+    return pd.DataFrame(columns, index=df.index)
+
+def memory_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def compact(df, label, columns=None):
+    # apply_dtypes plus a before/after memory report for this load point.
+    if not ENABLED:
+        return df
+    before = memory_bytes(df)
+    apply_dtypes(df, columns)
+    report = {
+        'rows': len(df),
+        'bytes_before': before,
+        'bytes_after': memory_bytes(df),
+        'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()}
+    }
+    with REPORTS_LOCK:
+        REPORTS[label] = report
+    return df
+
+def format_report(label, report):
+    change = report['bytes_after'] / report['bytes_before'] - 1 if report['bytes_before'] else 0.0
+    return f"{label}: {report['rows']} rows, {report['bytes_before'] / 1e6:.2f} MB -> {report['bytes_after'] / 1e6:.2f} MB ({change:+.0%})"
+
+def snapshot():
+    with REPORTS_LOCK:
+        return {label: dict(report) for label, report in REPORTS.items()}
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.model_selection import KFold
+
+from ml import BRAND_HASH_WIDTH, TARGET_ENCODING_SMOOTHING, TARGET_ENCODING_FOLDS
+
+# Custom brand encoders for the classification pipelines. They subclass
+# scikit-learn base classes, so they live apart from ml.py and are imported only
+# when a brand encoding needs them. Artifacts pickled before the move refer to
+# ml.BrandHashingEncoder etc.; ml.__getattr__ resolves those names to here.
+
+def _brand_values(X):
+    values = X.iloc[:, 0] if hasattr(X, 'iloc') else np.asarray(X)[:, 0]
+    return pd.Series(values).astype(str).to_numpy()
+
+class BrandHashingEncoder(BaseEstimator, TransformerMixin):
+    def __init__(self, n_features=BRAND_HASH_WIDTH):
+        self.n_features = n_features
+    
+    def fit(self, X, y=None):
+        self.hasher_ = FeatureHasher(n_features=self.n_features, input_type='string', alternate_sign=False)
+        return self
+    
+    def transform(self, X):
+        return self.hasher_.transform([[brand] for brand in _brand_values(X)])
+
+class BrandFrequencyEncoder(BaseEstimator, TransformerMixin):
+    def fit(self, X, y=None):
+        brands = pd.Series(_brand_values(X))
+        self.frequencies_ = brands.value_counts(normalize=True)
+        return self
+    
+    def transform(self, X):
+        brands = pd.Series(_brand_values(X))
+        return brands.map(self.frequencies_).fillna(0.0).to_numpy().reshape(-1, 1)
+
+class BrandTargetEncoder(BaseEstimator, TransformerMixin):
+    def __init__(self, smoothing=TARGET_ENCODING_SMOOTHING, n_folds=TARGET_ENCODING_FOLDS):
+        self.smoothing = smoothing
+        self.n_folds = n_folds
+    
+    def _class_means(self, brands, y_onehot):
+        sums = pd.DataFrame(y_onehot).groupby(brands).sum()
+        counts = pd.Series(brands).value_counts().reindex(sums.index).to_numpy()[:, None]
+        prior = y_onehot.mean(axis=0)
+        return (sums + self.smoothing * prior) / (counts + self.smoothing), prior
+    
+    def _encode(self, brands, means, prior):
+        encoded = means.reindex(brands).to_numpy()
+        missing = np.isnan(encoded[:, 0])
+        encoded[missing] = prior
+        return encoded
+    
+    def fit(self, X, y):
+        self.fit_transform(X, y)
+        return self
+    
+    def fit_transform(self, X, y):
+        brands = _brand_values(X)
+        self.classes_ = np.unique(y)
+        y_onehot = (np.asarray(y)[:, None] == self.classes_[None, :]).astype(float)
+        self.means_, self.prior_ = self._class_means(brands, y_onehot)
+        
+        # Training rows are encoded with statistics from the other folds so the
+        # classifier never sees its own label leaking through the brand column.
+        encoded = np.empty((len(brands), len(self.classes_)))
+        n_folds = min(self.n_folds, len(brands))
+        for fit_idx, encode_idx in KFold(n_splits=n_folds, shuffle=True, random_state=42).split(brands):
+            means, prior = self._class_means(brands[fit_idx], y_onehot[fit_idx])
+            encoded[encode_idx] = self._encode(brands[encode_idx], means, prior)
+        return encoded
+    
+    def transform(self, X):
+        return self._encode(_brand_values(X), self.means_, self.prior_)
@@ -0,0 +1,34 @@
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+LISTING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'listing')
+
+class ListingHandler(SimpleHTTPRequestHandler):
+    # Serves /men-tshirts?p=2 from men-tshirts-p2.html the way the scraper
+    # paginates Myntra listings; missing pages return 404.
+    def translate_path(self, path):
+        parts = urlsplit(path)
+        page = parse_qs(parts.query).get('p', ['1'])[0]
+        name = parts.path.strip('/') or 'index'
+        filename = f"{name}.html" if page == '1' else f"{name}-p{page}.html"
+        return os.path.join(self.directory, filename)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_fixtures(port=0, directory=LISTING_DIR):
+    server = ThreadingHTTPServer(('127.0.0.1', port), partial(ListingHandler, directory=directory))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+if __name__ == '__main__':
+    server, base_url = serve_fixtures(8008)
+    print(f"Serving fixture listings at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
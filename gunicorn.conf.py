@@ -0,0 +1,19 @@
+# gunicorn -c gunicorn.conf.py app:app
+#
+# The app is imported once in the master and forked into the workers. Each
+# worker then prewarms in the background when PREWARM=1 is set: sklearn
+# imports, the data-version token, the dashboard payload and the most recent
+# models. The timings show up in the worker log and at GET /startup.
+#
+# Threaded workers: a training request holds one thread (and one of the
+# TRAINING_CONCURRENCY slots) while the chart and lookup routes keep being
+# served from the other threads through the read connection pool.
+bind = '0.0.0.0:5000'
+workers = 2
+worker_class = 'gthread'
+threads = 8
+preload_app = True
+
+def post_fork(server, worker):
+    import app
+    app.start_prewarm()
@@ -0,0 +1,209 @@
+import argparse
+import math
+from datetime import date, datetime, timedelta
+
+import mysql.connector
+
+import preprocess
+
+DB_CONFIG = {'host': 'localhost', 'port': 3306, 'user': 'root', 'password': 'root', 'database': 'myntradb'}
+
+HISTORY_COLUMNS = ('price', 'original_price', 'discount', 'rating')
+PARTITION_MONTHS_AHEAD = 3
+DEFAULT_WINDOW_DAYS = 30
+MAX_WINDOW_DAYS = 730
+DEFAULT_MOVERS = 20
+MAX_MOVERS = 200
+GROUP_COLUMNS = ('category', 'brand')
+# Duplicate partition name, and a VALUES LESS THAN below an existing
+# partition's: both mean another process split pmax first.
+PARTITION_RACE_ERRORS = (1517, 1493)
+
+# One row per product and day on which its values changed, never one per
+# crawl. The row also carries the values it replaced, so each row is a delta:
+# summed over a window, discount - prev_discount telescopes to the change from
+# before the window to its end without looking up the starting state. Rows are
+# range-partitioned by month on snapshot_date, and the primary key leads with
+# the date, so window queries only read the partitions and key range they need.
+CREATE_HISTORY_TABLE = """CREATE TABLE IF NOT EXISTS price_history (snapshot_date DATE NOT NULL,product_key CHAR(40) NOT NULL,brand VARCHAR(255),category VARCHAR(100),subcategory VARCHAR(100),price FLOAT,original_price FLOAT,discount FLOAT,rating FLOAT,prev_price FLOAT,prev_original_price FLOAT,prev_discount FLOAT,prev_rating FLOAT,captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,PRIMARY KEY (snapshot_date, product_key),INDEX idx_history_product (product_key, snapshot_date)) PARTITION BY RANGE (TO_DAYS(snapshot_date)) (PARTITION pmax VALUES LESS THAN MAXVALUE)"""
+
+# A later change on the same day moves the day's values but keeps the values
+# from before the day, so the delta still covers the whole day.
+UPSERT_HISTORY_SQL = """INSERT INTO price_history (snapshot_date, product_key, brand, category, subcategory, price, original_price, discount, rating, prev_price, prev_original_price, prev_discount, prev_rating) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE price = VALUES(price), original_price = VALUES(original_price), discount = VALUES(discount), rating = VALUES(rating), captured_at = CURRENT_TIMESTAMP"""
+
+# Per (day, category, brand) counts and sums of the day's changes; the series
+# endpoint reads only this table.
+CREATE_DAILY_TABLE = """CREATE TABLE IF NOT EXISTS price_history_daily (snapshot_date DATE NOT NULL,category VARCHAR(100) NOT NULL,brand VARCHAR(255) NOT NULL,changes INT NOT NULL,new_products INT NOT NULL,price_up INT NOT NULL,price_down INT NOT NULL,price_change_pct_sum DOUBLE,price_change_n INT NOT NULL,discount_change_sum DOUBLE,discount_change_n INT NOT NULL,PRIMARY KEY (snapshot_date, category, brand),INDEX idx_history_daily_category (category, snapshot_date),INDEX idx_history_daily_brand (brand, snapshot_date))"""
+
+ROLLUP_SQL = """INSERT INTO price_history_daily (snapshot_date, category, brand, changes, new_products, price_up, price_down, price_change_pct_sum, price_change_n, discount_change_sum, discount_change_n)
+    SELECT snapshot_date, COALESCE(category, ''), COALESCE(brand, ''),
+        COUNT(*),
+        SUM(CASE WHEN prev_price IS NULL THEN 1 ELSE 0 END),
+        SUM(CASE WHEN price > prev_price THEN 1 ELSE 0 END),
+        SUM(CASE WHEN price < prev_price THEN 1 ELSE 0 END),
+        SUM(CASE WHEN prev_price > 0 AND price <> prev_price THEN (price - prev_price) / prev_price * 100 END),
+        SUM(CASE WHEN prev_price > 0 AND price <> prev_price THEN 1 ELSE 0 END),
+        SUM(CASE WHEN discount <> prev_discount THEN discount - prev_discount END),
+        SUM(CASE WHEN discount <> prev_discount THEN 1 ELSE 0 END)
+    FROM price_history
+    WHERE snapshot_date = %s
+    GROUP BY snapshot_date, COALESCE(category, ''), COALESCE(brand, '')"""
+
+SERIES_COLUMNS = ['changes', 'new_products', 'price_up', 'price_down', 'price_change_pct_sum', 'price_change_n', 'discount_change_sum', 'discount_change_n']
+
+def create_history_tables(cursor):
+    cursor.execute(CREATE_HISTORY_TABLE)
+    cursor.execute(CREATE_DAILY_TABLE)
+    return ensure_partitions(cursor)
+
+def month_start(day, months=0):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+def ensure_partitions(cursor, today=None, ahead=PARTITION_MONTHS_AHEAD):
+    # Splits monthly partitions off the catch-all pmax up to `ahead` months
+    # past today; p202610 holds October 2026. Returns the names added.
+    # Scrapers starting together may race here, and the losers move on.
+    cursor.execute("""SELECT PARTITION_NAME FROM INFORMATION_SCHEMA.PARTITIONS WHERE TABLE_SCHEMA = 'myntradb' AND TABLE_NAME = 'price_history'""")
+    existing = {row[0] for row in cursor.fetchall()}
+    today = today or date.today()
+    added = []
+    for months in range(ahead + 1):
+        start = month_start(today, months)
+        name = f"p{start:%Y%m}"
+        if name in existing:
+            continue
+        try:
+            cursor.execute(f"""ALTER TABLE price_history REORGANIZE PARTITION pmax INTO (PARTITION {name} VALUES LESS THAN (TO_DAYS('{month_start(start, 1)}')), PARTITION pmax VALUES LESS THAN MAXVALUE)""")
+        except mysql.connector.Error as e:
+            if e.errno not in PARTITION_RACE_ERRORS:
+                raise
+            continue
+        added.append(name)
+    return added
+
+def parse_values(price, original_price, discount, rating):
+    # Raw myntra_products text ("Rs. 1,299", "45%", "4.3") to floats, None
+    # where missing, using the same parsing as preprocess.py.
+    values = (preprocess.clean_price(price), preprocess.clean_price(original_price), preprocess.clean_discount(discount), preprocess.clean_price(rating))
+    return tuple(None if value is None or math.isnan(value) else value for value in values)
+
+def record_changes(cursor, observed, previous, day=None):
+    # observed maps product_key to (brand, category, subcategory, price,
+    # original_price, discount, rating) as scraped; previous maps the keys
+    # already stored to their (price, original_price, discount, rating).
+    # Writes a history row for new products and for products whose values
+    # changed, inside the caller's transaction. Returns the rows written.
+    day = day or date.today()
+    rows = []
+    for key, (brand, category, subcategory, *raw) in observed.items():
+        values = parse_values(*raw)
+        before = parse_values(*previous[key]) if key in previous else (None,) * len(HISTORY_COLUMNS)
+        if key in previous and values == before:
+            continue
+        rows.append((day, key, brand, category, subcategory) + values + before)
+    if rows:
+        cursor.executemany(UPSERT_HISTORY_SQL, rows)
+    return len(rows)
+
+def rollup_days(cursor, days):
+    # Recomputes price_history_daily for each day; safe to rerun.
+    for day in sorted(set(days)):
+        cursor.execute("""DELETE FROM price_history_daily WHERE snapshot_date = %s""", (day,))
+        cursor.execute(ROLLUP_SQL, (day,))
+    return len(set(days))
+
+def days_between(start, end):
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+def as_date(value):
+    # DATE columns come back as date from MySQL and as text from SQLite.
+    return value if isinstance(value, date) else datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+def window_start(days, today=None):
+    return (today or date.today()) - timedelta(days=days - 1)
+
+def price_change_series(cursor, since, group_by=None, value=None):
+    # Daily change counts and average price/discount moves since `since`, for
+    # one category or brand or for everything, from the daily rollup.
+    where, params = "snapshot_date >= %s", [since]
+    if group_by:
+        where += f" AND {group_by} = %s"
+        params.append(value)
+    cursor.execute(f"""SELECT snapshot_date, {', '.join(f'SUM({col})' for col in SERIES_COLUMNS)} FROM price_history_daily WHERE {where} GROUP BY snapshot_date ORDER BY snapshot_date""", params)
+
+    series = []
+    for day, changes, new_products, up, down, pct_sum, pct_n, discount_sum, discount_n in cursor.fetchall():
+        series.append({
+            'date': as_date(day).isoformat(),
+            'changes': int(changes),
+            'new_products': int(new_products),
+            'price_up': int(up),
+            'price_down': int(down),
+            'avg_price_change_pct': round(float(pct_sum) / int(pct_n), 2) if pct_n else None,
+            'avg_discount_change': round(float(discount_sum) / int(discount_n), 2) if discount_n else None
+        })
+    return series
+
+def discount_movers(cursor, since, limit=DEFAULT_MOVERS, direction='both', category=None, brand=None):
+    # Products whose discount moved most since `since`: the sum of their
+    # in-window deltas, so only the window's partitions are read.
+    where, params = ["snapshot_date >= %s", "discount IS NOT NULL", "prev_discount IS NOT NULL"], [since]
+    for col, value in (('category', category), ('brand', brand)):
+        if value:
+            where.append(f"{col} = %s")
+            params.append(value)
+    having = {'up': 'discount_change > 0', 'down': 'discount_change < 0'}.get(direction, 'discount_change <> 0')
+    order = {'up': 'discount_change DESC', 'down': 'discount_change ASC'}.get(direction, 'ABS(discount_change) DESC')
+    cursor.execute(f"""SELECT product_key, MAX(brand), MAX(category), MAX(subcategory), SUM(discount - prev_discount) AS discount_change, COUNT(*), MIN(snapshot_date), MAX(snapshot_date)
+        FROM price_history
+        WHERE {' AND '.join(where)}
+        GROUP BY product_key
+        HAVING {having}
+        ORDER BY {order}, product_key
+        LIMIT %s""", params + [limit])
+    rows = cursor.fetchall()
+    if not rows:
+        return []
+
+    keys = [row[0] for row in rows]
+    cursor.execute(f"""SELECT product_key, name, price, discount, product_url FROM myntra_products WHERE product_key IN ({', '.join(['%s'] * len(keys))})""", keys)
+    current = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    movers = []
+    for key, brand, category, subcategory, change, changes, first, last in rows:
+        name, price, discount, url = current.get(key, (None, None, None, None))
+        _, _, discount_now, _ = parse_values(price, None, discount, None)
+        movers.append({
+            'product_key': key,
+            'name': name,
+            'brand': brand,
+            'category': category,
+            'subcategory': subcategory,
+            'discount_change': round(float(change), 2),
+            'discount_now': discount_now,
+            'changes': int(changes),
+            'first_change': as_date(first).isoformat(),
+            'last_change': as_date(last).isoformat(),
+            'product_url': url
+        })
+    return movers
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the price history tables, add monthly partitions and rebuild the daily rollup")
+    parser.add_argument("--days", type=int, default=7, help="rebuild price_history_daily for this many days up to today")
+    args = parser.parse_args()
+
+    db = mysql.connector.connect(**DB_CONFIG)
+    try:
+        cursor = db.cursor()
+        added = create_history_tables(cursor)
+        rolled = rollup_days(cursor, days_between(window_start(args.days), date.today()))
+        db.commit()
+        cursor.close()
+    finally:
+        db.close()
+    print(f"Partitions added: {', '.join(added) or 'none'}; rolled up {rolled} day(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from flask import g, request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def label_text(names, values, extra=''):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def inc(self, values, amount=1):
+        with self.lock:
+            self.series[values] = self.series.get(values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for values, total in sorted(self.series.items()):
+                lines.append(f"{self.name}{label_text(self.labels, values)} {total}")
+        return lines
+
+class Histogram:
+    # Cumulative buckets are built at render time; observe only bumps one
+    # bucket count, the sum and the count under the lock.
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, values, seconds):
+        self.observe_many([(values, seconds)])
+
+    def observe_many(self, observations):
+        with self.lock:
+            for values, seconds in observations:
+                series = self.series.get(values)
+                if series is None:
+                    series = self.series[values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                series[0][bisect_left(self.buckets, seconds)] += 1
+                series[1] += seconds
+                series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for values, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{label_text(self.labels, values, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{label_text(self.labels, values, le)} {count}")
+                lines.append(f"{self.name}_sum{label_text(self.labels, values)} {total}")
+                lines.append(f"{self.name}_count{label_text(self.labels, values)} {count}")
+        return lines
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency by route.', ('route', 'method', 'status'), LATENCY_BUCKETS)
+STAGE_LATENCY = Histogram('http_request_stage_seconds', 'Time spent per request stage.', ('route', 'stage'), STAGE_BUCKETS)
+CACHE_EVENTS = Counter('cache_events_total', 'In-process cache lookups by result.', ('cache', 'result'))
+MODEL_LOADS = Counter('model_loads_total', 'Models served from memory or loaded from disk.', ('kind', 'source'))
+REJECTIONS = Counter('concurrency_rejections_total', 'Requests turned away by a concurrency limit.', ('limiter',))
+
+ENABLED = True
+
+class RequestTimer:
+    __slots__ = ('route', 'method', 'status', 'started', 'stages')
+
+    def __init__(self, route, method):
+        self.route = route
+        self.method = method
+        self.status = 500
+        self.started = time.perf_counter()
+        self.stages = {}
+
+# Timer of the request being handled. A ContextVar rather than flask.g, whose
+# proxy lookups cost more than the timing itself.
+CURRENT = ContextVar('metrics_request', default=None)
+
+class Stage:
+    # Adds the time spent in the block to the current request's total for that
+    # stage. Outside a request it is observed right away under route
+    # "background", e.g. for cache rebuilds run from a script.
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        timer = CURRENT.get()
+        if timer is not None:
+            timer.stages[self.name] = timer.stages.get(self.name, 0.0) + elapsed
+        elif ENABLED:
+            STAGE_LATENCY.observe(('background', self.name), elapsed)
+        return False
+
+def stage(name):
+    return Stage(name)
+
+def cache_event(cache, hit):
+    if ENABLED:
+        CACHE_EVENTS.inc((cache, 'hit' if hit else 'miss'))
+
+def model_load(kind, source):
+    if ENABLED:
+        MODEL_LOADS.inc((kind, source))
+
+def rejected(limiter):
+    if ENABLED:
+        REJECTIONS.inc((limiter,))
+
+def start_request():
+    req = request._get_current_object()
+    CURRENT.set(RequestTimer(req.endpoint or 'unknown', req.method))
+
+def record_response(response):
+    timer = CURRENT.get()
+    if timer is not None:
+        timer.status = response.status_code
+        # Set by responses.FastJSONProvider while building the body.
+        serialize = g.get('serialize_seconds')
+        if serialize is not None:
+            timer.stages['serialize'] = timer.stages.get('serialize', 0.0) + serialize
+    return response
+
+def finish_request(exc):
+    timer = CURRENT.get()
+    if timer is None:
+        return
+    CURRENT.set(None)
+    REQUEST_LATENCY.observe((timer.route, timer.method, timer.status), time.perf_counter() - timer.started)
+    STAGE_LATENCY.observe_many([((timer.route, name), seconds) for name, seconds in timer.stages.items()])
+
+def render(extra=()):
+    lines = []
+    for metric in (REQUEST_LATENCY, STAGE_LATENCY, CACHE_EVENTS, MODEL_LOADS, REJECTIONS) + tuple(extra):
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+def response_counters(snapshot):
+    # responses.RESPONSE_STATS totals as Prometheus counters, built per scrape.
+    counters = []
+    for field, help in (('raw_bytes', 'Response bytes before compression.'), ('wire_bytes', 'Response bytes sent after compression.'),
+                        ('not_modified', 'Responses answered with 304.'), ('compress_seconds', 'Time spent compressing responses.')):
+        counter = Counter(f'http_response_{field}_total', help, ('route',))
+        for endpoint, totals in snapshot.items():
+            counter.inc((endpoint,), totals[field])
+        counters.append(counter)
+    return counters
+
+def init_app(app):
+    # With METRICS_ENABLED off no hooks are installed and stage timers only
+    # read the clock.
+    global ENABLED
+    ENABLED = app.config.setdefault('METRICS_ENABLED', True)
+    if ENABLED:
+        app.before_request(start_request)
+        app.after_request(record_response)
+        app.teardown_request(finish_request)
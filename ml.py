@@ -1,29 +1,30 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.svm import SVR
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.svm import SVC
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import StandardScaler, RobustScaler, LabelEncoder, OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, precision_score, recall_score, confusion_matrix, classification_report, silhouette_score
-from sklearn.pipeline import Pipeline
-from sklearn.feature_selection import SelectKBest, f_regression
-from sklearn.cluster import KMeans, AgglomerativeClustering
 import pickle
 import os
+import importlib
+import artifacts
+import dtypes
+
+# scikit-learn is imported inside the functions that use it, per technique, so
+# importing ml (and app) does not pay for the whole library up front.
 
 MODELS_DIR = 'models'
 if not os.path.exists(MODELS_DIR):
     os.makedirs(MODELS_DIR)
 
-def preprocess_data(df, target, features):
-    df_clean = df.copy()
+def quantile_pair(df, col, low, high, sketches=None):
+    # Exact quantiles of what is left of df, or, given the stored column
+    # sketches, the table-wide estimates without touching the rows.
+    if sketches and col in sketches and sketches[col].n:
+        return sketches[col].quantile(low), sketches[col].quantile(high)
+    return df[col].quantile(low), df[col].quantile(high)
+
+def preprocess_data(df, target, features, sketches=None):
+    df_clean = dtypes.model_frame(df)
     
     for col in df_clean.columns:
-        Q1 = df_clean[col].quantile(0.25)
-        Q3 = df_clean[col].quantile(0.75)
+        Q1, Q3 = quantile_pair(df_clean, col, 0.25, 0.75, sketches)
         IQR = Q3 - Q1
         lower_bound = Q1 - 1.5 * IQR
         upper_bound = Q3 + 1.5 * IQR
@@ -34,10 +35,17 @@ def preprocess_data(df, target, features):
     
     return X, y
 
-def train_model(X, y, technique='linear'):
+def train_model(X, y, technique='linear', n_jobs=-1):
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import RobustScaler
+    from sklearn.feature_selection import SelectKBest, f_regression
+    from sklearn.metrics import r2_score
+    
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     if technique == 'linear':
+        from sklearn.linear_model import LinearRegression
         pipeline = Pipeline([
             ('scaler', RobustScaler()),
             ('feature_selection', SelectKBest(f_regression, k='all')), 
@@ -45,6 +53,8 @@ def train_model(X, y, technique='linear'):
         ])
         
     elif technique == 'svr':
+        from sklearn.svm import SVR
+        from sklearn.model_selection import GridSearchCV
         pipeline = Pipeline([
             ('scaler', RobustScaler()),
             ('feature_selection', SelectKBest(f_regression, k='all')),
@@ -58,11 +68,11 @@ def train_model(X, y, technique='linear'):
         }
         
         if len(X_train) > 100:
-            pipeline = GridSearchCV(pipeline, param_grid, cv=5, scoring='neg_mean_squared_error', n_jobs=-1)
+            pipeline = GridSearchCV(pipeline, param_grid, cv=5, scoring='neg_mean_squared_error', n_jobs=n_jobs)
     
     pipeline.fit(X_train, y_train)
     
-    if isinstance(pipeline, GridSearchCV):
+    if hasattr(pipeline, 'best_estimator_'):
         best_params = pipeline.best_params_
         pipeline = pipeline.best_estimator_
     
@@ -80,31 +90,60 @@ def train_model(X, y, technique='linear'):
         'r2': r2
     }
 
-def save_model(model_data, target, features, technique, model_id):
-    model_path = os.path.join(MODELS_DIR, f"{model_id}.pkl")
-    
-    with open(model_path, 'wb') as f:
-        pickle.dump({
-            'pipeline': model_data['pipeline'],
-            'features': features,
-            'target': target,
-            'technique': technique,
-            'r2': model_data['r2']
-        }, f)
-    
-    return model_id
+WARM_MODULES = ('sklearn.cluster', 'sklearn.compose', 'sklearn.linear_model', 'sklearn.metrics',
+                'sklearn.model_selection', 'sklearn.pipeline', 'sklearn.preprocessing', 'sklearn.tree')
 
-def load_model(model_id):
-    model_path = os.path.join(MODELS_DIR, f"{model_id}.pkl")
+def warm_imports():
+    # The estimators behind the default techniques and saved pipelines, for a
+    # prewarm phase to import before the first request needs them.
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+def model_path(model_id):
+    return os.path.join(MODELS_DIR, f"{model_id}{artifacts.ARTIFACT_EXT}")
+
+def legacy_model_path(model_id):
+    return os.path.join(MODELS_DIR, f"{model_id}{artifacts.LEGACY_EXT}")
+
+def list_model_ids():
+    model_ids = set()
+    for filename in os.listdir(MODELS_DIR):
+        name, ext = os.path.splitext(filename)
+        if ext in (artifacts.ARTIFACT_EXT, artifacts.LEGACY_EXT):
+            model_ids.add(name)
+    return sorted(model_ids)
+
+def load_model_file(model_id):
+    if os.path.exists(model_path(model_id)):
+        return artifacts.load_artifact(model_path(model_id))
     
-    if not os.path.exists(model_path):
+    if not os.path.exists(legacy_model_path(model_id)):
         return None
     
-    with open(model_path, 'rb') as f:
+    with open(legacy_model_path(model_id), 'rb') as f:
         model_data = pickle.load(f)
     
     return model_data
 
+def load_model_metadata(model_id):
+    if os.path.exists(model_path(model_id)):
+        return artifacts.read_artifact_metadata(model_path(model_id))
+    return load_model_file(model_id)
+
+def save_model(model_data, target, features, technique, model_id):
+    artifacts.save_artifact(model_path(model_id), {
+        'pipeline': model_data['pipeline'],
+        'features': features,
+        'target': target,
+        'technique': technique,
+        'r2': model_data['r2']
+    })
+    
+    return model_id
+
+def load_model(model_id):
+    return load_model_file(model_id)
+
 def predict(inputs, model_data):
     features = model_data['features']
     pipeline = model_data['pipeline']
@@ -115,8 +154,18 @@ def predict(inputs, model_data):
     prediction = float(pipeline.predict(input_df)[0])
     return prediction
 
-def preprocess_classification_data(df, target, features):
-    df_clean = df.copy()
+def rank_tertiles(values):
+    rank = values.rank(method='first')
+    total_rows = len(values)
+    return pd.cut(
+        rank,
+        bins=[0, total_rows/3, 2*total_rows/3, total_rows+1],
+        labels=['Low', 'Medium', 'High'],
+        include_lowest=True
+    )
+
+def preprocess_classification_data(df, target, features, sketches=None):
+    df_clean = dtypes.model_frame(df)
     
     categorical_features = [f for f in features if f == 'brand']
     numerical_features = [f for f in features if f != 'brand']
@@ -128,8 +177,7 @@ def preprocess_classification_data(df, target, features):
     
     for col in numerical_features:
         if col in df_clean.columns:
-            Q1 = df_clean[col].quantile(0.05)  
-            Q3 = df_clean[col].quantile(0.95) 
+            Q1, Q3 = quantile_pair(df_clean, col, 0.05, 0.95, sketches)
             IQR = Q3 - Q1
             lower_bound = Q1 - 1.5 * IQR
             upper_bound = Q3 + 1.5 * IQR
@@ -140,18 +188,49 @@ def preprocess_classification_data(df, target, features):
     
     return X, y, classes
 
-def train_classification_model(X, y, classes, technique='decision_tree'):
+BRAND_HASH_WIDTH = 256
+BRAND_MIN_FREQUENCY = 5
+TARGET_ENCODING_SMOOTHING = 10.0
+TARGET_ENCODING_FOLDS = 5
+
+BRAND_ENCODINGS = ['onehot', 'sparse_onehot', 'hashing', 'frequency', 'target']
+
+def build_brand_encoder(brand_encoding='onehot'):
+    from sklearn.preprocessing import OneHotEncoder
+    import encoders
+    
+    if brand_encoding == 'onehot':
+        return OneHotEncoder(handle_unknown='ignore'), 0.3
+    elif brand_encoding == 'sparse_onehot':
+        return OneHotEncoder(handle_unknown='infrequent_if_exist', min_frequency=BRAND_MIN_FREQUENCY), 1.0
+    elif brand_encoding == 'hashing':
+        return encoders.BrandHashingEncoder(), 1.0
+    elif brand_encoding == 'frequency':
+        return encoders.BrandFrequencyEncoder(), 0.0
+    elif brand_encoding == 'target':
+        return encoders.BrandTargetEncoder(), 0.0
+    raise ValueError(f'Invalid brand encoding: {brand_encoding}')
+
+def train_classification_model(X, y, classes, technique='decision_tree', brand_encoding='onehot', n_jobs=-1):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.model_selection import train_test_split, GridSearchCV
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import RobustScaler
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, confusion_matrix, classification_report
+    
     categorical_mask = [col == 'brand' for col in X.columns]
     categorical_indices = [i for i, x in enumerate(categorical_mask) if x]
     numerical_indices = [i for i, x in enumerate(categorical_mask) if not x]
     
     if any(categorical_mask):
+        brand_encoder, sparse_threshold = build_brand_encoder(brand_encoding)
         preprocessor = ColumnTransformer(
             transformers=[
-                ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_indices),
+                ('cat', brand_encoder, categorical_indices),
                 ('num', RobustScaler(), numerical_indices)
             ],
-            remainder='passthrough'
+            remainder='passthrough',
+            sparse_threshold=sparse_threshold
         )
     else:
         preprocessor = RobustScaler()
@@ -159,6 +238,7 @@ def train_classification_model(X, y, classes, technique='decision_tree'):
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     if technique == 'decision_tree':
+        from sklearn.tree import DecisionTreeClassifier
         classifier = DecisionTreeClassifier(random_state=42)
         pipeline = Pipeline([
             ('preprocessor', preprocessor),
@@ -172,6 +252,7 @@ def train_classification_model(X, y, classes, technique='decision_tree'):
         }
         
     elif technique == 'svm':
+        from sklearn.svm import SVC
         classifier = SVC(probability=True, random_state=42)
         pipeline = Pipeline([
             ('preprocessor', preprocessor),
@@ -184,7 +265,7 @@ def train_classification_model(X, y, classes, technique='decision_tree'):
             'classifier__kernel': ['rbf', 'linear']
         }
     
-    grid_search = GridSearchCV(pipeline, param_grid, cv=5, scoring='accuracy', n_jobs=-1)
+    grid_search = GridSearchCV(pipeline, param_grid, cv=5, scoring='accuracy', n_jobs=n_jobs)
     grid_search.fit(X_train, y_train)
     
     best_model = grid_search.best_estimator_
@@ -216,32 +297,21 @@ def train_classification_model(X, y, classes, technique='decision_tree'):
     }
 
 def save_classification_model(model_data, target, features, technique, model_id, classes):
-    model_path = os.path.join(MODELS_DIR, f"{model_id}.pkl")
-    
-    with open(model_path, 'wb') as f:
-        pickle.dump({
-            'pipeline': model_data['pipeline'],
-            'features': features,
-            'target': target,
-            'technique': technique,
-            'accuracy': model_data['accuracy'],
-            'precision': model_data['precision'],
-            'recall': model_data['recall'],
-            'classes': classes
-        }, f)
+    artifacts.save_artifact(model_path(model_id), {
+        'pipeline': model_data['pipeline'],
+        'features': features,
+        'target': target,
+        'technique': technique,
+        'accuracy': model_data['accuracy'],
+        'precision': model_data['precision'],
+        'recall': model_data['recall'],
+        'classes': classes
+    })
     
     return model_id
 
 def load_classification_model(model_id):
-    model_path = os.path.join(MODELS_DIR, f"{model_id}.pkl")
-    
-    if not os.path.exists(model_path):
-        return None
-    
-    with open(model_path, 'rb') as f:
-        model_data = pickle.load(f)
-    
-    return model_data
+    return load_model_file(model_id)
 
 def predict_class(inputs, model_data):
     features = model_data['features']
@@ -256,7 +326,7 @@ def predict_class(inputs, model_data):
     return prediction
 
 def preprocess_clustering_data(df, features):
-    df_clean = df.copy()
+    df_clean = dtypes.model_frame(df)
     
     for col in features:
         if col in df_clean.columns:
@@ -269,12 +339,19 @@ def preprocess_clustering_data(df, features):
     
     X = df_clean[features].copy()
     
+    from sklearn.preprocessing import StandardScaler
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
     
     return X_scaled, df_clean, scaler
 
 def find_optimal_clusters(X, max_clusters=10, technique='kmeans'):
+    from sklearn.metrics import silhouette_score
+    if technique == 'kmeans':
+        from sklearn.cluster import KMeans
+    else:
+        from sklearn.cluster import AgglomerativeClustering
+    
     silhouette_scores = []
     inertia_values = []
     range_clusters = range(2, min(max_clusters + 1, len(X)))
@@ -306,6 +383,9 @@ def find_optimal_clusters(X, max_clusters=10, technique='kmeans'):
     }
 
 def run_kmeans_clustering(X, n_clusters=3):
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score
+    
     n_clusters = min(n_clusters, len(X) - 1)
     
     kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
@@ -323,6 +403,9 @@ def run_kmeans_clustering(X, n_clusters=3):
     }
 
 def run_hierarchical_clustering(X, n_clusters=3):
+    from sklearn.cluster import AgglomerativeClustering
+    from sklearn.metrics import silhouette_score
+    
     n_clusters = min(n_clusters, len(X) - 1)
     
     hierarchical = AgglomerativeClustering(
@@ -347,27 +430,274 @@ def run_hierarchical_clustering(X, n_clusters=3):
     }
 
 def save_clustering_model(model_data, features, group_by, technique, model_id):
-    model_path = os.path.join(MODELS_DIR, f"{model_id}.pkl")
-    
-    with open(model_path, 'wb') as f:
-        pickle.dump({
-            'features': features,
-            'group_by': group_by,
-            'technique': technique,
-            'silhouette_score': model_data['silhouette_score'],
-            'labels': model_data['labels'],
-            'centroids': model_data['centroids']
-        }, f)
+    artifacts.save_artifact(model_path(model_id), {
+        'features': features,
+        'group_by': group_by,
+        'technique': technique,
+        'silhouette_score': model_data['silhouette_score'],
+        'labels': model_data['labels'],
+        'centroids': model_data['centroids']
+    })
     
     return model_id
 
 def load_clustering_model(model_id):
-    model_path = os.path.join(MODELS_DIR, f"{model_id}.pkl")
+    return load_model_file(model_id)
+
+HOLDOUT_MODULUS = 5
+# Newest holdout rows kept for scoring, so artifacts stop growing with it.
+HOLDOUT_MAX_ROWS = 20000
+INCREMENTAL_EPOCHS = 5
+
+def holdout_mask(ids):
+    return (np.asarray(ids) % HOLDOUT_MODULUS) == 0
+
+def compute_outlier_bounds(df, columns, low=0.25, high=0.75):
+    df_clean = df.copy()
+    bounds = {}
     
-    if not os.path.exists(model_path):
-        return None
+    for col in columns:
+        Q1 = df_clean[col].quantile(low)
+        Q3 = df_clean[col].quantile(high)
+        IQR = Q3 - Q1
+        bounds[col] = (float(Q1 - 1.5 * IQR), float(Q3 + 1.5 * IQR))
+        df_clean = df_clean[(df_clean[col] >= bounds[col][0]) & (df_clean[col] <= bounds[col][1])]
     
-    with open(model_path, 'rb') as f:
-        model_data = pickle.load(f)
+    return bounds
+
+def apply_outlier_bounds(df, bounds):
+    mask = np.ones(len(df), dtype=bool)
+    for col, (lower_bound, upper_bound) in bounds.items():
+        mask &= ((df[col] >= lower_bound) & (df[col] <= upper_bound)).to_numpy()
+    return df[mask]
+
+def advance_watermark(df, watermark=None, seen_ids=()):
+    # updated_at has one-second resolution, so a refresh fetches rows at or
+    # after the watermark and skips the ids it already took at that second.
+    # Returns the new watermark and the ids taken at it.
+    if df.empty:
+        return watermark, np.asarray(seen_ids, dtype=np.int64)
+    updated = pd.to_datetime(df['updated_at'])
+    latest = updated.max()
+    if watermark and pd.Timestamp(watermark) >= latest:
+        latest, seen = pd.Timestamp(watermark), seen_ids
+    else:
+        seen = ()
+    ids = np.union1d(np.asarray(seen, dtype=np.int64), df.loc[updated == latest, 'id'].to_numpy(dtype=np.int64))
+    return str(latest), ids
+
+def unseen_rows(df, model_data):
+    seen_ids = model_data.get('watermark_ids')
+    if df.empty or not model_data.get('watermark') or seen_ids is None or not len(seen_ids):
+        return df
+    at_watermark = pd.to_datetime(df['updated_at']) == pd.Timestamp(model_data['watermark'])
+    return df[~(at_watermark & df['id'].isin(seen_ids)).to_numpy()]
+
+def cap_holdout(holdout):
+    return holdout.tail(HOLDOUT_MAX_ROWS).reset_index(drop=True)
+
+def merge_holdout(holdout, df_new):
+    holdout = pd.concat([holdout, df_new], ignore_index=True)
+    return cap_holdout(holdout.drop_duplicates(subset='id', keep='last'))
+
+def accumulate_normal_equations(stats, X, y):
+    X_aug = np.column_stack([np.ones(len(X)), X])
+    return {
+        'xtx': stats['xtx'] + X_aug.T @ X_aug,
+        'xty': stats['xty'] + X_aug.T @ np.asarray(y, dtype=float),
+        'n': stats['n'] + len(X)
+    }
+
+def solve_normal_equations(stats, model):
+    solution = np.linalg.lstsq(stats['xtx'], stats['xty'], rcond=None)[0]
+    model.intercept_ = float(solution[0])
+    model.coef_ = solution[1:]
+    model.n_features_in_ = len(solution) - 1
+    return model
+
+def train_incremental_model(df, target, features):
+    from sklearn.linear_model import LinearRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import RobustScaler
+    
+    df = dtypes.model_frame(df)
+    bounds = compute_outlier_bounds(df, [target] + features)
+    df_clean = apply_outlier_bounds(df, bounds)
+    
+    is_holdout = holdout_mask(df_clean['id'])
+    train_df = df_clean[~is_holdout]
+    holdout = cap_holdout(df_clean.loc[is_holdout, ['id'] + features + [target]])
+    
+    scaler = RobustScaler()
+    X_train = scaler.fit_transform(train_df[features])
+    
+    n_params = len(features) + 1
+    stats = accumulate_normal_equations({'xtx': np.zeros((n_params, n_params)), 'xty': np.zeros(n_params), 'n': 0}, X_train, train_df[target])
+    
+    pipeline = Pipeline([
+        ('scaler', scaler),
+        ('model', solve_normal_equations(stats, LinearRegression()))
+    ])
+    
+    model_data = {
+        'kind': 'regression',
+        'pipeline': pipeline,
+        'features': features,
+        'target': target,
+        'technique': 'incremental_linear',
+        'bounds': bounds,
+        'stats': stats,
+        'holdout': holdout,
+        'rows_added': len(train_df)
+    }
+    model_data['watermark'], model_data['watermark_ids'] = advance_watermark(df)
+    return score_incremental_model(model_data)
+
+def update_incremental_model(model_data, df):
+    df = dtypes.model_frame(unseen_rows(df, model_data))
+    model_data = dict(model_data)
+    features = model_data['features']
+    target = model_data['target']
+    
+    df_clean = apply_outlier_bounds(df, model_data['bounds'])
+    is_holdout = holdout_mask(df_clean['id'])
+    train_df = df_clean[~is_holdout]
     
-    return model_data
\ No newline at end of file
+    pipeline = model_data['pipeline']
+    scaler = pipeline.named_steps['scaler']
+    stats = model_data['stats']
+    
+    # Only the sums are kept, not the rows behind them, so a row that changed
+    # since the last refresh is added again while its earlier values stay in.
+    # Products repriced often weigh more than the current table alone would
+    # give them; retrain from scratch to drop the old values.
+    if len(train_df):
+        stats = accumulate_normal_equations(stats, scaler.transform(train_df[features]), train_df[target])
+        solve_normal_equations(stats, pipeline.named_steps['model'])
+    
+    model_data['stats'] = stats
+    model_data['holdout'] = merge_holdout(model_data['holdout'], df_clean.loc[is_holdout, ['id'] + features + [target]])
+    model_data['watermark'], model_data['watermark_ids'] = advance_watermark(df, model_data['watermark'], model_data.get('watermark_ids', ()))
+    model_data['rows_added'] = len(train_df)
+    
+    return score_incremental_model(model_data)
+
+def score_incremental_model(model_data):
+    from sklearn.metrics import r2_score
+    
+    holdout = model_data['holdout']
+    
+    if len(holdout) < 2:
+        model_data['r2'] = None
+        return model_data
+    
+    holdout_pred = model_data['pipeline'].predict(holdout[model_data['features']])
+    model_data['r2'] = r2_score(holdout[model_data['target']], holdout_pred)
+    return model_data
+
+def price_category_labels(prices, thresholds):
+    return np.where(prices <= thresholds[0], 'Low', np.where(prices <= thresholds[1], 'Medium', 'High'))
+
+def train_incremental_classification_model(df, features):
+    from sklearn.compose import ColumnTransformer
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import RobustScaler, OneHotEncoder
+    
+    df = dtypes.model_frame(df)
+    classes = ['High', 'Low', 'Medium']
+    numerical_features = [f for f in features if f != 'brand']
+    
+    thresholds = [float(t) for t in df['price'].quantile([1 / 3, 2 / 3])]
+    bounds = compute_outlier_bounds(df, numerical_features, low=0.05, high=0.95)
+    df_clean = apply_outlier_bounds(df, bounds)
+    
+    is_holdout = holdout_mask(df_clean['id'])
+    train_df = df_clean[~is_holdout]
+    holdout = cap_holdout(df_clean.loc[is_holdout, ['id'] + features + ['price']])
+    
+    categorical_indices = [i for i, col in enumerate(features) if col == 'brand']
+    numerical_indices = [i for i, col in enumerate(features) if col != 'brand']
+    
+    if categorical_indices:
+        preprocessor = ColumnTransformer(
+            transformers=[
+                ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_indices),
+                ('num', RobustScaler(), numerical_indices)
+            ],
+            remainder='passthrough'
+        )
+    else:
+        preprocessor = RobustScaler()
+    
+    X_train = preprocessor.fit_transform(train_df[features])
+    y_train = price_category_labels(train_df['price'], thresholds)
+    
+    classifier = SGDClassifier(loss='log_loss', random_state=42)
+    for _ in range(INCREMENTAL_EPOCHS):
+        classifier.partial_fit(X_train, y_train, classes=classes)
+    
+    model_data = {
+        'kind': 'classification',
+        'pipeline': Pipeline([
+            ('preprocessor', preprocessor),
+            ('classifier', classifier)
+        ]),
+        'features': features,
+        'target': 'price_category',
+        'technique': 'incremental_sgd',
+        'classes': classes,
+        'thresholds': thresholds,
+        'bounds': bounds,
+        'holdout': holdout,
+        'rows_added': len(train_df)
+    }
+    model_data['watermark'], model_data['watermark_ids'] = advance_watermark(df)
+    return score_incremental_classification_model(model_data)
+
+def update_incremental_classification_model(model_data, df):
+    df = dtypes.model_frame(unseen_rows(df, model_data))
+    model_data = dict(model_data)
+    features = model_data['features']
+    
+    df_clean = apply_outlier_bounds(df, model_data['bounds'])
+    is_holdout = holdout_mask(df_clean['id'])
+    train_df = df_clean[~is_holdout]
+    
+    pipeline = model_data['pipeline']
+    if len(train_df):
+        X_train = pipeline.named_steps['preprocessor'].transform(train_df[features])
+        y_train = price_category_labels(train_df['price'], model_data['thresholds'])
+        classifier = pipeline.named_steps['classifier']
+        # A loaded artifact maps large arrays read-only, and partial_fit
+        # updates the weights in place.
+        classifier.coef_ = np.array(classifier.coef_)
+        classifier.intercept_ = np.array(classifier.intercept_)
+        classifier.partial_fit(X_train, y_train, classes=model_data['classes'])
+    
+    model_data['holdout'] = merge_holdout(model_data['holdout'], df_clean.loc[is_holdout, ['id'] + features + ['price']])
+    model_data['watermark'], model_data['watermark_ids'] = advance_watermark(df, model_data['watermark'], model_data.get('watermark_ids', ()))
+    model_data['rows_added'] = len(train_df)
+    
+    return score_incremental_classification_model(model_data)
+
+def score_incremental_classification_model(model_data):
+    from sklearn.metrics import accuracy_score, precision_score, recall_score
+    
+    holdout = model_data['holdout']
+    
+    if len(holdout) < 2:
+        model_data.update({'accuracy': None, 'precision': None, 'recall': None})
+        return model_data
+    
+    y_true = price_category_labels(holdout['price'], model_data['thresholds'])
+    y_pred = model_data['pipeline'].predict(holdout[model_data['features']])
+    
+    model_data['accuracy'] = accuracy_score(y_true, y_pred)
+    model_data['precision'] = precision_score(y_true, y_pred, average='weighted', zero_division=0)
+    model_data['recall'] = recall_score(y_true, y_pred, average='weighted', zero_division=0)
+    return model_data
+
+def save_incremental_model(model_data, model_id):
+    artifacts.save_artifact(model_path(model_id), model_data)
+    return model_id
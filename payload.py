@@ -0,0 +1,97 @@
+import numpy as np
+
+POINT_BUDGET = 2000
+GRID_BINS = 40
+OUTLIER_MADS = 3.0
+# Outliers may take at most this share of the budget so a heavy-tailed split
+# still leaves room for the body of the distribution.
+OUTLIER_SHARE = 0.5
+SAMPLE_SEED = 0
+
+def outlier_mask(scores, n_mads=OUTLIER_MADS):
+    # Robust z-score: points more than n_mads scaled MADs above the median.
+    scores = np.asarray(scores, dtype=float)
+    if len(scores) == 0:
+        return np.zeros(0, dtype=bool)
+    median = np.median(scores)
+    mad = np.median(np.abs(scores - median)) * 1.4826
+    if mad == 0:
+        return scores > median
+    return (scores - median) / mad > n_mads
+
+def extreme_mask(*columns):
+    # The min and max of every plotted axis, so the chart keeps its range.
+    mask = np.zeros(len(columns[0]), dtype=bool)
+    for col in columns:
+        col = np.asarray(col, dtype=float)
+        if len(col):
+            mask[np.nanargmin(col)] = True
+            mask[np.nanargmax(col)] = True
+    return mask
+
+def grid_cells(x, y, strata=None, bins=GRID_BINS):
+    cells = []
+    for col in (x, y):
+        col = np.asarray(col, dtype=float)
+        lo, hi = np.nanmin(col), np.nanmax(col)
+        span = hi - lo if hi > lo else 1.0
+        cells.append(np.minimum(((col - lo) / span * bins).astype(np.int64), bins - 1))
+    cell = cells[0] * bins + cells[1]
+    if strata is not None:
+        cell = cell + np.asarray(strata, dtype=np.int64) * bins * bins
+    return cell
+
+def downsample(x, y, budget=POINT_BUDGET, scores=None, strata=None, seed=SAMPLE_SEED, outlier_share=OUTLIER_SHARE):
+    # Picks at most `budget` indices from a 2-D scatter and returns them with
+    # the number of outliers found. The axis extremes and the outliers (by
+    # `scores`, most extreme first, up to outlier_share of the budget) are kept
+    # first. The rest of the budget is spread over a grid of (stratum, x, y)
+    # cells in proportion to how many points each cell holds, and every
+    # occupied cell gets a point before any cell gets a second. Sparse regions
+    # stay visible and dense regions keep their relative weight.
+    n = len(x)
+    outliers = np.flatnonzero(outlier_mask(scores)) if scores is not None else np.zeros(0, dtype=np.int64)
+    if not budget or budget <= 0 or n <= budget:
+        return np.arange(n), len(outliers)
+
+    keep = extreme_mask(x, y)
+    if len(outliers):
+        order = np.argsort(-np.asarray(scores, dtype=float)[outliers], kind='stable')
+        keep[outliers[order[:max(0, int(budget * outlier_share) - int(keep.sum()))]]] = True
+
+    kept = np.flatnonzero(keep)
+    rest = np.flatnonzero(~keep)
+    rng = np.random.default_rng(seed)
+    rest = rest[rng.permutation(len(rest))]
+
+    cells = grid_cells(np.asarray(x)[rest], np.asarray(y)[rest], None if strata is None else np.asarray(strata)[rest])
+    # Position of each point within its cell after the shuffle, as a fraction
+    # of the cell's size; taking the smallest fractions first gives each cell
+    # ceil(size * t) points for a common threshold t.
+    order = np.argsort(cells, kind='stable')
+    sorted_cells = cells[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    sizes = np.diff(np.r_[starts, len(sorted_cells)])
+    rank = np.arange(len(sorted_cells)) - np.repeat(starts, sizes)
+    priority = np.empty(len(rest))
+    priority[order] = rank / np.repeat(sizes, sizes)
+
+    chosen = rest[np.argsort(priority, kind='stable')[:max(0, budget - len(kept))]]
+    return np.sort(np.concatenate([kept, chosen])), len(outliers)
+
+def point_counts(total, returned, budget, outliers=0):
+    return {'total': int(total), 'returned': int(returned), 'budget': int(budget or 0), 'outliers': int(outliers), 'downsampled': bool(returned < total)}
+
+def regression_points(model_data, budget=POINT_BUDGET):
+    # Splits the budget between train and test by size; residuals decide
+    # which points count as outliers.
+    splits = {}
+    sizes = {split: len(model_data[f'{split}_actual']) for split in ('train', 'test')}
+    total = sum(sizes.values())
+    for split in ('train', 'test'):
+        actual = np.asarray(model_data[f'{split}_actual'], dtype=float)
+        pred = np.asarray(model_data[f'{split}_pred'], dtype=float)
+        split_budget = max(1, round(budget * sizes[split] / total)) if budget and budget > 0 and total else 0
+        idx, outliers = downsample(actual, pred, split_budget, scores=np.abs(actual - pred))
+        splits[split] = (actual[idx], pred[idx], point_counts(len(actual), len(idx), split_budget, outliers))
+    return splits
@@ -0,0 +1,203 @@
+import queue
+import threading
+import time
+
+from selenium.common.exceptions import TimeoutException
+
+PIPELINE_QUEUE_SIZE = 2
+END = None
+
+class StageMetrics:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.records = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+
+    def report(self):
+        return {
+            'items': self.items,
+            'records': self.records,
+            'busy_seconds': round(self.busy, 3),
+            'wait_seconds': round(self.waiting, 3),
+            'items_per_second': round(self.items / self.busy, 2) if self.busy else None
+        }
+
+class MeteredQueue:
+    # Bounded hand-off between two stages. Depth is sampled on every put, so a
+    # queue that sits full points at a slow consumer and one that sits empty
+    # at a slow producer.
+    def __init__(self, name, maxsize=PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.samples = 0
+        self.depth_total = 0
+        self.max_depth = 0
+
+    def put(self, item, metrics):
+        depth = self.queue.qsize()
+        self.samples += 1
+        self.depth_total += depth
+        self.max_depth = max(self.max_depth, depth)
+
+        started = time.perf_counter()
+        self.queue.put(item)
+        metrics.waiting += time.perf_counter() - started
+
+    def get(self, metrics):
+        started = time.perf_counter()
+        item = self.queue.get()
+        metrics.waiting += time.perf_counter() - started
+        return item
+
+    def report(self):
+        return {
+            'capacity': self.queue.maxsize,
+            'max_depth': self.max_depth,
+            'mean_depth': round(self.depth_total / self.samples, 2) if self.samples else 0
+        }
+
+class ScrapePipeline:
+    # fetch -> parse -> write, each on its own thread. The fetcher runs ahead of
+    # the other stages by up to PIPELINE_QUEUE_SIZE pages, so the browser loads
+    # page N+1 while page N is parsed and written.
+    def __init__(self, scraper, url, category, subcategory, max_pages=3, queue_size=PIPELINE_QUEUE_SIZE):
+        self.scraper = scraper
+        self.url = url
+        self.category = category
+        self.subcategory = subcategory
+        self.max_pages = max_pages
+
+        self.pages = MeteredQueue('pages', queue_size)
+        self.batches = MeteredQueue('batches', queue_size)
+        self.stages = {name: StageMetrics(name) for name in ('fetch', 'parse', 'write')}
+        self.stop_event = threading.Event()
+        self.errors = []
+        self.inserted = 0
+        self.updated = 0
+
+    def fail(self, stage, page, error):
+        print(f"{stage.capitalize()} error on page {page}: {str(error)[:50]}...")
+        self.errors.append({'stage': stage, 'page': page, 'error': str(error)})
+        self.stop_event.set()
+
+    def fetch(self):
+        metrics = self.stages['fetch']
+        try:
+            for page in range(1, self.max_pages + 1):
+                if self.stop_event.is_set():
+                    break
+
+                started = time.perf_counter()
+                try:
+                    html = self.scraper.fetch_page(self.url, page)
+                except TimeoutException:
+                    # Past the last page the listing renders no product cards.
+                    if page > 1:
+                        print(f"No products found on page {page}. Stopping.")
+                    else:
+                        self.fail('fetch', page, 'no product cards rendered')
+                    break
+                except Exception as e:
+                    self.fail('fetch', page, e)
+                    break
+                finally:
+                    metrics.busy += time.perf_counter() - started
+
+                metrics.items += 1
+                self.pages.put((page, html), metrics)
+        finally:
+            self.pages.put(END, metrics)
+
+    def parse(self):
+        metrics = self.stages['parse']
+        try:
+            while True:
+                item = self.pages.get(metrics)
+                if item is END:
+                    break
+                if self.stop_event.is_set():
+                    continue
+
+                page, html = item
+                started = time.perf_counter()
+                try:
+                    raw_products = self.scraper.parse_page(html)
+                except Exception as e:
+                    self.fail('parse', page, e)
+                    continue
+                finally:
+                    metrics.busy += time.perf_counter() - started
+
+                metrics.items += 1
+                metrics.records += len(raw_products)
+                if not raw_products:
+                    print(f"No products found on page {page}. Stopping.")
+                    self.stop_event.set()
+                    continue
+                self.batches.put((page, raw_products), metrics)
+        finally:
+            self.batches.put(END, metrics)
+
+    def write(self):
+        metrics = self.stages['write']
+        while True:
+            item = self.batches.get(metrics)
+            if item is END:
+                break
+            if self.stop_event.is_set() and self.errors:
+                continue
+
+            page, raw_products = item
+            started = time.perf_counter()
+            try:
+                page_inserted, page_updated = self.scraper.write_products(raw_products, self.category, self.subcategory)
+            except Exception as e:
+                self.fail('write', page, e)
+                continue
+            finally:
+                metrics.busy += time.perf_counter() - started
+
+            metrics.items += 1
+            metrics.records += len(raw_products)
+            self.inserted += page_inserted
+            self.updated += page_updated
+            print(f"{self.category} > {self.subcategory} page {page}: Inserted {page_inserted}, Updated {page_updated} products")
+
+    def run(self):
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self.parse, name='pipeline-parse'),
+            threading.Thread(target=self.write, name='pipeline-write')
+        ]
+        for thread in threads:
+            thread.start()
+
+        # The fetch stage drives the browser, which belongs to this thread.
+        self.fetch()
+        for thread in threads:
+            thread.join()
+
+        return self.report(time.perf_counter() - started)
+
+    def report(self, seconds):
+        stages = {name: metrics.report() for name, metrics in self.stages.items()}
+        bottleneck = max(stages, key=lambda name: stages[name]['busy_seconds'])
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'seconds': round(seconds, 3),
+            'stages': stages,
+            'queues': {q.name: q.report() for q in (self.pages, self.batches)},
+            'bottleneck': bottleneck,
+            'errors': self.errors
+        }
+
+def print_report(report):
+    print(f"Pipeline finished in {report['seconds']}s, bottleneck: {report['bottleneck']}")
+    for name, stage in report['stages'].items():
+        print(f"  {name:<6} {stage['items']:>3} pages  busy {stage['busy_seconds']:>7.3f}s  "
+              f"waiting {stage['wait_seconds']:>7.3f}s  {stage['items_per_second'] or 0:>7.2f} pages/s")
+    for name, depth in report['queues'].items():
+        print(f"  queue {name:<8} max {depth['max_depth']}/{depth['capacity']}  mean {depth['mean_depth']}")
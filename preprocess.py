@@ -3,6 +3,10 @@ import pandas as pd
 import numpy as np
 import re
 
+import dtypes
+import schema
+import sketches
+
 def connect_to_db():
     return mysql.connector.connect(host="localhost",port=3306,database="myntradb",user="root",password="root")
 
@@ -26,8 +30,16 @@ def preprocess_myntra_data():
         print(f"Loaded {len(df)} rows for preprocessing")
         
         df_cleaned = preprocess_dataframe(df)
+        for label, report in dtypes.snapshot().items():
+            print(dtypes.format_report(label, report))
         
-        upsert_cleaned_data(df_cleaned, cursor, db)
+        stored = upsert_cleaned_data(df_cleaned, cursor, db)
+        sketch_cursor = db.cursor()
+        sketches.update_sketches(sketch_cursor, *sketches.upsert_changes(df_cleaned, stored))
+        if sketches.rebuild_if_due(sketch_cursor, df_cleaned):
+            print("Rebuilt column sketches")
+        sketch_cursor.close()
+        db.commit()
         
         print(f"Successfully processed {len(df_cleaned)} rows into cleaned_products table")
         
@@ -39,12 +51,22 @@ def preprocess_myntra_data():
             db.close()
 
 def create_cleaned_table(cursor):
-    cursor.execute("""CREATE TABLE IF NOT EXISTS cleaned_products (id INT PRIMARY KEY,brand VARCHAR(255),name VARCHAR(255),price FLOAT,original_price FLOAT,discount FLOAT,rating FLOAT,category VARCHAR(100),subcategory VARCHAR(100))""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS cleaned_products (id INT PRIMARY KEY,brand VARCHAR(255),name VARCHAR(255),price FLOAT,original_price FLOAT,discount FLOAT,rating FLOAT,category VARCHAR(100),subcategory VARCHAR(100),updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,INDEX idx_cleaned_updated_at (updated_at))""")
+    
+    cursor.execute("""SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = 'myntradb' AND TABLE_NAME = 'cleaned_products' AND COLUMN_NAME = 'updated_at'""")
+    if not cursor.fetchone():
+        cursor.execute("""ALTER TABLE cleaned_products ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, ADD INDEX idx_cleaned_updated_at (updated_at)""")
     
+    created = schema.ensure_indexes(cursor)
+    if created:
+        print(f"Created indexes on cleaned_products: {', '.join(created)}")
+    
+    sketches.create_sketch_table(cursor)
 
-def preprocess_dataframe(df):
+def preprocess_dataframe(df, impute_means=True):
     print("Starting preprocessing...")
     
+    df = dtypes.compact(df, 'preprocess:raw', dtypes.RAW_COLUMNS)
     df_cleaned = df.drop(['image_url', 'product_url', 'created_at'], axis=1, errors='ignore')
     
     df_cleaned['price'] = df_cleaned['price'].apply(lambda x: clean_price(x) if x else np.nan)
@@ -58,7 +80,7 @@ def preprocess_dataframe(df):
         if pd.isna(row['original_price']):
             if pd.notna(row['price']) and row['price'] > 0:
                 df_cleaned.at[idx, 'original_price'] = row['price']
-            else:
+            elif impute_means:
                 df_cleaned.at[idx, 'original_price'] = mean_original_price
     
     df_cleaned['discount'] = df_cleaned['discount'].apply(lambda x: clean_discount(x) if x else np.nan)
@@ -75,15 +97,16 @@ def preprocess_dataframe(df):
     
     df_cleaned['rating'] = df_cleaned['rating'].apply(lambda x: float(x) if x and str(x).strip() else np.nan)
     
-    mean_rating = df_cleaned.loc[df_cleaned['rating'].notna(), 'rating'].mean()
-    
-    df_cleaned['rating'] = df_cleaned['rating'].fillna(mean_rating)
+    if impute_means:
+        mean_rating = df_cleaned.loc[df_cleaned['rating'].notna(), 'rating'].mean()
+        
+        df_cleaned['rating'] = df_cleaned['rating'].fillna(mean_rating)
     
     df_cleaned['id'] = df_cleaned['id'].astype(int)
     
     df_cleaned['discount'] = df_cleaned['discount'].fillna(0.0)
     
-    return df_cleaned
+    return dtypes.compact(df_cleaned, 'preprocess:cleaned')
 
 def clean_price(price_str):
     if not price_str:
@@ -107,12 +130,14 @@ def upsert_cleaned_data(df, cursor, db):
     print("Inserting or updating cleaned data in the table...")
     
     processed_count = 0
+    stored = {}
     for _, row in df.iterrows():
         try:
-            cursor.execute("SELECT id FROM cleaned_products WHERE id = %s", (int(row['id']),))
+            cursor.execute(f"SELECT id, category, {', '.join(sketches.SKETCH_COLUMNS)} FROM cleaned_products WHERE id = %s", (int(row['id']),))
             exists = cursor.fetchone()
             
             if exists:
+                stored[int(row['id'])] = tuple(exists[col] for col in ['category'] + list(sketches.SKETCH_COLUMNS))
                 cursor.execute("""UPDATE cleaned_products SET brand = %s, name = %s, price = %s, original_price = %s, discount = %s, rating = %s, category = %s, subcategory = %sWHERE id = %s""", (row['brand'],row['name'],float(row['price']),float(row['original_price']),float(row['discount']),float(row['rating']),row['category'],row['subcategory'],int(row['id'])))
             else:
                 cursor.execute("""INSERT INTO cleaned_products (id, brand, name, price, original_price, discount, rating, category, subcategory)VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""", (int(row['id']),row['brand'],row['name'],float(row['price']),float(row['original_price']),float(row['discount']),float(row['rating']),row['category'],row['subcategory']))
@@ -127,6 +152,44 @@ def upsert_cleaned_data(df, cursor, db):
             print(f"Error processing row {row['id']}: {str(e)}")
             
     print(f"Total records processed: {processed_count}")
+    return stored
+
+def nullable_float(value):
+    return None if pd.isna(value) else float(value)
+
+def upsert_cleaned_rows(df, cursor):
+    # Batched counterpart of upsert_cleaned_data for the scraper's ingest path;
+    # the caller commits, so both tables land in one transaction. New and
+    # changed values are folded into the column sketches in the same
+    # transaction, and the values they overwrite are counted as stale.
+    rows = [(int(row['id']), row['brand'], row['name'], nullable_float(row['price']), nullable_float(row['original_price']), nullable_float(row['discount']), nullable_float(row['rating']), row['category'], row['subcategory']) for _, row in df.iterrows()]
+    if rows:
+        ids = [row[0] for row in rows]
+        cursor.execute(f"""SELECT id, category, {', '.join(sketches.SKETCH_COLUMNS)} FROM cleaned_products WHERE id IN ({', '.join(['%s'] * len(ids))})""", ids)
+        stored = {int(row[0]): row[1:] for row in cursor.fetchall()}
+        cursor.executemany("""INSERT INTO cleaned_products (id, brand, name, price, original_price, discount, rating, category, subcategory) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE brand = VALUES(brand), name = VALUES(name), price = VALUES(price), original_price = VALUES(original_price), discount = VALUES(discount), rating = VALUES(rating), category = VALUES(category), subcategory = VALUES(subcategory)""", rows)
+        sketches.update_sketches(cursor, *sketches.upsert_changes(df, stored))
+    return len(rows)
+
+def impute_missing_means(cursor):
+    # Deferred half of preprocess_dataframe's mean imputation for rows written
+    # with impute_means=False, touching only rows with a NULL. The sketches
+    # skipped those missing values, so the means filled in are folded in as
+    # new values and nothing goes stale.
+    cursor.execute("""SELECT AVG(rating), AVG(original_price) FROM cleaned_products""")
+    means = dict(zip(['rating', 'original_price'], map(sketches.stored_float, cursor.fetchone())))
+    cursor.execute("""SELECT category, rating IS NULL, original_price IS NULL FROM cleaned_products WHERE rating IS NULL OR original_price IS NULL""")
+    missing = pd.DataFrame(cursor.fetchall(), columns=['category', 'rating', 'original_price'])
+    if missing.empty:
+        return 0
+
+    cursor.execute("""UPDATE cleaned_products SET rating = COALESCE(rating, %s), original_price = COALESCE(original_price, %s) WHERE rating IS NULL OR original_price IS NULL""", (means['rating'], means['original_price']))
+    filled = cursor.rowcount
+    filled_in = missing[['category']].copy()
+    for col, mean in means.items():
+        filled_in[col] = np.where(missing[col].astype(bool), np.nan if mean is None else mean, np.nan)
+    sketches.update_sketches(cursor, filled_in)
+    return filled
 
 if __name__ == "__main__":
     print("MYNTRA's DATA PREPROCESSING")
@@ -1,4 +1,7 @@
 import os
+import json
+import hashlib
+from html.parser import HTMLParser
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -7,8 +10,233 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from urllib.parse import urljoin
 import time
+import requests
 import mysql.connector
 import re
+from datetime import date
+import pandas as pd
+
+import history
+import preprocess
+import sketches
+from pipeline import ScrapePipeline, print_report
+
+PRODUCT_FIELDS = [
+    ["brand", ["h3.product-brand"], None],
+    ["name", ["h4.product-product"], None],
+    ["price", ["div.product-price", "span.product-discountedPrice"], None],
+    ["original_price", ["span.product-strike", "span.product-mrp"], None],
+    ["rating", ["div.product-ratingsContainer", "span.product-rating", "div.product-rating"], None],
+    ["image_url", ["img.img-responsive"], "src"],
+    ["product_url", ["a"], "href"]
+]
+
+# Reads every field of every product card in one WebDriver round trip. Each
+# field takes the first selector that matches, like the old per-field
+# find_element fallbacks did.
+EXTRACT_PRODUCTS_JS = """
+const fields = %s;
+return Array.from(document.querySelectorAll('li.product-base')).map(card => {
+    const record = {};
+    for (const [field, selectors, attr] of fields) {
+        record[field] = '';
+        for (const selector of selectors) {
+            const found = card.querySelector(selector);
+            if (found) {
+                record[field] = attr ? (found.getAttribute(attr) || '') : found.innerText.trim();
+                break;
+            }
+        }
+    }
+    return record;
+});
+""" % json.dumps(PRODUCT_FIELDS)
+
+UPSERT_PRODUCTS_SQL = """INSERT INTO myntra_products (product_key, brand, name, price, original_price, discount, rating, image_url, product_url, category, subcategory) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE price = VALUES(price), original_price = VALUES(original_price), discount = VALUES(discount), rating = VALUES(rating), image_url = VALUES(image_url)"""
+
+def product_key(brand, name, product_url, category, subcategory):
+    return hashlib.sha1("|".join(v or "" for v in (brand, name, product_url, category, subcategory)).encode("utf-8")).hexdigest()
+
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+class ListingParser(HTMLParser):
+    SELECTORS = {selector for _, selectors, _ in PRODUCT_FIELDS for selector in selectors}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.products = []
+        self._card = None
+        self._stack = []
+        self._capturing = set()
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+
+        if self._card is None:
+            if tag == "li" and "product-base" in classes:
+                self._card = {}
+                self._stack = []
+                self._capturing = set()
+            return
+
+        matched = []
+        for selector in self.SELECTORS:
+            sel_tag, _, sel_class = selector.partition(".")
+            if tag == sel_tag and (not sel_class or sel_class in classes) and selector not in self._card:
+                self._card[selector] = {"text": [], "attrs": attrs}
+                matched.append(selector)
+
+        if tag in VOID_ELEMENTS:
+            return
+        self._capturing.update(matched)
+        self._stack.append((tag, matched))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS and self._card is not None and self._stack:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self._card is None:
+            return
+
+        if not self._stack:
+            if tag == "li":
+                self.products.append(self._record(self._card))
+                self._card = None
+            return
+
+        if tag not in [open_tag for open_tag, _ in self._stack]:
+            return
+        while self._stack:
+            open_tag, matched = self._stack.pop()
+            self._capturing.difference_update(matched)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        for selector in self._capturing:
+            self._card[selector]["text"].append(data)
+
+    def _record(self, card):
+        record = {}
+        for field, selectors, attr in PRODUCT_FIELDS:
+            record[field] = ""
+            for selector in selectors:
+                if selector in card:
+                    found = card[selector]
+                    record[field] = (found["attrs"].get(attr) or "") if attr else "".join(found["text"]).strip()
+                    break
+        return record
+
+def parse_listing_html(html):
+    parser = ListingParser()
+    parser.feed(html)
+    parser.close()
+    return parser.products
+
+MYX_STATE = re.compile(r"window\.__myx\s*=\s*(\{.*?\})\s*;?\s*</script>", re.S)
+
+def format_rupees(amount):
+    # Myntra prints prices with Indian digit grouping (1,00,000).
+    digits = str(int(amount))
+    if len(digits) > 3:
+        head, tail = digits[:-3], digits[-3:]
+        groups = []
+        while len(head) > 2:
+            groups.insert(0, head[-2:])
+            head = head[:-2]
+        digits = ",".join([head] + groups + [tail])
+    return f"Rs. {digits}"
+
+def parse_myx_products(html):
+    # Server-rendered listings embed the search results as window.__myx; this
+    # maps them onto the same raw fields the product cards yield.
+    match = MYX_STATE.search(html)
+    if not match:
+        return None
+    
+    try:
+        products = json.loads(match.group(1))["searchData"]["results"]["products"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    
+    records = []
+    for product in products:
+        price = product.get("price") or 0
+        mrp = product.get("mrp") or 0
+        rating = product.get("rating") or 0
+        records.append({
+            "brand": product.get("brand") or "",
+            "name": product.get("additionalInfo") or "",
+            "price": format_rupees(price) if price else "",
+            "original_price": format_rupees(mrp) if mrp and mrp != price else "",
+            "rating": f"{rating:.1f}" if rating else "",
+            "image_url": product.get("searchImage") or "",
+            "product_url": product.get("landingPageUrl") or ""
+        })
+    return records
+
+def parse_listing_products(html):
+    records = parse_myx_products(html)
+    if records is None:
+        records = parse_listing_html(html)
+    return records
+
+class BrowserFetcher:
+    SETTLE_SECONDS = 1.5
+    
+    def __init__(self, headless=True):
+        options = webdriver.ChromeOptions()
+        if headless: options.add_argument("--headless=new")
+        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        self.wait = WebDriverWait(self.driver, 10)
+
+    def load(self, url):
+        self.driver.get(url)
+        self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "li.product-base")))
+        time.sleep(self.SETTLE_SECONDS)
+
+    def fetch(self, url):
+        self.load(url)
+        return self.driver.page_source
+
+    def extract(self, url):
+        self.load(url)
+        return self.driver.execute_script(EXTRACT_PRODUCTS_JS)
+
+    def close(self):
+        self.driver.quit()
+
+class HttpFetcher:
+    TIMEOUT = 15
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml",
+        "Accept-Language": "en-IN,en;q=0.9"
+    }
+    
+    def __init__(self):
+        # One keep-alive session per scraper, so every page after the first
+        # reuses the open connection to the host.
+        self.session = requests.Session()
+        self.session.headers.update(self.HEADERS)
+
+    def fetch(self, url):
+        response = self.session.get(url, timeout=self.TIMEOUT)
+        if response.status_code == 404:
+            return ""
+        response.raise_for_status()
+        return response.text
+
+    def extract(self, url):
+        return parse_listing_products(self.fetch(url))
+
+    def close(self):
+        self.session.close()
+
+FETCHERS = {"browser": BrowserFetcher, "http": HttpFetcher}
 
 class MyntraScraper:
     BASE_URL = "https://www.myntra.com"
@@ -38,20 +266,32 @@ class MyntraScraper:
     }
 
 
-    def __init__(self, headless=True):
-        options = webdriver.ChromeOptions()
-        if headless: options.add_argument("--headless=new")
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
-        self.wait = WebDriverWait(self.driver, 10)
+    def __init__(self, headless=True, base_url=None, fetcher="browser", ingest=False, history_tables=True):
+        if base_url:
+            self.BASE_URL = base_url
+        
+        self.fetcher = BrowserFetcher(headless) if fetcher == "browser" else FETCHERS[fetcher]()
         
         self.db = mysql.connector.connect(host="localhost", port=3306, database="myntradb", user="root", password="root")
         self.cursor = self.db.cursor()
-        self.setup_db()
+        self.setup_db(history_tables)
+        self.init_write_state(ingest)
+
+    def init_write_state(self, ingest=False):
+        # With ingest on, each page is also cleaned in-process and written to
+        # cleaned_products, so preprocess.py does not have to reread the table.
+        self.ingest = ingest
+        self.ingested = 0
+        if ingest:
+            preprocess.create_cleaned_table(self.cursor)
+            self.db.commit()
         
         self.all_records_deleted = False
+        # Days with price_history rows from this scraper, rolled up at the end.
+        self.history_days = set()
 
-    def setup_db(self):
-        sql_query = """CREATE TABLE IF NOT EXISTS myntra_products (id INT AUTO_INCREMENT PRIMARY KEY, brand VARCHAR(255), name VARCHAR(255), price VARCHAR(50), original_price VARCHAR(50), discount VARCHAR(20), rating VARCHAR(10), image_url TEXT, product_url TEXT, category VARCHAR(100), subcategory VARCHAR(100), created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP)"""
+    def setup_db(self, history_tables=True):
+        sql_query = """CREATE TABLE IF NOT EXISTS myntra_products (id INT AUTO_INCREMENT PRIMARY KEY, product_key CHAR(40), brand VARCHAR(255), name VARCHAR(255), price VARCHAR(50), original_price VARCHAR(50), discount VARCHAR(20), rating VARCHAR(10), image_url TEXT, product_url TEXT, category VARCHAR(100), subcategory VARCHAR(100), created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, UNIQUE KEY uq_myntra_product_key (product_key))"""
         self.cursor.execute(sql_query)
         
         try:
@@ -60,19 +300,24 @@ class MyntraScraper:
                 self.cursor.execute("""ALTER TABLE myntra_products ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP""")
         except:
             pass
-            
+        
+        try:
+            self.cursor.execute("""SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = 'myntradb' AND TABLE_NAME = 'myntra_products' AND COLUMN_NAME = 'product_key'""")
+            if not self.cursor.fetchone():
+                print("Adding product_key to myntra_products...")
+                self.cursor.execute("""ALTER TABLE myntra_products ADD COLUMN product_key CHAR(40) AFTER id""")
+                self.cursor.execute("""UPDATE myntra_products SET product_key = SHA1(CONCAT_WS('|', IFNULL(brand, ''), IFNULL(name, ''), IFNULL(product_url, ''), IFNULL(category, ''), IFNULL(subcategory, '')))""")
+                self.cursor.execute("""DELETE older FROM myntra_products older JOIN myntra_products newer ON older.product_key = newer.product_key AND older.id < newer.id""")
+                self.cursor.execute("""ALTER TABLE myntra_products ADD UNIQUE KEY uq_myntra_product_key (product_key)""")
+        except Exception as e:
+            print(f"product_key migration error: {str(e)}")
+        
+        # Crawler workers pass history_tables=False: Crawler.run has already
+        # created the tables and partitions once, before starting them.
+        if history_tables:
+            history.create_history_tables(self.cursor)
         self.db.commit()
 
-    def extract(self, elem, selector, attr=None):
-        selectors = selector.split(",")
-        for sel in selectors:
-            try:
-                found = elem.find_element(By.CSS_SELECTOR, sel.strip())
-                return found.get_attribute(attr) if attr else found.text.strip()
-            except:
-                continue
-        return ""
-
     def clean_price(self, price_text):
         if not price_text:
             return ""
@@ -82,12 +327,9 @@ class MyntraScraper:
             return f"Rs. {match.group(1)}"
         return price_text
 
-    def extract_prices_and_discount(self, elem):
-        price_elem = self.extract(elem, "div.product-price, span.product-discountedPrice")
-        current_price = self.clean_price(price_elem)
-        
-        original_price_elem = self.extract(elem, "span.product-strike, span.product-mrp")
-        original_price = self.clean_price(original_price_elem)
+    def parse_prices_and_discount(self, price_text, original_price_text):
+        current_price = self.clean_price(price_text)
+        original_price = self.clean_price(original_price_text)
         
         discount = ""
         if original_price and current_price and original_price != current_price:
@@ -104,16 +346,27 @@ class MyntraScraper:
                 
         return current_price, original_price, discount
 
-    def extract_rating(self, elem):
-        try:
-            rating = self.extract(elem, "div.product-ratingsContainer, span.product-rating, div.product-rating")
-            if rating:
-                match = re.search(r'(\d+\.?\d*)', rating)
-                if match:
-                    return match.group(1)
-            return ""
-        except:
-            return ""
+    def parse_rating(self, rating_text):
+        if rating_text:
+            match = re.search(r'(\d+\.?\d*)', rating_text)
+            if match:
+                return match.group(1)
+        return ""
+
+    def build_product(self, raw, category, subcategory):
+        brand = " ".join(raw.get("brand", "").split())
+        name = " ".join(raw.get("name", "").split())
+        
+        price, original_price, discount = self.parse_prices_and_discount(raw.get("price", ""), raw.get("original_price", ""))
+        rating = self.parse_rating(raw.get("rating", ""))
+        
+        image_url = urljoin(self.BASE_URL, raw["image_url"]) if raw.get("image_url") else ""
+        product_url = urljoin(self.BASE_URL, raw.get("product_url", ""))
+        
+        if not brand or not name or not price:
+            return None
+        
+        return (brand, name, price, original_price, discount, rating, image_url, product_url, category, subcategory)
             
     def clean_database_for_category(self, category, subcategory):
         try:
@@ -147,96 +400,121 @@ class MyntraScraper:
         self.all_records_deleted = False
         return "none", 0
 
-    def process_product(self, product_data):
-        brand, name, price, original_price, discount = product_data[:5]
-        rating, image_url, product_url, category, subcategory = product_data[5:]
+    def upsert_products(self, products):
+        rows = {}
+        for brand, name, price, original_price, discount, rating, image_url, product_url, category, subcategory in products:
+            key = product_key(brand, name, product_url, category, subcategory)
+            rows[key] = (key, brand, name, price, original_price, discount, rating, image_url, product_url, category, subcategory)
         
-        if self.all_records_deleted:
+        if not rows:
+            return 0, 0
+        
+        # Even right after a category was cleared, earlier pages of this crawl
+        # (or a product listed under two pages) are already stored again.
+        placeholders = ", ".join(["%s"] * len(rows))
+        self.cursor.execute(f"""SELECT product_key, price, original_price, discount, rating FROM myntra_products WHERE product_key IN ({placeholders})""", list(rows))
+        existing = {row[0]: row[1:] for row in self.cursor.fetchall()}
+        
+        # Same transaction as the upsert, and only for new or changed products.
+        today = date.today()
+        observed = {key: (brand, category, subcategory, price, original_price, discount, rating) for key, brand, name, price, original_price, discount, rating, image_url, product_url, category, subcategory in rows.values()}
+        if history.record_changes(self.cursor, observed, existing, today):
+            self.history_days.add(today)
+        
+        self.cursor.executemany(UPSERT_PRODUCTS_SQL, list(rows.values()))
+        affected = self.cursor.rowcount
+        if self.ingest:
+            self.ingest_cleaned(list(rows))
+        
+        # MySQL reports 1 affected row per insert and 2 per update that changed
+        # values; re-seen products whose values did not change report 0, so the
+        # key lookup is what separates inserts from unchanged rows.
+        inserted = len(rows) - len(existing)
+        updated = max(0, (affected - inserted) // 2)
+        return inserted, updated
+
+    def ingest_cleaned(self, keys):
+        placeholders = ", ".join(["%s"] * len(keys))
+        self.cursor.execute(f"""SELECT id, brand, name, price, original_price, discount, rating, category, subcategory FROM myntra_products WHERE product_key IN ({placeholders})""", keys)
+        df = pd.DataFrame(self.cursor.fetchall(), columns=[d[0] for d in self.cursor.description])
+        
+        # Global means are left to impute_missing_means once the crawl is done.
+        df_cleaned = preprocess.preprocess_dataframe(df, impute_means=False)
+        self.ingested += preprocess.upsert_cleaned_rows(df_cleaned, self.cursor)
+
+    def rollup_history(self):
+        history.rollup_days(self.cursor, self.history_days)
+        self.db.commit()
+        self.history_days = set()
+
+    def finish_ingest(self):
+        filled = preprocess.impute_missing_means(self.cursor)
+        rebuilt = sketches.rebuild_if_due(self.cursor)
+        self.db.commit()
+        print(f"Ingested {self.ingested} cleaned rows, filled {filled} missing values with table means{', rebuilt column sketches' if rebuilt else ''}")
+
+    def page_url(self, url, page):
+        return f"{urljoin(self.BASE_URL, url)}{'?p=' + str(page) if page > 1 else ''}"
+
+    def fetch_page(self, url, page):
+        return self.fetcher.fetch(self.page_url(url, page))
+
+    def parse_page(self, html):
+        return parse_listing_products(html)
+
+    def write_products(self, raw_products, category, subcategory):
+        products = []
+        for raw in raw_products:
             try:
-                self.cursor.execute("""INSERT INTO myntra_products (brand, name, price, original_price, discount, rating, image_url, product_url, category, subcategory)VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""", (brand, name, price, original_price, discount, rating, image_url, product_url, category, subcategory))
-                return "inserted"
+                product_data = self.build_product(raw, category, subcategory)
+                if product_data:
+                    products.append(product_data)
             except Exception as e:
-                print(f"Database insert error: {str(e)}")
-                return "error"
+                print(f"Product error: {str(e)[:50]}...")
         
         try:
-            self.cursor.execute("""SELECT id FROM myntra_products WHERE brand = %s AND name = %s AND product_url = %s AND category = %s AND subcategory = %s""", (brand, name, product_url, category, subcategory))
-            
-            result = self.cursor.fetchone()
-            
-            if result:
-                product_id = result[0]
-                self.cursor.execute("""UPDATE myntra_products SET price = %s, original_price = %s, discount = %s, rating = %s, image_url = %sWHERE id = %s""", (price, original_price, discount, rating, image_url, product_id))
-                return "updated"
-            else:
-                self.cursor.execute("""INSERT INTO myntra_products (brand, name, price, original_price, discount, rating, image_url, product_url, category, subcategory)VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""", (brand, name, price, original_price, discount, rating, image_url, product_url, category, subcategory))
-                return "inserted"
-                
+            page_inserted, page_updated = self.upsert_products(products)
+            self.db.commit()
         except Exception as e:
+            self.db.rollback()
             print(f"Database upsert error: {str(e)}")
-            return "error"
+            raise
+        
+        return page_inserted, page_updated
 
-    def scrape(self, url, category, subcategory, max_pages=3):
-        action, count = self.clean_database_for_category(category, subcategory)
+    def scrape_page(self, url, page, targets):
+        # Several subcategories can share one listing URL; the page is fetched
+        # once and its products written under every (category, subcategory).
+        extract_started = time.perf_counter()
+        raw_products = self.fetcher.extract(self.page_url(url, page))
+        extract_seconds = time.perf_counter() - extract_started
+        
+        if not raw_products:
+            return None
         
         products_inserted = 0
         products_updated = 0
+        for category, subcategory in targets:
+            page_inserted, page_updated = self.write_products(raw_products, category, subcategory)
+            print(f"{category} > {subcategory} page {page}: Inserted {page_inserted}, Updated {page_updated} products ({len(raw_products)} extracted in {extract_seconds:.3f}s)")
+            products_inserted += page_inserted
+            products_updated += page_updated
         
-        for page in range(1, max_pages + 1):
-            try:
-                page_url = f"{urljoin(self.BASE_URL, url)}{'?p=' + str(page) if page > 1 else ''}"
-                self.driver.get(page_url)
-                self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "li.product-base")))
-                time.sleep(1.5)
-                
-                products_on_page = self.driver.find_elements(By.CSS_SELECTOR, "li.product-base")
-                if not products_on_page:
-                    print(f"No products found on page {page}. Stopping.")
-                    break
-                
-                page_inserted = 0
-                page_updated = 0
-                    
-                for elem in products_on_page:
-                    try:
-                        brand = self.extract(elem, "h3.product-brand")
-                        name = self.extract(elem, "h4.product-product")
-                        
-                        price, original_price, discount = self.extract_prices_and_discount(elem)
-                        
-                        rating = self.extract_rating(elem)
-                        
-                        image_url = self.extract(elem, "img.img-responsive", "src")
-                        product_url = urljoin(self.BASE_URL, self.extract(elem, "a", "href"))
-                        
-                        if not brand or not name or not price:
-                            continue
-                        
-                        product_data = (brand, name, price, original_price, discount, rating, image_url, product_url, category, subcategory)
-                        
-                        result = self.process_product(product_data)
-                        if result == "inserted":
-                            products_inserted += 1
-                            page_inserted += 1
-                        elif result == "updated":
-                            products_updated += 1
-                            page_updated += 1
-                            
-                        self.db.commit()
-                        
-                    except Exception as e:
-                        print(f"Product error: {str(e)[:50]}...")
-                
-                print(f"Page {page}: Inserted {page_inserted}, Updated {page_updated} products")
-                
-            except Exception as e:
-                print(f"Page error: {str(e)[:50]}...")
-                break
+        return raw_products, products_inserted, products_updated
+
+    def scrape(self, url, category, subcategory, max_pages=3):
+        action, count = self.clean_database_for_category(category, subcategory)
+        
+        report = ScrapePipeline(self, url, category, subcategory, max_pages).run()
+        print_report(report)
+        self.rollup_history()
+        if self.ingest:
+            self.finish_ingest()
                 
-        return products_inserted, products_updated
+        return report['inserted'], report['updated']
 
     def close(self):
-        self.driver.quit()
+        self.fetcher.close()
         self.db.close()
 
 def show_menu(options):
@@ -0,0 +1,113 @@
+import cProfile
+import json
+import os
+import pstats
+import time
+import uuid
+from datetime import datetime
+
+from flask import current_app, g, request
+
+PROFILES_DIR = 'profiles'
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = 'profile'
+TOP_FUNCTIONS = 25
+
+def requested():
+    return request.headers.get(PROFILE_HEADER) == '1' or request.args.get(PROFILE_PARAM) == '1'
+
+def package_of(filename):
+    # Groups hot spots by library: site-packages/sklearn/... -> sklearn,
+    # this repo's modules by file name, C builtins as "~".
+    if filename == '~' or filename.startswith('<'):
+        return filename
+    parts = filename.replace('\\', '/').split('/')
+    for marker in ('site-packages', 'dist-packages'):
+        if marker in parts:
+            return parts[parts.index(marker) + 1]
+    return os.path.splitext(parts[-1])[0]
+
+def hot_functions(stats, sort='tottime', limit=TOP_FUNCTIONS):
+    column = {'tottime': 2, 'cumtime': 3}[sort]
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][column], reverse=True)[:limit]
+    return [{
+        'function': f"{func} ({filename}:{line})" if filename != '~' else func,
+        'package': package_of(filename),
+        'calls': nc,
+        'tottime': round(tt, 6),
+        'cumtime': round(ct, 6)
+    } for (filename, line, func), (cc, nc, tt, ct, callers) in rows]
+
+def package_totals(stats, limit=TOP_FUNCTIONS):
+    totals = {}
+    for (filename, line, func), (cc, nc, tt, ct, callers) in stats.stats.items():
+        package = package_of(filename)
+        totals[package] = totals.get(package, 0.0) + tt
+    return [{'package': package, 'tottime': round(seconds, 6)} for package, seconds in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]]
+
+def start_profile():
+    if not current_app.config['PROFILING_ENABLED'] or not requested():
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already running in this interpreter.
+        return
+    g.profiler = profiler
+    g.profile_started = time.perf_counter()
+
+def save_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    seconds = time.perf_counter() - g.profile_started
+
+    profile_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{request.endpoint}_{uuid.uuid4().hex[:6]}"
+    directory = current_app.config['PROFILES_DIR']
+    os.makedirs(directory, exist_ok=True)
+    profiler.dump_stats(os.path.join(directory, f"{profile_id}.prof"))
+
+    stats = pstats.Stats(profiler)
+    summary = {
+        'id': profile_id,
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'path': request.path,
+        'args': request.args.to_dict(),
+        'body': request.get_json(silent=True),
+        'status': response.status_code,
+        'seconds': round(seconds, 6),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'top_tottime': hot_functions(stats, 'tottime'),
+        'top_cumtime': hot_functions(stats, 'cumtime'),
+        'packages': package_totals(stats)
+    }
+    with open(os.path.join(directory, f"{profile_id}.json"), 'w') as f:
+        json.dump(summary, f, indent=2, default=str)
+
+    response.headers['X-Profile-Id'] = profile_id
+    return response
+
+def list_profiles(directory=PROFILES_DIR, limit=TOP_FUNCTIONS):
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as f:
+                summary = json.load(f)
+            summary['top_tottime'] = summary['top_tottime'][:limit]
+            summary['top_cumtime'] = summary['top_cumtime'][:limit]
+            profiles.append(summary)
+    return profiles
+
+def init_app(app):
+    # Call before the other init_app hooks: before_request functions run in
+    # registration order and after_request ones in reverse, so the profile
+    # spans the whole request including serialization and compression.
+    app.config.setdefault('PROFILING_ENABLED', os.environ.get('PROFILING_ENABLED') == '1')
+    app.config.setdefault('PROFILES_DIR', PROFILES_DIR)
+    app.before_request(start_profile)
+    app.after_request(save_profile)
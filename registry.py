@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+REGISTRY_FILE = 'registry.json'
+# Requests without the header share the "default" owner, i.e. one latest
+# model per kind as before.
+OWNER_HEADER = 'X-Session-Id'
+DEFAULT_OWNER = 'default'
+CACHE_SIZE = 16
+
+class ModelRegistry:
+    # File-backed index of the latest model per (owner, kind), shared by every
+    # worker process, plus a per-process cache of loaded models.
+    #
+    # Writers take an exclusive flock on a side lock file, read the index,
+    # update it and swap it in with os.replace, so readers never see a partial
+    # file and need no lock. Readers re-parse the index only when its inode,
+    # mtime or size changes. Model ids carry the training timestamp, so cached
+    # models are not invalidated. Artifacts are loaded through
+    # artifacts.load_artifact, whose large arrays are read-only mmap views
+    # shared between workers by the page cache.
+    def __init__(self, models_dir, load, cache_size=CACHE_SIZE):
+        self.path = os.path.join(models_dir, REGISTRY_FILE)
+        self.lock_path = f"{self.path}.lock"
+        self.load_model = load
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.index = {'latest': {}}
+        self.index_stamp = None
+
+    def read_index(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return {'latest': {}}
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp != self.index_stamp:
+            with open(self.path) as f:
+                index = json.load(f)
+            self.index, self.index_stamp = index, stamp
+        return self.index
+
+    def publish(self, owner, kind, model_id, model_data=None):
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                index = self.read_index()
+                index = {'latest': dict(index.get('latest', {}))}
+                index['latest'][f"{owner}:{kind}"] = {'model_id': model_id, 'published_at': datetime.now().isoformat(timespec='seconds'), 'pid': os.getpid()}
+
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(index, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        if model_data is not None:
+            self.remember(model_id, model_data)
+        return model_id
+
+    def latest(self, owner, kind):
+        entry = self.read_index()['latest'].get(f"{owner}:{kind}")
+        return entry['model_id'] if entry else None
+
+    def latest_ids(self):
+        return [entry['model_id'] for entry in self.read_index()['latest'].values()]
+
+    def remember(self, model_id, model_data):
+        with self.lock:
+            self.cache[model_id] = model_data
+            self.cache.move_to_end(model_id)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def get(self, model_id):
+        # Returns (model_data, source) with source "memory" or "disk", or
+        # (None, None) when the model does not exist.
+        with self.lock:
+            model_data = self.cache.get(model_id)
+            if model_data is not None:
+                self.cache.move_to_end(model_id)
+                return model_data, 'memory'
+
+        model_data = self.load_model(model_id)
+        if model_data is None:
+            return None, None
+        self.remember(model_id, model_data)
+        return model_data, 'disk'
+
+    def warm(self, model_ids=None):
+        for model_id in model_ids if model_ids is not None else self.latest_ids():
+            self.get(model_id)
+        return len(self.cache)
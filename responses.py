@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import threading
+import time
+from decimal import Decimal
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ('application/json', 'text/html')
+
+# GET endpoints whose body depends only on the URL and the data, so a client
+# can revalidate them with If-None-Match.
+CACHEABLE_ENDPOINTS = {'get_data', 'dashboard_data', 'get_brands', 'search_brands', 'list_models'}
+
+def default(obj):
+    # Types neither encoder handles on its own. Decimal and dates keep the
+    # string forms Flask's default provider gives them.
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, pd.DataFrame):
+        return obj.to_dict('records')
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.tolist()
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, date):
+        return http_date(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class FastJSONProvider(DefaultJSONProvider):
+    # orjson with native NumPy support when it is installed, the stdlib encoder
+    # otherwise. Keys stay sorted like Flask's default so bodies, and their
+    # ETags, do not change with the encoder.
+    OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return self.dump_bytes(obj).decode('utf-8')
+
+    def dump_bytes(self, obj):
+        if orjson:
+            return orjson.dumps(obj, default=default, option=self.OPTIONS)
+        return super().dumps(obj, default=default).encode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        body = self.dump_bytes(obj) + b"\n"
+        g.serialize_seconds = g.get('serialize_seconds', 0.0) + time.perf_counter() - started
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+class ResponseStats:
+    # Per-endpoint totals for bytes before and after compression and the time
+    # spent serializing and compressing.
+    FIELDS = ('requests', 'not_modified', 'raw_bytes', 'wire_bytes', 'serialize_seconds', 'compress_seconds')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint, **values):
+        with self.lock:
+            totals = self.endpoints.setdefault(endpoint, dict.fromkeys(self.FIELDS, 0))
+            for field, value in values.items():
+                totals[field] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {endpoint: dict(totals) for endpoint, totals in self.endpoints.items()}
+
+RESPONSE_STATS = ResponseStats()
+
+def negotiate_encoding(accept_encodings):
+    if brotli and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def finish_response(response):
+    if response.direct_passthrough or response.status_code not in (200, 304):
+        return response
+
+    endpoint = request.endpoint or 'unknown'
+    body = response.get_data()
+    raw_bytes = len(body)
+
+    if request.method == 'GET' and endpoint in CACHEABLE_ENDPOINTS and response.status_code == 200:
+        # Weak because the same entity goes out gzip, brotli or identity encoded.
+        response.set_etag(hashlib.blake2b(body, digest_size=16).hexdigest(), weak=True)
+        response.cache_control.no_cache = True
+        response.make_conditional(request)
+
+    compress_seconds = 0.0
+    if response.status_code == 200 and response.mimetype in COMPRESSIBLE_TYPES:
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate_encoding(request.accept_encodings) if raw_bytes >= COMPRESS_MIN_BYTES else None
+        if encoding and 'Content-Encoding' not in response.headers:
+            started = time.perf_counter()
+            response.set_data(compress(body, encoding))
+            compress_seconds = time.perf_counter() - started
+            response.headers['Content-Encoding'] = encoding
+
+    serialize_seconds = g.get('serialize_seconds', 0.0)
+    response.headers['Server-Timing'] = f"serialize;dur={serialize_seconds * 1000:.2f}, compress;dur={compress_seconds * 1000:.2f}"
+    RESPONSE_STATS.record(endpoint, requests=1, not_modified=int(response.status_code == 304), raw_bytes=raw_bytes,
+                          wire_bytes=0 if response.status_code == 304 else len(response.get_data()), serialize_seconds=serialize_seconds, compress_seconds=compress_seconds)
+    return response
+
+def init_app(app):
+    app.json = FastJSONProvider(app)
+    app.after_request(finish_response)
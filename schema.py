@@ -0,0 +1,121 @@
+import argparse
+import sys
+
+import mysql.connector
+
+DB_CONFIG = {'host': 'localhost', 'port': 3306, 'user': 'root', 'password': 'root', 'database': 'myntradb'}
+
+# Covering indexes for the read paths in app.py. Each one leads with the column
+# a chart or query groups by and carries the aggregated columns, so those
+# queries read a narrow index instead of the table rows.
+CLEANED_INDEXES = [
+    # price_diff_category, product_distribution, best_discounted_high_rated, clustering by
+    # category, and the dashboard rollup, which groups by category, subcategory, brand
+    ('idx_cleaned_category_rollup', ['category', 'subcategory', 'brand', 'original_price', 'price', 'discount', 'rating']),
+    # price_diff_subcategory, clustering by subcategory
+    ('idx_cleaned_subcategory_cover', ['subcategory', 'original_price', 'price', 'discount', 'rating']),
+    # brand index, top_selling_brands, rating_distribution, discount_vs_rating,
+    # brand_popularity classification, clustering by brand
+    ('idx_cleaned_brand_cover', ['brand', 'price', 'discount', 'rating']),
+    # correlation_features
+    ('idx_cleaned_rating_price', ['rating', 'price'])
+]
+
+def index_exists(cursor, table, name):
+    cursor.execute("""SELECT INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS WHERE TABLE_SCHEMA = 'myntradb' AND TABLE_NAME = %s AND INDEX_NAME = %s""", (table, name))
+    return bool(cursor.fetchall())
+
+def ensure_indexes(cursor, table='cleaned_products', indexes=CLEANED_INDEXES):
+    created = []
+    for name, columns in indexes:
+        if not index_exists(cursor, table, name):
+            cursor.execute(f"""CREATE INDEX {name} ON {table} ({', '.join(columns)})""")
+            created.append(name)
+    return created
+
+def app_queries():
+    # Imported here so the schema step does not pull in Flask and the ML stack.
+    import app
+    import brand_index
+    import dashboard
+
+    # (name, sql, params, whole_table): whole_table queries aggregate every
+    # row, so the best they can do is read a covering index end to end.
+    queries = [(f"get_data:{chart}", sql, None, True) for chart, sql in app.CHART_QUERIES.items()]
+    queries.append(('brand_index:version', brand_index.VERSION_QUERY, None, True))
+    queries.append(('brand_index:counts', brand_index.BRAND_COUNTS_QUERY, None, True))
+    queries.append(('dashboard:rollup', dashboard.ROLLUP_QUERY, None, True))
+    for features in (['price'], ['discount', 'rating']):
+        queries.append((f"classification:brand_popularity:{'+'.join(features)}", app.brand_popularity_query(['brand'] + features), None, True))
+    for group_by in ('category', 'subcategory', 'brand'):
+        queries.append((f"clustering:{group_by}", app.clustering_query(group_by, ['price', 'discount', 'rating']), None, True))
+    queries.append(('refresh_model:watermark', """
+        SELECT id, updated_at, price, rating
+        FROM cleaned_products
+        WHERE updated_at >= %s
+    """, ('2000-01-01 00:00:00',), False))
+    return queries
+
+def explain(cursor, sql, params=None, dialect='mysql', whole_table=False):
+    # Returns (full_scan, plan lines). A table scan is always flagged: access
+    # type ALL in MySQL, "SCAN <table>" with no index in SQLite. So is a full
+    # index scan (type index, "SCAN <table> USING INDEX"), unless the query
+    # reads the whole table anyway and the index covers it ("Using index",
+    # "USING COVERING INDEX").
+    if dialect == 'sqlite':
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        lines = [row[-1] for row in cursor.fetchall()]
+        scans = [line for line in lines if line.startswith('SCAN')]
+        full_scan = any('INDEX' not in line or not (whole_table and 'COVERING INDEX' in line) for line in scans)
+        return full_scan, lines
+
+    cursor.execute(f"EXPLAIN {sql}", params)
+    columns = [d[0] for d in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    lines = [f"{row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')} {row.get('Extra') or ''}".strip() for row in rows]
+    full_scan = any(row.get('type') == 'ALL' or (row.get('type') == 'index' and not (whole_table and 'Using index' in (row.get('Extra') or ''))) for row in rows)
+    return full_scan, lines
+
+def check_query_plans(cursor, dialect='mysql', verbose=True):
+    flagged = []
+    for name, sql, params, whole_table in app_queries():
+        full_scan, lines = explain(cursor, sql, params, dialect, whole_table)
+        if full_scan:
+            flagged.append(name)
+        if verbose:
+            print(f"{'FULL SCAN' if full_scan else 'ok':<9} {name}")
+            for line in lines:
+                print(f"          {line}")
+    return flagged
+
+def main():
+    parser = argparse.ArgumentParser(description='Create the cleaned_products indexes and check the query plans of the app queries')
+    parser.add_argument('--explain', action='store_true', help='run EXPLAIN for every app query and fail on full table or index scans')
+    parser.add_argument('--sqlite', help='run against an SQLite file through the benchmark stand-in instead of MySQL')
+    args = parser.parse_args()
+
+    dialect = 'mysql'
+    if args.sqlite:
+        sys.path.insert(0, 'benchmarks')
+        import fakedb
+        fakedb.install(args.sqlite)
+        dialect = 'sqlite'
+
+    conn = mysql.connector.connect(**DB_CONFIG)
+    cursor = conn.cursor()
+    try:
+        created = ensure_indexes(cursor)
+        conn.commit()
+        print(f"Created indexes: {', '.join(created) if created else 'none, all present'}")
+
+        if args.explain:
+            flagged = check_query_plans(cursor, dialect)
+            if flagged:
+                print(f"{len(flagged)} query(s) scan a whole table or index: {', '.join(flagged)}")
+                sys.exit(1)
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == '__main__':
+    main()
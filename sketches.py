@@ -0,0 +1,368 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import dtypes
+import metrics
+
+SKETCH_K = 200
+SKETCH_C = 2 / 3
+VERSION_TTL = 5.0
+# A rebuild is due once any sketch holds more overwritten values than this
+# share of its n, and more than STALE_MINIMUM of them.
+STALE_FRACTION = 0.1
+STALE_MINIMUM = 100
+
+SKETCH_COLUMNS = dtypes.FLOAT_COLUMNS
+GLOBAL_SCOPE = '*'
+# Row locked by every incremental update, so concurrent ingest workers
+# serialize on one lock instead of racing on (scope, column) rows.
+LOCK_KEY = (GLOBAL_SCOPE, 'price')
+
+CREATE_SKETCH_TABLE = """CREATE TABLE IF NOT EXISTS column_sketches (scope VARCHAR(160) NOT NULL,column_name VARCHAR(64) NOT NULL,n BIGINT NOT NULL,stale BIGINT NOT NULL DEFAULT 0,state MEDIUMTEXT NOT NULL,updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,PRIMARY KEY (scope, column_name))"""
+UPSERT_SKETCH_SQL = """INSERT INTO column_sketches (scope, column_name, n, stale, state) VALUES (%s, %s, %s, %s, %s) ON DUPLICATE KEY UPDATE n = VALUES(n), stale = VALUES(stale), state = VALUES(state), updated_at = CURRENT_TIMESTAMP"""
+SKETCH_VERSION_QUERY = "SELECT COUNT(*), MAX(updated_at), SUM(n) FROM column_sketches"
+
+# Box plots per category: whiskers at p5/p95, box at p25/p75, line at p50.
+PERCENTILE_CHARTS = {'price_percentiles': 'price', 'rating_percentiles': 'rating'}
+BOX_QUANTILES = (0.05, 0.25, 0.75, 0.95, 0.5)
+
+class KLLSketch:
+    # KLL quantile sketch (Karnin, Lang, Liberty 2016). Level h holds items of
+    # weight 2**h; when the sketch is full, a level is sorted and every other
+    # item, from a random offset, moves up one level. With k=200 the rank error
+    # stays around 1% of n whatever n is, and two sketches merge by pooling
+    # their levels, so per-category sketches add up to the global one.
+    def __init__(self, k=SKETCH_K, c=SKETCH_C, seed=None):
+        self.k = k
+        self.c = c
+        self.rng = random.Random(seed)
+        self.levels = [[]]
+        self.n = 0
+        # Values counted in n that the table has since overwritten; kept
+        # in its own column_sketches column, not in the JSON state.
+        self.stale = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sorted_view = None
+
+    def capacity(self, level):
+        return int(math.ceil(self.k * self.c ** (len(self.levels) - level - 1))) + 1
+
+    def max_size(self):
+        return sum(self.capacity(level) for level in range(len(self.levels)))
+
+    def size(self):
+        return sum(len(items) for items in self.levels)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.sorted_view = None
+
+        values = values.tolist()
+        start = 0
+        while start < len(values):
+            room = max(1, self.max_size() - self.size())
+            self.levels[0].extend(values[start:start + room])
+            start += room
+            self.compress()
+        return self
+
+    def compress(self):
+        while self.size() >= self.max_size():
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) >= self.capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.levels.append([])
+                    items = sorted(self.levels[level])
+                    # An odd item out stays behind at this level.
+                    keep = [items.pop()] if len(items) % 2 else []
+                    offset = self.rng.randint(0, 1)
+                    self.levels[level + 1].extend(items[offset::2])
+                    self.levels[level] = keep
+                    break
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sorted_view = None
+        self.compress()
+        return self
+
+    def view(self):
+        if self.sorted_view is None:
+            values = np.array([item for items in self.levels for item in items], dtype=np.float64)
+            weights = np.concatenate([np.full(len(items), 2 ** level, dtype=np.float64) for level, items in enumerate(self.levels)])
+            order = np.argsort(values, kind='stable')
+            self.sorted_view = (values[order], np.cumsum(weights[order]))
+        return self.sorted_view
+
+    def quantile(self, q):
+        if not self.n:
+            return math.nan
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        values, cumulative = self.view()
+        index = int(np.searchsorted(cumulative, q * cumulative[-1], side='left'))
+        return float(values[min(index, len(values) - 1)])
+
+    def quantiles(self, qs):
+        return [self.quantile(q) for q in qs]
+
+    def rank(self, value):
+        # Estimated share of values <= value.
+        if not self.n:
+            return math.nan
+        values, cumulative = self.view()
+        index = int(np.searchsorted(values, value, side='right'))
+        return float(cumulative[index - 1] / cumulative[-1]) if index else 0.0
+
+    def to_json(self):
+        return json.dumps({'k': self.k, 'c': self.c, 'n': self.n, 'min': self.min, 'max': self.max, 'levels': self.levels}, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text):
+        state = json.loads(text)
+        sketch = cls(state['k'], state['c'])
+        sketch.levels = state['levels']
+        sketch.n = state['n']
+        sketch.min = state['min']
+        sketch.max = state['max']
+        return sketch
+
+def category_scope(category):
+    return f"category:{category}"
+
+def scope_groups(df, columns):
+    frame = dtypes.model_frame(df[columns + (['category'] if 'category' in df.columns else [])])
+    groups = [(GLOBAL_SCOPE, frame)]
+    if 'category' in frame.columns:
+        groups += [(category_scope(category), group) for category, group in frame.groupby('category', sort=True)]
+    return groups
+
+def add_rows(sketches, df, k=SKETCH_K):
+    # Adds each SKETCH_COLUMNS value to the global sketch and to its
+    # category's. Values go in as the decimals the driver returns.
+    columns = [col for col in SKETCH_COLUMNS if col in df.columns]
+    changed = set()
+    for scope, group in scope_groups(df, columns):
+        for col in columns:
+            key = (scope, col)
+            if key not in sketches:
+                sketches[key] = KLLSketch(k)
+            if group[col].notna().any():
+                sketches[key].update(group[col].to_numpy(dtype=np.float64))
+                changed.add(key)
+    return changed
+
+def mark_stale(sketches, replaced):
+    # Counts the values replaced held against the sketches they went into;
+    # they stay in those sketches until the next rebuild.
+    changed = set()
+    for scope, group in scope_groups(replaced, list(SKETCH_COLUMNS)):
+        for col in SKETCH_COLUMNS:
+            count = int(group[col].notna().sum())
+            if count and (scope, col) in sketches:
+                sketches[scope, col].stale += count
+                changed.add((scope, col))
+    return changed
+
+def build_sketches(df, k=SKETCH_K):
+    sketches = {}
+    add_rows(sketches, df, k)
+    return sketches
+
+def create_sketch_table(cursor):
+    cursor.execute(CREATE_SKETCH_TABLE)
+
+def load_sketches(cursor):
+    cursor.execute("""SELECT scope, column_name, stale, state FROM column_sketches""")
+    loaded = {}
+    for scope, column, stale, state in cursor.fetchall():
+        loaded[scope, column] = KLLSketch.from_json(state)
+        loaded[scope, column].stale = int(stale)
+    return loaded
+
+def save_sketches(cursor, sketches, keys=None):
+    rows = [(scope, column, sketches[scope, column].n, sketches[scope, column].stale, sketches[scope, column].to_json()) for scope, column in sorted(keys if keys is not None else sketches)]
+    if rows:
+        cursor.executemany(UPSERT_SKETCH_SQL, rows)
+    return len(rows)
+
+def scan_cleaned(cursor):
+    cursor.execute(f"""SELECT category, {', '.join(SKETCH_COLUMNS)} FROM cleaned_products""")
+    df = pd.DataFrame(cursor.fetchall(), columns=[d[0] for d in cursor.description])
+    for col in SKETCH_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+def rebuild_sketches(cursor, df=None):
+    # Replaces every sketch with one built from df, or from a scan of
+    # cleaned_products, which clears the stale counts.
+    sketches = build_sketches(scan_cleaned(cursor) if df is None else df)
+    cursor.execute("""DELETE FROM column_sketches""")
+    save_sketches(cursor, sketches)
+    return sketches
+
+def stored_float(value):
+    # cleaned_products stores FLOAT, so values compare at float32 width.
+    return None if value is None or pd.isna(value) else float(np.float32(value))
+
+def upsert_changes(df, stored):
+    # Splits an upsert of df against stored, which maps the ids already in the
+    # table to their (category, *SKETCH_COLUMNS) before the write. Returns the
+    # rows whose values go into the sketches, new ones and changed ones, and
+    # the values the changed ones replaced. Re-sent rows with the same values
+    # change nothing.
+    added, replaced = [], []
+    for position, (row_id, category, *values) in enumerate(df[['id', 'category'] + list(SKETCH_COLUMNS)].itertuples(index=False)):
+        before = stored.get(int(row_id))
+        if before is None:
+            added.append(position)
+            continue
+        before = (before[0], *map(stored_float, before[1:]))
+        if before != (category, *map(stored_float, values)):
+            added.append(position)
+            replaced.append(before)
+    return df.iloc[added], pd.DataFrame(replaced, columns=['category'] + list(SKETCH_COLUMNS), dtype=object)
+
+def update_sketches(cursor, df, replaced=None):
+    # Folds cleaned rows into the stored sketches, inside the caller's
+    # transaction; nothing is built until a first rebuild. df holds values
+    # new to the table. A KLL sketch cannot remove an item, so the values in
+    # replaced, overwritten by rows in df, stay in until rebuild_if_due finds
+    # too many of them; until then quantiles are off by at most their share
+    # of n on top of the sketch's own error.
+    if df.empty and (replaced is None or replaced.empty):
+        return 0
+    cursor.execute("""SELECT n FROM column_sketches WHERE scope = %s AND column_name = %s FOR UPDATE""", LOCK_KEY)
+    if not cursor.fetchall():
+        return 0
+    sketches = load_sketches(cursor)
+    changed = add_rows(sketches, df)
+    if replaced is not None and not replaced.empty:
+        changed |= mark_stale(sketches, replaced)
+    return save_sketches(cursor, sketches, changed)
+
+def rebuild_due(cursor, fraction=STALE_FRACTION, minimum=STALE_MINIMUM):
+    cursor.execute("""SELECT n, stale FROM column_sketches""")
+    rows = cursor.fetchall()
+    return not rows or any(stale > max(fraction * n, minimum) for n, stale in rows)
+
+def rebuild_if_due(cursor, df=None, fraction=STALE_FRACTION, minimum=STALE_MINIMUM):
+    # The scheduled rebuild, run once at the end of a crawl or preprocess and
+    # by `python sketches.py` from cron, never per page.
+    if not rebuild_due(cursor, fraction, minimum):
+        return False
+    rebuild_sketches(cursor, df)
+    return True
+
+def box(sketch):
+    p5, p25, p75, p95, p50 = [round(value, 2) for value in sketch.quantiles(BOX_QUANTILES)]
+    return [p5, p25, p75, p95, p50]
+
+def percentile_charts(sketches):
+    charts = {}
+    for chart, column in PERCENTILE_CHARTS.items():
+        charts[chart] = [
+            {"label": scope.split(':', 1)[1], "y": box(sketch), "n": sketch.n}
+            for (scope, col), sketch in sorted(sketches.items())
+            if col == column and scope != GLOBAL_SCOPE and sketch.n
+        ]
+    return charts
+
+class SketchCache:
+    # The stored sketches of the current column_sketches version, reloaded
+    # when its row count, newest updated_at or total n moves; checked at most
+    # once per VERSION_TTL seconds. An empty dict until sketches are built.
+    def __init__(self, connect, ttl=VERSION_TTL):
+        self.connect = connect
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0.0
+        self.sketches = {}
+
+    def get(self):
+        if time.monotonic() - self.checked_at < self.ttl:
+            metrics.cache_event('sketches', True)
+            return self.sketches
+
+        with self.lock:
+            if time.monotonic() - self.checked_at < self.ttl:
+                metrics.cache_event('sketches', True)
+                return self.sketches
+
+            conn = self.connect()
+            try:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(SKETCH_VERSION_QUERY)
+                    version = tuple(str(v) for v in cursor.fetchone())
+                    reloaded = version != self.version
+                    metrics.cache_event('sketches', not reloaded)
+                    if reloaded:
+                        self.sketches = load_sketches(cursor)
+                        self.version = version
+                except Exception:
+                    # No column_sketches table until preprocess.py has run.
+                    self.sketches, self.version = {}, None
+                finally:
+                    cursor.close()
+            finally:
+                conn.close()
+
+            self.checked_at = time.monotonic()
+            return self.sketches
+
+    def columns(self):
+        # Global sketch per column, the shape ml's preprocess functions take.
+        return {col: sketch for (scope, col), sketch in self.get().items() if scope == GLOBAL_SCOPE}
+
+    def charts(self):
+        return percentile_charts(self.get())
+
+def main():
+    import preprocess  # preprocess imports this module
+
+    parser = argparse.ArgumentParser(description="Rebuild the column sketches from cleaned_products once enough stored values are stale")
+    parser.add_argument("--force", action="store_true", help="rebuild even if no sketch is past the stale threshold")
+    parser.add_argument("--stale-fraction", type=float, default=STALE_FRACTION)
+    args = parser.parse_args()
+
+    db = preprocess.connect_to_db()
+    try:
+        cursor = db.cursor()
+        create_sketch_table(cursor)
+        if args.force:
+            rebuild_sketches(cursor)
+            rebuilt = True
+        else:
+            rebuilt = rebuild_if_due(cursor, fraction=args.stale_fraction)
+        db.commit()
+        cursor.close()
+    finally:
+        db.close()
+    print("Rebuilt column sketches" if rebuilt else "Column sketches are within the stale threshold")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import threading
+import time
+
+# Imported first by app.py, so this is roughly when the app module started
+# importing.
+STARTED = time.perf_counter()
+
+PREWARM_MODELS = 3
+
+REPORT = {'pid': os.getpid(), 'import_seconds': None, 'prewarm': None}
+
+def mark_imported():
+    REPORT['import_seconds'] = round(time.perf_counter() - STARTED, 4)
+
+def recent_model_ids(models_dir, limit=PREWARM_MODELS):
+    # Most recently written regression and classification artifacts; predict
+    # is mostly called for the model that was just trained.
+    entries = []
+    for filename in os.listdir(models_dir):
+        name, ext = os.path.splitext(filename)
+        if ext in ('.mdl', '.pkl') and not name.startswith('cluster_'):
+            entries.append((os.path.getmtime(os.path.join(models_dir, filename)), name))
+    return [name for _, name in sorted(entries, reverse=True)[:limit]]
+
+def run_prewarm(tasks):
+    started = time.perf_counter()
+    report = {'pid': os.getpid(), 'steps': {}, 'errors': {}, 'finished': False}
+    REPORT['prewarm'] = report
+    for name, task in tasks:
+        step_started = time.perf_counter()
+        try:
+            task()
+        except Exception as e:
+            report['errors'][name] = str(e)
+        report['steps'][name] = round(time.perf_counter() - step_started, 4)
+    report['seconds'] = round(time.perf_counter() - started, 4)
+    report['finished'] = True
+
+    steps = ', '.join(f"{name} {seconds:.2f}s" for name, seconds in report['steps'].items())
+    print(f"Startup (pid {report['pid']}): import {REPORT['import_seconds']}s, prewarm {report['seconds']:.2f}s ({steps})")
+    for name, error in report['errors'].items():
+        print(f"Prewarm step {name} failed: {error}")
+
+def start_prewarm(tasks):
+    # Runs in a daemon thread so a worker starts serving right away; requests
+    # that arrive before a step finishes just take the cold path.
+    thread = threading.Thread(target=run_prewarm, args=(tasks,), name='prewarm', daemon=True)
+    thread.start()
+    return thread
@@ -173,6 +173,56 @@ function renderClassificationChart(data) {
     chart.render();
 }
 
+const brandSearchCache = new Map();
+
+function searchBrands(query) {
+    const key = query.trim().toLowerCase();
+    if (!brandSearchCache.has(key)) {
+        brandSearchCache.set(key, fetch(`/search_brands?q=${encodeURIComponent(key)}&limit=20`)
+            .then(res => res.json())
+            .catch(() => ({ brands: [] })));
+    }
+    return brandSearchCache.get(key);
+}
+
+function createBrandTypeahead(feature) {
+    const input = document.createElement("input");
+    input.type = "text";
+    input.className = "form-control";
+    input.id = `class-input-${feature}`;
+    input.name = feature;
+    input.required = true;
+    input.autocomplete = "off";
+    input.placeholder = "Start typing a brand";
+    
+    const options = document.createElement("datalist");
+    options.id = `class-input-${feature}-options`;
+    input.setAttribute("list", options.id);
+    
+    let pending = null;
+    const refresh = () => {
+        clearTimeout(pending);
+        pending = setTimeout(() => {
+            const query = input.value;
+            searchBrands(query).then(data => {
+                if (input.value !== query || !data.brands) return;
+                options.innerHTML = "";
+                data.brands.forEach(entry => {
+                    const option = document.createElement("option");
+                    option.value = entry.brand;
+                    option.label = `${entry.count} products`;
+                    options.appendChild(option);
+                });
+            });
+        }, 150);
+    };
+    input.addEventListener("input", refresh);
+    input.addEventListener("focus", refresh, { once: true });
+    
+    input.brandOptions = options;
+    return input;
+}
+
 function createClassPredictionForm(features, target) {
     const predictionForm = document.getElementById("classPredictionForm");
     const featureInputs = document.getElementById("classFeatureInputs");
@@ -191,28 +241,7 @@ function createClassPredictionForm(features, target) {
         let input;
         
         if (feature === 'brand' && target === 'price_category') {
-            input = document.createElement("select");
-            input.className = "form-select";
-            input.id = `class-input-${feature}`;
-            input.name = feature;
-            
-            const placeholderOption = document.createElement("option");
-            placeholderOption.value = "";
-            placeholderOption.textContent = `Select ${feature.replace(/_/g, ' ')}`;
-            input.appendChild(placeholderOption);
-            
-            fetch('/get_brands')
-                .then(res => res.json())
-                .then(data => {
-                    if (data.brands) {
-                        data.brands.forEach(brand => {
-                            const option = document.createElement("option");
-                            option.value = brand;
-                            option.textContent = brand;
-                            input.appendChild(option);
-                        });
-                    }
-                });
+            input = createBrandTypeahead(feature);
         } else {
             input = document.createElement("input");
             input.type = "number";
@@ -226,6 +255,7 @@ function createClassPredictionForm(features, target) {
         
         formGroupDiv.appendChild(label);
         formGroupDiv.appendChild(input);
+        if (input.brandOptions) formGroupDiv.appendChild(input.brandOptions);
         featureInputs.appendChild(formGroupDiv);
     });
     
@@ -238,8 +268,8 @@ function predictClassValue() {
     window.selectedClassFeatures.forEach(feature => {
         const inputElement = document.getElementById(`class-input-${feature}`);
         
-        if (inputElement.tagName === 'SELECT') {
-            inputs[feature] = inputElement.value;
+        if (inputElement.type === 'text') {
+            inputs[feature] = inputElement.value.trim();
             if (!inputs[feature]) {
                 alert(`Please select a value for ${feature}`);
                 return;
@@ -117,6 +117,7 @@ function runClustering() {
                     <div>Grouping</div>
                     <div class="metric-value">${data.group_by.charAt(0).toUpperCase() + data.group_by.slice(1)}</div>
                 </div>
+                ${pointsNote(data.points)}
             `;
         }
         
@@ -421,4 +422,14 @@ function toggleDataSeries(e) {
         e.dataSeries.visible = true;
     }
     e.chart.render();
-}
\ No newline at end of file
+}
+function pointsNote(points) {
+    if (!points || !points.downsampled) return '';
+    return `
+        <div class="metric-card">
+            <div>Points Plotted</div>
+            <div class="metric-value">${points.returned} / ${points.total}</div>
+            <small>Outliers kept; scores use all points</small>
+        </div>
+    `;
+}
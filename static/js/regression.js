@@ -107,6 +107,7 @@ function runRegression() {
                 <div class="metric-value">${data.r2.toFixed(3)}</div>
                 <small>${interpretR2(data.r2)}</small>
             </div>
+            ${regressionPointsNote(data.points)}
         `;
 
         renderRegressionChart(data);
@@ -288,4 +289,14 @@ function toggleDataSeries(e) {
         e.dataSeries.visible = true;
     }
     e.chart.render();
-}
\ No newline at end of file
+}
+function regressionPointsNote(points) {
+    if (!points || (!points.train.downsampled && !points.test.downsampled)) return '';
+    return `
+        <div class="metric-card">
+            <div>Points Plotted</div>
+            <div class="metric-value">${points.train.returned + points.test.returned} / ${points.train.total + points.test.total}</div>
+            <small>Outliers kept; R² uses all points</small>
+        </div>
+    `;
+}
@@ -1,8 +1,29 @@
+let dashboardCharts = null;
+
+// Every chart comes back from one request, so switching charts after the
+// first render needs no round trip.
+const dashboardRequest = fetch('/dashboard_data')
+    .then(response => response.json())
+    .then(data => {
+        if (data.charts) dashboardCharts = data.charts;
+        return dashboardCharts;
+    })
+    .catch(() => null);
+
+function loadChartData(option) {
+    if (dashboardCharts && option in dashboardCharts) {
+        return Promise.resolve(dashboardCharts[option]);
+    }
+    return dashboardRequest.then(charts => {
+        if (charts && option in charts) return charts[option];
+        return fetch(`/get_data?type=${option}`).then(response => response.json());
+    });
+}
+
 function getChartData() {
     const option = document.getElementById("chartOption").value;
 
-    fetch(`/get_data?type=${option}`)
-        .then(response => response.json())
+    loadChartData(option)
         .then(data => {
             let chartConfig = {
                 animationEnabled: true,
@@ -104,6 +125,20 @@ function getChartData() {
                         dataPoints: data.map(item => ({ label: item.label, y: item.y }))
                     }];
                     break;
+
+                case "price_percentiles":
+                case "rating_percentiles":
+                    // y is [p5, p25, p75, p95, p50] per category.
+                    chartConfig.axisY.title = option === "price_percentiles" ? "Price" : "Rating";
+                    chartConfig.data = [{
+                        type: "boxAndWhisker",
+                        color: "#8e79b8",
+                        upperBoxColor: "#8e79b8",
+                        lowerBoxColor: "#563d7c",
+                        toolTipContent: "<b>{label}</b> ({n} products)<br/>p5: {y[0]}<br/>p25: {y[1]}<br/>p50: {y[4]}<br/>p75: {y[2]}<br/>p95: {y[3]}",
+                        dataPoints: data.map(item => ({ label: item.label, y: item.y, n: item.n }))
+                    }];
+                    break;
             }
 
             const chart = new CanvasJS.Chart("chartContainer", chartConfig);
@@ -0,0 +1,207 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+
+import dtypes
+import ml
+
+NUMERIC_COLUMNS = ['id', 'price', 'original_price', 'discount', 'rating']
+CATEGORICAL_COLUMNS = ['brand', 'category', 'subcategory']
+REGRESSION_TECHNIQUES = ['linear', 'svr']
+CLASSIFICATION_TECHNIQUES = ['decision_tree', 'svm']
+CLASSIFICATION_TARGETS = ['brand_popularity', 'price_category']
+MAX_SPECS = 64
+# The web workers are threaded, and forking a process with other threads
+# running can copy a held lock into the child; these start clean instead.
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_shared_frame = None
+_shared_blocks = []
+
+def validate_spec(spec):
+    kind = spec.get('kind')
+    target = spec.get('target')
+    features = spec.get('features')
+
+    if not target or not features:
+        return 'Please select both target and feature variables'
+    if kind == 'regression':
+        if spec.get('technique', 'linear') not in REGRESSION_TECHNIQUES:
+            return 'Invalid regression technique'
+        if any(col not in NUMERIC_COLUMNS for col in [target] + features):
+            return 'Regression columns must be numeric'
+    elif kind == 'classification':
+        if target not in CLASSIFICATION_TARGETS:
+            return 'Invalid target variable'
+        if spec.get('technique', 'decision_tree') not in CLASSIFICATION_TECHNIQUES:
+            return 'Invalid classification technique'
+        if spec.get('brand_encoding', 'onehot') not in ml.BRAND_ENCODINGS:
+            return 'Invalid brand encoding'
+    else:
+        return 'Invalid model kind'
+    return None
+
+def sweep_columns(specs):
+    columns = {'id'}
+    for spec in specs:
+        columns.update([spec['target']] + spec['features'])
+        if spec['kind'] == 'classification':
+            columns.update(['brand', 'price'])
+    return [col for col in NUMERIC_COLUMNS + CATEGORICAL_COLUMNS if col in columns]
+
+def share_frame(df):
+    layout = {'rows': len(df), 'columns': {}}
+    blocks = []
+    df = dtypes.model_frame(df)
+
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            codes, categories = pd.factorize(df[col], use_na_sentinel=True)
+            values = codes.astype(np.int32)
+            categories = categories.tolist()
+        else:
+            values = df[col].to_numpy(dtype=np.float64)
+            categories = None
+
+        block = SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=block.buf)[:] = values
+        blocks.append(block)
+        layout['columns'][col] = (block.name, values.dtype.str, categories)
+
+    return layout, blocks
+
+def release_blocks(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+def attach_frame(layout, models_dir=None):
+    global _shared_frame
+
+    # Workers start from a fresh interpreter, not a fork, so a models
+    # directory set at runtime has to be passed along.
+    if models_dir:
+        ml.MODELS_DIR = models_dir
+
+    columns = {}
+    for col, (name, dtype, categories) in layout['columns'].items():
+        block = SharedMemory(name=name)
+        _shared_blocks.append(block)
+
+        values = np.ndarray((layout['rows'],), dtype=np.dtype(dtype), buffer=block.buf)
+        values.flags.writeable = False
+        if categories is None:
+            columns[col] = values
+        else:
+            columns[col] = pd.Categorical.from_codes(values, categories=categories).astype(object)
+
+    _shared_frame = pd.DataFrame(columns, copy=False)
+    return _shared_frame
+
+def build_regression_frame(df, target, features):
+    columns = list(dict.fromkeys([target] + features))
+    return df[columns].dropna()
+
+def build_classification_frame(df, target, features):
+    if target == 'brand_popularity':
+        query_cols = [col for col in ['brand'] + features if col != 'id']
+        query_cols = list(dict.fromkeys(query_cols))
+        counts = df.groupby(query_cols, dropna=False).size().reset_index(name='id')
+        frame = counts[counts['id'] > 1].reset_index(drop=True)
+        frame['brand_popularity'] = ml.rank_tertiles(frame['id'])
+    else:
+        query_cols = [col for col in features if col != 'brand'] + (['brand'] if 'brand' in features else [])
+        frame = df[list(dict.fromkeys(query_cols + ['price']))].copy()
+        frame['price_category'] = ml.rank_tertiles(frame['price'])
+    return frame
+
+def model_id_for(spec):
+    return f"{spec['target']}_{'-'.join(spec['features'])}_{spec['technique']}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{spec['index']}"
+
+def run_spec(spec):
+    df = _shared_frame
+    started = time.perf_counter()
+    result = {'spec': spec, 'kind': spec['kind']}
+
+    try:
+        if spec['kind'] == 'regression':
+            X, y = ml.preprocess_data(build_regression_frame(df, spec['target'], spec['features']), spec['target'], spec['features'])
+            if len(X) < 10:
+                raise ValueError('Not enough data left after preprocessing')
+            prepared = time.perf_counter()
+
+            model_data = ml.train_model(X, y, spec['technique'], n_jobs=1)
+            fitted = time.perf_counter()
+
+            model_id = ml.save_model(model_data, spec['target'], spec['features'], spec['technique'], model_id_for(spec))
+            result.update({'metric': 'r2', 'score': float(model_data['r2'])})
+        else:
+            frame = build_classification_frame(df, spec['target'], spec['features'])
+            X, y, classes = ml.preprocess_classification_data(frame, spec['target'], spec['features'])
+            if len(X) < 10:
+                raise ValueError('Not enough data left after preprocessing')
+            prepared = time.perf_counter()
+
+            model_data = ml.train_classification_model(X, y, classes, spec['technique'], spec['brand_encoding'], n_jobs=1)
+            fitted = time.perf_counter()
+
+            model_id = ml.save_classification_model(model_data, spec['target'], spec['features'], spec['technique'], model_id_for(spec), classes)
+            result.update({
+                'metric': 'accuracy',
+                'score': float(model_data['accuracy']),
+                'precision': float(model_data['precision']),
+                'recall': float(model_data['recall'])
+            })
+
+        finished = time.perf_counter()
+        result.update({
+            'model_id': model_id,
+            'rows': len(X),
+            'timing': {
+                'preprocess_seconds': round(prepared - started, 4),
+                'fit_seconds': round(fitted - prepared, 4),
+                'save_seconds': round(finished - fitted, 4),
+                'total_seconds': round(finished - started, 4)
+            }
+        })
+    except Exception as e:
+        result.update({'error': str(e), 'timing': {'total_seconds': round(time.perf_counter() - started, 4)}})
+
+    return result
+
+def run_sweep(df, specs, max_workers=None):
+    specs = [dict(spec, index=i) for i, spec in enumerate(specs)]
+    for spec in specs:
+        spec.setdefault('technique', 'linear' if spec['kind'] == 'regression' else 'decision_tree')
+        spec.setdefault('brand_encoding', 'onehot')
+
+    # Clients may ask for fewer workers than cores, never more.
+    cpus = os.cpu_count() or 1
+    max_workers = max(1, min(int(max_workers or cpus), cpus, len(specs)))
+    layout, blocks = share_frame(df)
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(START_METHOD), initializer=attach_frame, initargs=(layout, ml.MODELS_DIR)) as executor:
+            results = list(executor.map(run_spec, specs))
+    finally:
+        release_blocks(blocks)
+
+    leaderboard = sorted(
+        [r for r in results if 'error' not in r],
+        key=lambda r: (r['kind'], -r['score'])
+    )
+    for kind in ('regression', 'classification'):
+        for rank, row in enumerate([r for r in leaderboard if r['kind'] == kind], 1):
+            row['rank'] = rank
+
+    return {
+        'leaderboard': leaderboard,
+        'errors': [r for r in results if 'error' in r],
+        'workers': max_workers
+    }